@@ -0,0 +1,141 @@
+"""Benchmark for fetching and parsing large ``<resultlist>`` replies of OBS.
+
+A local web server serves a synthetic resultlist. Each mode fetches and parses
+it in a fresh interpreter, so that the reported peak resident set size only
+covers that mode:
+
+- ``text``: read the whole reply with :py:meth:`staging.obs.ObsClient.request`
+  and parse it afterwards with
+  :py:meth:`~staging.build_result.RepositoryBuildResult.from_resultlist`
+- ``stream``: :py:meth:`staging.obs.ObsClient.results`, which passes the reply
+  to the parser while it is received
+
+Run it from the root of the repository::
+
+    PYTHONPATH=src python benchmarks/resultlist.py --packages 10000
+
+"""
+
+import argparse
+import asyncio
+import resource
+import sys
+import time
+
+from aiohttp import web
+
+from staging.build_result import RepositoryBuildResult
+from staging.obs import ObsClient
+
+_MODES = ("text", "stream")
+
+_CODES = ("succeeded", "failed", "building", "scheduled", "excluded")
+
+
+def resultlist(packages: int, repositories: int) -> str:
+    """Create a ``<resultlist>`` with ``packages`` packages in each of the
+    ``repositories`` repositories.
+
+    """
+    lines = ['<resultlist state="c181538ad4f4b5e3f4a47d1e5a8f6c4d">']
+    for repo in range(repositories):
+        lines.append(
+            f'  <result project="home:bench" repository="images-{repo}" '
+            'arch="x86_64" code="building" state="building">'
+        )
+        for pkg in range(packages):
+            code = _CODES[pkg % len(_CODES)]
+            if code == "failed":
+                lines.append(
+                    f'    <status package="image-{pkg}" code="{code}">'
+                    "<details>build failed</details></status>"
+                )
+            else:
+                lines.append(f'    <status package="image-{pkg}" code="{code}" />')
+        lines.append("  </result>")
+    lines.append("</resultlist>")
+    return "\n".join(lines)
+
+
+async def _fetch(api_url: str, mode: str) -> list[RepositoryBuildResult]:
+    async with ObsClient(api_url=api_url) as client:
+        if mode == "text":
+            return RepositoryBuildResult.from_resultlist(
+                await client.request("GET", "/build/home:bench/_result")
+            )
+        return (await client.results("home:bench"))[0]
+
+
+def _run_client(api_url: str, mode: str, rounds: int) -> None:
+    # the interpreter, the imports and the event loop are not part of the
+    # measurement
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = asyncio.run(_fetch(api_url, mode))
+        durations.append(time.perf_counter() - start)
+        assert sum(len(repo_res.packages) for repo_res in results)
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux
+    print(f"{min(durations) * 1000:.1f} {(rss_peak - rss_before) / 1024:.1f}")
+
+
+async def _benchmark(packages: int, repositories: int, rounds: int) -> None:
+    body = resultlist(packages, repositories).encode()
+
+    async def _results(request: web.Request) -> web.Response:
+        return web.Response(body=body, content_type="application/xml")
+
+    app = web.Application()
+    app.router.add_get("/build/{prj}/_result", _results)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    print(
+        f"{packages} packages in {repositories} repositories, "
+        f"{len(body) / 1024 / 1024:.1f} MiB, best of {rounds} runs"
+    )
+    print(f"{'mode':<8} {'time [ms]':>10} {'peak RSS increase [MiB]':>25}")
+    try:
+        for mode in _MODES:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable,
+                __file__,
+                "--client",
+                f"http://127.0.0.1:{port}",
+                "--mode",
+                mode,
+                "--rounds",
+                str(rounds),
+                stdout=asyncio.subprocess.PIPE,
+            )
+            stdout, _ = await proc.communicate()
+            if proc.returncode:
+                raise RuntimeError(f"Benchmark of {mode} failed")
+            duration, rss = stdout.decode().split()
+            print(f"{mode:<8} {duration:>10} {rss:>25}")
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--packages", type=int, default=10_000)
+    parser.add_argument("--repositories", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--client", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=_MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.client:
+        _run_client(args.client, args.mode, args.rounds)
+    else:
+        asyncio.run(_benchmark(args.packages, args.repositories, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark for the startup cost of the Jinja2 templates.
+
+Each round runs a fresh interpreter that imports :py:mod:`bci_build.templates`
+and then compiles all of its templates, i.e. it measures the time until the
+templates are ready to be rendered. The rounds run with an empty bytecode cache
+(``cold``) and with a bytecode cache that a previous process has filled
+(``warm``).
+
+Run it from the root of the repository::
+
+    python benchmarks/templates.py
+
+To compare checkouts, e.g. a :command:`git worktree` of an older commit with
+this tree, pass the :file:`src` directory of each checkout with ``--src``. The
+rounds of all checkouts are interleaved, so that they are equally affected by
+the load of the machine::
+
+    git worktree add /tmp/before <commit>
+    python benchmarks/templates.py --src /tmp/before/src --src src
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = """
+import time
+
+start = time.perf_counter()
+from bci_build import templates
+imported = time.perf_counter()
+
+for name in dir(templates):
+    obj = getattr(templates, name)
+    # older versions compile the templates at import, newer ones lazily
+    if hasattr(obj, "template"):
+        obj.template
+compiled = time.perf_counter()
+
+print(f"{(imported - start) * 1000:.2f} {(compiled - start) * 1000:.2f}")
+"""
+
+
+def _measure(src: str, cache_home: str) -> tuple[float, float]:
+    stdout = subprocess.run(
+        [sys.executable, "-c", _CHILD],
+        env={**os.environ, "PYTHONPATH": src, "XDG_CACHE_HOME": cache_home},
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    import_ms, ready_ms = stdout.split()
+    return float(import_ms), float(ready_ms)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--src",
+        action="append",
+        help="src directory of a checkout that is measured, can be passed "
+        "multiple times (default: this tree)",
+    )
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    sources: list[str] = args.src or [
+        os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "src"))
+    ]
+
+    results: dict[tuple[str, str], list[tuple[float, float]]] = {
+        (src, cache): [] for src in sources for cache in ("cold", "warm")
+    }
+    with tempfile.TemporaryDirectory() as warm_caches:
+        for ind, src in enumerate(sources):
+            # fill the bytecode cache
+            _measure(src, os.path.join(warm_caches, str(ind)))
+        for _ in range(args.rounds):
+            for ind, src in enumerate(sources):
+                with tempfile.TemporaryDirectory() as cold_cache:
+                    results[src, "cold"].append(_measure(src, cold_cache))
+                results[src, "warm"].append(
+                    _measure(src, os.path.join(warm_caches, str(ind)))
+                )
+
+    print(f"median of {args.rounds} runs in milliseconds")
+    print(f"{'src':<30} {'cache':<6} {'import':>8} {'ready to render':>16}")
+    for (src, cache), timings in results.items():
+        import_ms = statistics.median(t[0] for t in timings)
+        ready_ms = statistics.median(t[1] for t in timings)
+        print(f"{src:<30} {cache:<6} {import_ms:>8.1f} {ready_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Content addressed cache for the rendered build recipes of container images.
+
+The cache stores a digest of every image that has been written to a
+destination folder. The digest is computed from all dataclass fields of the
+image and from the sources of the templates and of the modules defining the
+image's class. If neither changed since the image was last written to the same
+destination and all files are still present with the contents that were
+written, then rendering and writing can be skipped.
+
+"""
+
+import dataclasses
+import datetime
+import hashlib
+import inspect
+import json
+import os
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from bci_build import templates
+from bci_build.xdg import cache_path
+
+if TYPE_CHECKING:
+    from bci_build.package import BaseContainerImage
+
+
+def _default_cache_file() -> str:
+    return cache_path("render-cache.json")
+
+
+@cache
+def _source_digest(source_file: str) -> str:
+    return hashlib.sha256(Path(source_file).read_bytes()).hexdigest()
+
+
+def _generator_digest(image_type: type) -> str:
+    """Digest of the templates and of all source files that define
+    ``image_type`` and its base classes.
+
+    """
+    source_files = {inspect.getfile(templates)}
+    for cls in image_type.__mro__:
+        if cls.__module__.split(".")[0] in ("bci_build", "dotnet"):
+            source_files.add(inspect.getfile(cls))
+
+    return hashlib.sha256(
+        "".join(_source_digest(fname) for fname in sorted(source_files)).encode()
+    ).hexdigest()
+
+
+def _contents_digest(contents: str | bytes) -> str:
+    return hashlib.sha256(
+        contents.encode() if isinstance(contents, str) else contents
+    ).hexdigest()
+
+
+def _file_digest(path: str) -> str | None:
+    try:
+        return _contents_digest(Path(path).read_bytes())
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def image_digest(image: "BaseContainerImage") -> str:
+    """Returns a stable digest of the container image ``image`` that changes
+    whenever the rendered build recipes could change.
+
+    """
+    digest = hashlib.sha256()
+    digest.update(_generator_digest(type(image)).encode())
+    # the copyright header & config.sh embed the current year
+    digest.update(str(datetime.date.today().year).encode())
+    digest.update(templates.INFOHEADER_TEMPLATE.encode())
+    for fld in dataclasses.fields(image):
+        digest.update(f"{fld.name}={getattr(image, fld.name)!r}\n".encode())
+    return digest.hexdigest()
+
+
+@dataclasses.dataclass
+class RenderCache:
+    """On-disk cache storing the digest of every image written to a
+    destination folder by
+    :py:meth:`~bci_build.package.BaseContainerImage.write_files_to_folder`.
+
+    The cache is loaded via :py:meth:`load` and has to be persisted explicitly
+    via :py:meth:`save` once all images have been written.
+
+    """
+
+    #: path to the json file in which the cache is stored
+    cache_file: str = dataclasses.field(default_factory=_default_cache_file)
+
+    #: Destination folders of the images that had to be (re)written
+    changed: list[str] = dataclasses.field(default_factory=list)
+
+    #: Destination folders of the images that were skipped
+    unchanged: list[str] = dataclasses.field(default_factory=list)
+
+    _entries: dict[str, dict[str, str | list[list[str]]]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    @staticmethod
+    def load(cache_file: str | None = None) -> "RenderCache":
+        """Loads the cache from ``cache_file`` (defaults to
+        :file:`$XDG_CACHE_HOME/bci-dockerfile-generator/render-cache.json`). An
+        empty cache is returned if the file does not exist or is corrupted.
+
+        """
+        render_cache = RenderCache(cache_file=cache_file or _default_cache_file())
+        try:
+            with open(render_cache.cache_file, "r") as cache_f:
+                render_cache._entries = json.load(cache_f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return render_cache
+
+    def save(self) -> None:
+        """Writes the cache to :py:attr:`cache_file`."""
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        with open(self.cache_file, "w") as cache_f:
+            json.dump(self._entries, cache_f, indent=1, sort_keys=True)
+
+    def lookup(self, image: "BaseContainerImage", dest: str) -> list[str] | None:
+        """Returns the list of files that were written for ``image`` into
+        ``dest``, if the image did not change since and all files still
+        exist with the contents that were written. Otherwise ``None`` is
+        returned.
+
+        """
+        dest = os.path.abspath(dest)
+        entry = self._entries.get(dest)
+        if entry is None or entry["digest"] != image_digest(image):
+            return None
+
+        files = entry["files"]
+        assert isinstance(files, list)
+        # entries of older versions of the cache only list the file names
+        if any(not isinstance(file_entry, list) for file_entry in files) or any(
+            _file_digest(os.path.join(dest, fname)) != digest for fname, digest in files
+        ):
+            return None
+
+        self.unchanged.append(dest)
+        return [fname for fname, _ in files]
+
+    def update(
+        self, image: "BaseContainerImage", dest: str, files: dict[str, str | bytes]
+    ) -> None:
+        """Records that ``files`` (a mapping of the file names to their
+        contents) were written for ``image`` into ``dest``.
+
+        """
+        dest = os.path.abspath(dest)
+        self.changed.append(dest)
+        self._entries[dest] = {
+            "digest": image_digest(image),
+            "files": [
+                [fname, _contents_digest(contents)] for fname, contents in files.items()
+            ],
+        }
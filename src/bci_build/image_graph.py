@@ -0,0 +1,142 @@
+"""Graph of the container images that are built ``FROM`` other images.
+
+The base of an image is taken from its ``from_image`` and resolved to the
+image whose build tags contain the reference. References to images that are
+not built by the generator (e.g. ``suse/sle15:15.6``) are ignored, so only
+images of the same catalogue are connected.
+
+"""
+
+from typing import Iterable
+from typing import Iterator
+
+import graphlib
+
+from bci_build.package import BaseContainerImage
+from bci_build.package import OsContainer
+
+
+def _resolved_build_tags(image: BaseContainerImage) -> list[str]:
+    os_version_id = OsContainer.version_to_container_os_version(image.os_version)
+    return [
+        tag.replace("%OS_VERSION_ID_SP%", os_version_id)
+        for tag in image.build_tags
+        # the release is only known once the image is built on OBS
+        if "%RELEASE%" not in tag
+    ]
+
+
+class ImageGraph:
+    """Derivation graph of container images of a single OS version, whose
+    nodes are the package names of the images.
+
+    Raises:
+        :py:class:`ValueError`: if the images belong to different OS versions,
+            if two images have the same package name or if the images are
+            derived from each other in a cycle
+
+    """
+
+    def __init__(self, images: Iterable[BaseContainerImage]) -> None:
+        images = list(images)
+        if len({image.os_version for image in images}) > 1:
+            raise ValueError("All images must belong to the same OS version")
+
+        package_by_tag: dict[str, str] = {}
+        for image in images:
+            for tag in _resolved_build_tags(image):
+                package_by_tag[tag] = image.package_name
+
+        self._bases: dict[str, str | None] = {}
+        self._derived: dict[str, set[str]] = {}
+        for image in images:
+            if image.package_name in self._bases:
+                raise ValueError(f"Duplicate package name {image.package_name}")
+            base = package_by_tag.get(image._from_image or "")
+            self._bases[image.package_name] = base
+            self._derived.setdefault(image.package_name, set())
+            if base is not None:
+                self._derived.setdefault(base, set()).add(image.package_name)
+
+        try:
+            graphlib.TopologicalSorter(self._graph(self._bases)).prepare()
+        except graphlib.CycleError as cycle_err:
+            raise ValueError(
+                "Images are derived from each other in a cycle: "
+                + " <- ".join(cycle_err.args[1])
+            ) from cycle_err
+
+    @property
+    def package_names(self) -> list[str]:
+        """The package names of all images in the graph."""
+        return list(self._bases)
+
+    def base_of(self, package_name: str) -> str | None:
+        """The package name of the image from which ``package_name`` is built
+        or ``None`` if it is not built from an image of this graph.
+
+        """
+        return self._bases[package_name]
+
+    def derived_from(self, package_name: str) -> set[str]:
+        """The package names of all images that are built directly from
+        ``package_name``.
+
+        """
+        return set(self._derived[package_name])
+
+    def affected_by(self, package_names: Iterable[str]) -> set[str]:
+        """The ``package_names`` and the package names of all images that are
+        (transitively) built from one of them, i.e. all images that have to
+        be rebuilt if ``package_names`` change.
+
+        """
+        affected = set()
+        pending = list(package_names)
+        while pending:
+            if (pkg := pending.pop()) not in affected:
+                affected.add(pkg)
+                pending.extend(self._derived.get(pkg, ()))
+        return affected
+
+    def _graph(self, bases: dict[str, str | None]) -> dict[str, set[str]]:
+        return {pkg: {base} if base else set() for pkg, base in bases.items()}
+
+    def _subgraph(self, package_names: Iterable[str]) -> dict[str, set[str]]:
+        # connect every package to its closest ancestor in the subgraph, so
+        # that images built from an image outside of it keep their order
+        selected = set(package_names)
+        bases: dict[str, str | None] = {}
+        for pkg in selected:
+            base = self._bases[pkg]
+            while base is not None and base not in selected:
+                base = self._bases[base]
+            bases[pkg] = base
+        return self._graph(bases)
+
+    def static_order(self, package_names: Iterable[str] | None = None) -> list[str]:
+        """All images (or only ``package_names``) ordered so that every image
+        comes after the image from which it is built.
+
+        """
+        return [
+            pkg for generation in self.generations(package_names) for pkg in generation
+        ]
+
+    def generations(
+        self, package_names: Iterable[str] | None = None
+    ) -> Iterator[list[str]]:
+        """Yields the images (or only ``package_names``) in groups, where the
+        images of each group are only built from images of previous groups.
+
+        """
+        sorter = graphlib.TopologicalSorter(
+            self._subgraph(
+                self.package_names if package_names is None else package_names
+            )
+        )
+        sorter.prepare()
+        while sorter.is_active():
+            ready = sorted(sorter.get_ready())
+            yield ready
+            sorter.done(*ready)
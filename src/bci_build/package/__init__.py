@@ -5,21 +5,28 @@ import abc
 import asyncio
 import datetime
 import enum
+import functools
 import os
 import textwrap
+import time
 from dataclasses import dataclass
 from dataclasses import field
 from pathlib import Path
+from types import MappingProxyType
 from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Literal
+from typing import Mapping
 from typing import Optional
 from typing import Union
 from typing import overload
 
 from packaging import version
 
+from bci_build.cache import RenderCache
 from bci_build.templates import DOCKERFILE_TEMPLATE
 from bci_build.templates import INFOHEADER_TEMPLATE
 from bci_build.templates import KIWI_TEMPLATE
@@ -257,6 +264,52 @@ def _build_tag_prefix(os_version: OsVersion) -> str:
     return "bci"
 
 
+@dataclass
+class PropertyCacheInfo:
+    """Hit and miss counters of the property cache of a
+    :py:class:`BaseContainerImage`, see
+    :py:attr:`BaseContainerImage.property_cache_info`.
+
+    """
+
+    #: number of property accesses that were served from the cache
+    hits: int = 0
+
+    #: number of property accesses that had to compute the value
+    misses: int = 0
+
+
+class cached_image_property(property):
+    """A read-only property of a :py:class:`BaseContainerImage` whose value is
+    computed only once per instance.
+
+    The cached values of an instance are dropped whenever any attribute of the
+    instance is assigned. Mutating a field in place (e.g. appending to
+    :py:attr:`~BaseContainerImage.package_list`) is **not** detected, call
+    :py:meth:`~BaseContainerImage.clear_property_cache` in that case.
+
+    Cached lists, dictionaries and sets are returned as shallow copies, so
+    that callers modifying them do not alter the cached value.
+
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        info: PropertyCacheInfo = instance.__dict__.setdefault(
+            "_property_cache_info", PropertyCacheInfo()
+        )
+        cache: dict = instance.__dict__.setdefault("_property_cache", {})
+        try:
+            value = cache[self]
+            info.hits += 1
+        except KeyError:
+            info.misses += 1
+            value = cache[self] = super().__get__(instance, owner)
+        return value.copy() if isinstance(value, (list, dict, set)) else value
+
+
 @dataclass(frozen=True)
 class ImageProperties:
     """Class storing the properties of the Base Container that differ
@@ -535,6 +588,20 @@ class BaseContainerImage(abc.ABC):
         if not self.maintainer:
             self.maintainer = self._image_properties.maintainer
 
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        # any assignment can change the value of a derived property
+        self.__dict__.pop("_property_cache", None)
+
+    def clear_property_cache(self) -> None:
+        """Drop all cached values of the properties of this image."""
+        self.__dict__.pop("_property_cache", None)
+
+    @property
+    def property_cache_info(self) -> PropertyCacheInfo:
+        """The hit and miss counters of the property cache of this image."""
+        return self.__dict__.setdefault("_property_cache_info", PropertyCacheInfo())
+
     @property
     def is_opensuse(self) -> bool:
         return self.os_version == OsVersion.TUMBLEWEED
@@ -557,13 +624,13 @@ class BaseContainerImage(abc.ABC):
         """
         pass
 
-    @property
+    @cached_image_property
     def build_name(self) -> Optional[str]:
         if self.build_tags:
             return self.build_tags[0].replace("/", ":").replace(":", "-")
         return None
 
-    @property
+    @cached_image_property
     def build_version(self) -> Optional[str]:
         if self.os_version not in (OsVersion.TUMBLEWEED, OsVersion.BASALT):
             epoch = ""
@@ -580,7 +647,7 @@ class BaseContainerImage(abc.ABC):
     def lifecycle_url(self) -> str:
         return self._image_properties.lifecycle_url
 
-    @property
+    @cached_image_property
     def release_stage(self) -> ReleaseStage:
         """This container images' release stage.
 
@@ -616,7 +683,7 @@ class BaseContainerImage(abc.ABC):
         """The registry where the image is available on."""
         return self._image_properties.registry
 
-    @property
+    @cached_image_property
     def dockerfile_custom_end(self) -> str:
         """This part is appended at the end of the :file:`Dockerfile`. It is either
         generated from :py:attr:`BaseContainerImage.custom_end` or by prepending
@@ -646,12 +713,12 @@ class BaseContainerImage(abc.ABC):
             return "\n" + prefix + " " + str(value).replace("'", '"')
         assert False, f"Unexpected type for {prefix}: {type(value)}"
 
-    @property
+    @cached_image_property
     def entrypoint_docker(self) -> Optional[str]:
         """The entrypoint line in a :file:`Dockerfile`."""
         return self._cmd_entrypoint_docker("ENTRYPOINT", self.entrypoint)
 
-    @property
+    @cached_image_property
     def cmd_docker(self) -> Optional[str]:
         return self._cmd_entrypoint_docker("CMD", self.cmd)
 
@@ -677,11 +744,11 @@ class BaseContainerImage(abc.ABC):
 """
             )
 
-    @property
+    @cached_image_property
     def entrypoint_kiwi(self) -> Optional[str]:
         return self._cmd_entrypoint_kiwi("entrypoint", self.entrypoint)
 
-    @property
+    @cached_image_property
     def cmd_kiwi(self) -> Optional[str]:
         return self._cmd_entrypoint_kiwi("subcommand", self.cmd)
 
@@ -724,7 +791,7 @@ rm -rf /var/log/zypp
 exit 0
 """
 
-    @property
+    @cached_image_property
     def _from_image(self) -> Optional[str]:
         if self.from_image is None:
             return None
@@ -738,13 +805,13 @@ exit 0
 
         return f"suse/sle15:15.{self.os_version}"
 
-    @property
+    @cached_image_property
     def dockerfile_from_line(self) -> str:
         if self._from_image is None:
             return ""
         return f"FROM {self._from_image}"
 
-    @property
+    @cached_image_property
     def kiwi_derived_from_entry(self) -> str:
         if self._from_image is None:
             return ""
@@ -752,7 +819,7 @@ exit 0
             f" derived_from=\"obsrepositories:/{self._from_image.replace(':', '#')}\""
         )
 
-    @property
+    @cached_image_property
     def packages(self) -> str:
         """The list of packages joined so that it can be appended to a
         :command:`zypper in`.
@@ -799,14 +866,14 @@ exit 0
         res += f"""        </{main_element}>"""
         return res
 
-    @property
+    @cached_image_property
     def volumes_kiwi(self) -> str:
         """The volumes for this image as xml elements that are inserted into
         a container.
         """
         return self._kiwi_volumes_expose("volumes", "volume name", self.volumes)
 
-    @property
+    @cached_image_property
     def exposes_kiwi(self) -> str:
         """The EXPOSES for this image as kiwi xml elements."""
         return self._kiwi_volumes_expose("expose", "port number", self.exposes_tcp)
@@ -835,15 +902,15 @@ exit 0
 
         return "\n" + f"{instruction} " + " ".join(str(e) for e in entries)
 
-    @property
+    @cached_image_property
     def volume_dockerfile(self) -> str:
         return self._dockerfile_volume_expose("VOLUME", self.volumes)
 
-    @property
+    @cached_image_property
     def expose_dockerfile(self) -> str:
         return self._dockerfile_volume_expose("EXPOSE", self.exposes_tcp)
 
-    @property
+    @cached_image_property
     def kiwi_packages(self) -> str:
         """The package list as xml elements that are inserted into a kiwi build
         description file.
@@ -887,7 +954,7 @@ exit 0
                 )
         return res
 
-    @property
+    @cached_image_property
     def env_lines(self) -> str:
         """Part of the :file:`Dockerfile` that sets every environment variable defined
         in :py:attr:`~BaseContainerImage.env`.
@@ -899,7 +966,7 @@ exit 0
             else "\n" + "\n".join(f'ENV {k}="{v}"' for k, v in self.env.items()) + "\n"
         )
 
-    @property
+    @cached_image_property
     def kiwi_env_entry(self) -> str:
         """Environment variable settings for a kiwi build recipe."""
         if not self.env:
@@ -939,7 +1006,7 @@ exit 0
         """
         pass
 
-    @property
+    @cached_image_property
     def description(self) -> str:
         """The description of this image which is inserted into the
         ``org.opencontainers.image.description`` label.
@@ -971,7 +1038,7 @@ exit 0
 
         return description.format(**description_formatters)
 
-    @property
+    @cached_image_property
     def title(self) -> str:
         """The image title that is inserted into the ``org.opencontainers.image.title``
         label.
@@ -984,11 +1051,11 @@ exit 0
         """
         return f"{self._image_properties.distribution_base_name} BCI {self.pretty_name}"
 
-    @property
+    @cached_image_property
     def readme_path(self) -> str:
         return f"{self.package_name}/README.md"
 
-    @property
+    @cached_image_property
     def readme_url(self) -> str:
         # we cannot use %SOURCEURL% for Tumbleweed, as it points directly to OBS
         # with a url like:
@@ -999,7 +1066,7 @@ exit 0
 
         return "%SOURCEURL%/README.md"
 
-    @property
+    @cached_image_property
     def readme(self) -> str:
         if "README.md" in self.extra_files:
             if isinstance(self.extra_files["README.md"], bytes):
@@ -1011,7 +1078,7 @@ exit 0
 {self.description}
 """
 
-    @property
+    @cached_image_property
     def extra_label_lines(self) -> str:
         """Lines for a :file:`Dockerfile` to set the additional labels defined in
         :py:attr:`BaseContainerImage.extra_labels`.
@@ -1024,7 +1091,7 @@ exit 0
             + "\n".join(f'LABEL {k}="{v}"' for k, v in self.extra_labels.items())
         )
 
-    @property
+    @cached_image_property
     def extra_label_xml_lines(self) -> str:
         """XML Elements for a kiwi build description to set the additional labels
         defined in :py:attr:`BaseContainerImage.extra_labels`.
@@ -1039,7 +1106,7 @@ exit 0
             for k, v in self.extra_labels.items()
         )
 
-    @property
+    @cached_image_property
     def labelprefix(self) -> str:
         """The label prefix used to duplicate the labels. See
         `<https://en.opensuse.org/Building_derived_containers#Labels>`_ for
@@ -1073,7 +1140,7 @@ exit 0
             return str(datetime.datetime.now().year)
         return f"15.{int(self.os_version.value)}.0"
 
-    @property
+    @cached_image_property
     def kiwi_additional_tags(self) -> Optional[str]:
         """Entry for the ``additionaltags`` attribute in the kiwi build
         description.
@@ -1092,19 +1159,19 @@ exit 0
 
         return ",".join(extra_tags) if extra_tags else None
 
-    async def write_files_to_folder(self, dest: str) -> List[str]:
-        """Writes all files required to build this image into the destination folder and
-        returns the filenames (not full paths) that were written to the disk.
+    def render_files(self) -> dict[str, Union[str, bytes]]:
+        """Renders all files required to build this image and returns them as
+        a dictionary mapping the filenames to their contents.
 
-        """
-        files = ["_service"]
-        tasks = []
+        The result includes an initial changelog, which must only be used if
+        the package has no changelog yet.
 
-        async def write_file_to_dest(fname: str, contents: Union[str, bytes]) -> None:
-            await write_to_file(os.path.join(dest, fname), contents)
+        """
+        files: dict[str, Union[str, bytes]] = {
+            "_service": SERVICE_TEMPLATE.render(image=self)
+        }
 
         if self.build_recipe_type == BuildType.DOCKER:
-            fname = "Dockerfile"
             infoheader = textwrap.indent(INFOHEADER_TEMPLATE, "# ")
 
             dockerfile = DOCKERFILE_TEMPLATE.render(
@@ -1113,79 +1180,79 @@ exit 0
             if dockerfile[-1] != "\n":
                 dockerfile += "\n"
 
-            tasks.append(asyncio.ensure_future(write_file_to_dest(fname, dockerfile)))
-            files.append(fname)
+            files["Dockerfile"] = dockerfile
 
         elif self.build_recipe_type == BuildType.KIWI:
-            fname = f"{self.package_name}.kiwi"
-            tasks.append(
-                asyncio.ensure_future(
-                    write_file_to_dest(
-                        fname,
-                        KIWI_TEMPLATE.render(
-                            image=self, INFOHEADER=INFOHEADER_TEMPLATE
-                        ),
-                    )
-                )
+            files[f"{self.package_name}.kiwi"] = KIWI_TEMPLATE.render(
+                image=self, INFOHEADER=INFOHEADER_TEMPLATE
             )
-            files.append(fname)
 
             if self.config_sh:
-                tasks.append(
-                    asyncio.ensure_future(
-                        write_file_to_dest("config.sh", self.config_sh)
-                    )
-                )
-                files.append("config.sh")
+                files["config.sh"] = self.config_sh
 
         else:
             assert (
                 False
             ), f"got an unexpected build_recipe_type: '{self.build_recipe_type}'"
 
-        tasks.append(
-            asyncio.ensure_future(
-                write_file_to_dest("_service", SERVICE_TEMPLATE.render(image=self))
-            )
-        )
-
-        changes_file_name = self.package_name + ".changes"
-        if not (Path(dest) / changes_file_name).exists():
-            name_to_include = self.pretty_name
-            if "%" in name_to_include:
-                name_to_include = self.name.capitalize()
-
-            if hasattr(self, "version"):
-                ver = self.version
-                # we don't want to include the version for language stack
-                # containers with the version_in_uid flag set to False, but by
-                # default we include it (for os containers which don't have this
-                # flag)
-                if str(ver) not in name_to_include and getattr(
-                    self, "version_in_uid", True
-                ):
-                    name_to_include += f" {ver}"
-            tasks.append(
-                asyncio.ensure_future(
-                    write_file_to_dest(
-                        changes_file_name,
-                        f"""-------------------------------------------------------------------
+        name_to_include = self.pretty_name
+        if "%" in name_to_include:
+            name_to_include = self.name.capitalize()
+
+        if hasattr(self, "version"):
+            ver = self.version
+            # we don't want to include the version for language stack
+            # containers with the version_in_uid flag set to False, but by
+            # default we include it (for os containers which don't have this
+            # flag)
+            if str(ver) not in name_to_include and getattr(
+                self, "version_in_uid", True
+            ):
+                name_to_include += f" {ver}"
+        files[
+            self.package_name + ".changes"
+        ] = f"""-------------------------------------------------------------------
 {datetime.datetime.now(tz=datetime.timezone.utc).strftime("%a %b %d %X %Z %Y")} - SUSE Update Bot <bci-internal@suse.de>
 
 - First version of the {name_to_include} BCI
-""",
-                    )
-                )
-            )
-            files.append(changes_file_name)
+"""
 
-        for fname, contents in self.extra_files.items():
-            files.append(fname)
-            tasks.append(write_file_to_dest(fname, contents))
+        files.update(self.extra_files)
+        return files
 
-        await asyncio.gather(*tasks)
+    async def write_files_to_folder(
+        self, dest: str, cache: Optional[RenderCache] = None
+    ) -> List[str]:
+        """Writes all files required to build this image into the destination folder and
+        returns the filenames (not full paths) that were written to the disk.
 
-        return files
+        If a :py:class:`~bci_build.cache.RenderCache` is passed via ``cache``,
+        then nothing is rendered or written if this image has not changed since
+        it was last written into ``dest``. The filenames from the previous
+        write are returned in that case.
+
+        """
+        if cache and (cached_files := cache.lookup(self, dest)) is not None:
+            return cached_files
+
+        files = self.render_files()
+        # the changelog is not autogenerated, only the initial one
+        if (
+            Path(dest) / (changes_file_name := self.package_name + ".changes")
+        ).exists():
+            del files[changes_file_name]
+
+        await asyncio.gather(
+            *(
+                write_to_file(os.path.join(dest, fname), contents)
+                for fname, contents in files.items()
+            )
+        )
+
+        if cache:
+            cache.update(self, dest, files)
+
+        return list(files)
 
 
 @dataclass
@@ -1211,15 +1278,15 @@ class LanguageStackContainer(BaseContainerImage):
     def image_type(self) -> ImageType:
         return ImageType.SLE_BCI
 
-    @property
+    @cached_image_property
     def version_label(self) -> str:
         return str(self.version)
 
-    @property
+    @cached_image_property
     def uid(self) -> str:
         return f"{self.name}-{self.version}" if self.version_in_uid else self.name
 
-    @property
+    @cached_image_property
     def _stability_suffix(self) -> str:
         # The stability-tags feature in containers may result in the generation of
         # identical release numbers for the same version from two different package
@@ -1259,13 +1326,13 @@ class LanguageStackContainer(BaseContainerImage):
             return f"{_STABILITY_TAG_ORDERING.index(self.stability_tag)}"
         return ""
 
-    @property
+    @cached_image_property
     def _release_suffix(self) -> str:
         if self._stability_suffix:
             return f"{self._stability_suffix}.%RELEASE%"
         return "%RELEASE%"
 
-    @property
+    @cached_image_property
     def build_tags(self) -> List[str]:
         tags = []
 
@@ -1282,14 +1349,14 @@ class LanguageStackContainer(BaseContainerImage):
                 tags += [f"{self._registry_prefix}/{name}:latest"]
         return tags
 
-    @property
+    @cached_image_property
     def reference(self) -> str:
         return (
             f"{self.registry}/{self._registry_prefix}/{self.name}"
             + f":{self.version_label}-{self._release_suffix}"
         )
 
-    @property
+    @cached_image_property
     def build_version(self) -> Optional[str]:
         build_ver = super().build_version
         if build_ver:
@@ -1319,7 +1386,7 @@ class ApplicationStackContainer(LanguageStackContainer):
     def image_type(self) -> ImageType:
         return ImageType.APPLICATION
 
-    @property
+    @cached_image_property
     def title(self) -> str:
         return f"{self._image_properties.distribution_base_name} {self.pretty_name}"
 
@@ -1332,11 +1399,11 @@ class OsContainer(BaseContainerImage):
             return "latest"
         return f"15.{os_version}"
 
-    @property
+    @cached_image_property
     def uid(self) -> str:
         return self.name
 
-    @property
+    @cached_image_property
     def version_label(self) -> str:
         return "%OS_VERSION_ID_SP%.%RELEASE%"
 
@@ -1344,7 +1411,7 @@ class OsContainer(BaseContainerImage):
     def image_type(self) -> ImageType:
         return ImageType.SLE_BCI
 
-    @property
+    @cached_image_property
     def build_tags(self) -> List[str]:
         tags = []
         for name in [self.name] + self.additional_names:
@@ -1356,7 +1423,7 @@ class OsContainer(BaseContainerImage):
             )
         return tags
 
-    @property
+    @cached_image_property
     def reference(self) -> str:
         return f"{self.registry}/{self._registry_prefix}/bci-{self.name}:{self.version_label}"
 
@@ -1383,6 +1450,110 @@ def generate_disk_size_constraints(size_gb: int) -> str:
 """
 
 
+@functools.cache
+def _read_asset(directory: str, filename: str) -> bytes:
+    """Reads the asset :file:`directory/filename` from this package on first
+    access.
+
+    """
+    return (Path(__file__).parent / directory / filename).read_bytes()
+
+
+class ImageFactory:
+    """Deferred constructor of a container image.
+
+    The factory stores the class and the keyword arguments of a container image
+    and creates the image only once :py:meth:`build` is called. The metadata
+    required to select images (:py:attr:`uid`, :py:attr:`os_version` and
+    :py:attr:`package_name`) is available without constructing the image.
+
+    ``extra_files`` can be passed as a callable returning the files, so that
+    assets are only read from disk when the image is built.
+
+    """
+
+    def __init__(self, image_class: type[BaseContainerImage], **kwargs) -> None:
+        #: the class of the container image
+        self.image_class = image_class
+
+        #: the keyword arguments passed to :py:attr:`image_class`
+        self.kwargs = kwargs
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.image_class.__name__}, {self.key!r})"
+
+    @property
+    def os_version(self) -> OsVersion:
+        return self.kwargs["os_version"]
+
+    @property
+    def package_name(self) -> str:
+        return self.kwargs["package_name"]
+
+    @property
+    def uid(self) -> str:
+        """The :py:attr:`~BaseContainerImage.uid` of the image."""
+        if issubclass(self.image_class, LanguageStackContainer) and self.kwargs.get(
+            "version_in_uid", True
+        ):
+            return f"{self.kwargs['name']}-{self.kwargs['version']}"
+        return self.kwargs["name"]
+
+    @property
+    def key(self) -> str:
+        """The key of the image in :py:const:`ALL_CONTAINER_IMAGE_NAMES`."""
+        return f"{self.uid}-{self.os_version.pretty_print.lower()}"
+
+    def build(self) -> BaseContainerImage:
+        """Create the container image."""
+        kwargs = dict(self.kwargs)
+        if callable(extra_files := kwargs.get("extra_files")):
+            kwargs["extra_files"] = extra_files()
+
+        image = self.image_class(**kwargs)
+        if image.uid != self.uid:
+            raise RuntimeError(
+                f"uid of the factory ({self.uid}) and the image ({image.uid}) differ"
+            )
+        return image
+
+
+class ImageRegistry(Mapping[str, BaseContainerImage]):
+    """Read-only mapping of image keys to container images that are built on
+    first access via their :py:class:`ImageFactory`.
+
+    Iterating over the registry or checking whether a key is present does not
+    build any images. Use :py:attr:`factories` to select images by their
+    metadata before building them.
+
+    """
+
+    def __init__(self, factories: Iterable[ImageFactory]) -> None:
+        self._factories: Dict[str, ImageFactory] = {
+            factory.key: factory for factory in factories
+        }
+        self._images: Dict[str, BaseContainerImage] = {}
+
+    def __getitem__(self, key: str) -> BaseContainerImage:
+        if (image := self._images.get(key)) is None:
+            image = self._images[key] = self._factories[key].build()
+        return image
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._factories
+
+    @property
+    def factories(self) -> Mapping[str, ImageFactory]:
+        """The factories of all images keyed by the image keys."""
+        return MappingProxyType(self._factories)
+
+
 from .appcontainers import ALERTMANAGER_CONTAINERS  # noqa: E402
 from .appcontainers import BLACKBOX_EXPORTER_CONTAINERS  # noqa: E402
 from .appcontainers import GIT_CONTAINERS  # noqa: E402
@@ -1418,9 +1589,10 @@ from .python import PYTHON_TW_CONTAINERS  # noqa: E402
 from .ruby import RUBY_CONTAINERS  # noqa: E402
 from .rust import RUST_CONTAINERS  # noqa: E402
 
-ALL_CONTAINER_IMAGE_NAMES: Dict[str, BaseContainerImage] = {
-    f"{bci.uid}-{bci.os_version.pretty_print.lower()}": bci
-    for bci in (
+#: All container images keyed by ``$uid-$os_version``. The images are only
+#: constructed when they are accessed.
+ALL_CONTAINER_IMAGE_NAMES = ImageRegistry(
+    (
         BASALT_BASE,
         PYTHON_3_12_CONTAINERS,
         *PYTHON_3_6_CONTAINERS,
@@ -1456,27 +1628,66 @@ ALL_CONTAINER_IMAGE_NAMES: Dict[str, BaseContainerImage] = {
         GITEA_RUNNER_CONTAINER,
         *TOMCAT_CONTAINERS,
     )
-}
+)
 
 SORTED_CONTAINER_IMAGE_NAMES = sorted(
     ALL_CONTAINER_IMAGE_NAMES,
-    key=lambda bci: str(ALL_CONTAINER_IMAGE_NAMES[bci].os_version),
+    key=lambda key: str(ALL_CONTAINER_IMAGE_NAMES.factories[key].os_version),
 )
 
 
+async def write_images_to_folder(
+    images: Dict[str, BaseContainerImage],
+    destination: str,
+    max_workers: int | None = None,
+    cache: Optional[RenderCache] = None,
+) -> Dict[str, float]:
+    """Writes the build recipes of all ``images`` into the folder
+    ``destination`` and returns the time in seconds that it took to write each
+    image.
+
+    ``images`` maps the image keys (see :py:const:`ALL_CONTAINER_IMAGE_NAMES`)
+    to the container images. Each image is written into the subdirectory
+    :file:`$deployment_branch_name/$package_name`, so that the resulting tree
+    matches the layout of the deployment branches.
+
+    At most ``max_workers`` images are rendered and written at the same time
+    (defaults to the number of CPUs). Images that did not change since they
+    were written are skipped if a ``cache`` is provided.
+
+    """
+    semaphore = asyncio.Semaphore(max_workers or os.cpu_count() or 1)
+    timings: Dict[str, float] = {}
+
+    async def write_image(key: str, bci: BaseContainerImage) -> None:
+        dest = os.path.join(
+            destination, bci.os_version.deployment_branch_name, bci.package_name
+        )
+        async with semaphore:
+            start = time.perf_counter()
+            os.makedirs(dest, exist_ok=True)
+            await bci.write_files_to_folder(dest, cache=cache)
+            timings[key] = time.perf_counter() - start
+
+    await asyncio.gather(*(write_image(key, bci) for key, bci in images.items()))
+    return timings
+
+
 def main() -> None:
     import argparse
 
     parser = argparse.ArgumentParser(
-        "Write the contents of a package directly to the filesystem"
+        "Write the contents of one or more packages directly to the filesystem"
     )
 
     parser.add_argument(
         "image",
         type=str,
-        nargs=1,
-        choices=SORTED_CONTAINER_IMAGE_NAMES,
-        help="The BCI container image, which package contents should be written to the disk",
+        nargs="*",
+        help="The BCI container images, which package contents should be written "
+        "to the disk. If more than one image is selected, then each image is "
+        "written into the subdirectory $deployment_branch/$package_name of the "
+        "destination. Valid values are: " + ", ".join(SORTED_CONTAINER_IMAGE_NAMES),
     )
     parser.add_argument(
         "destination",
@@ -1484,12 +1695,86 @@ def main() -> None:
         nargs=1,
         help="destination folder to which the files should be written",
     )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Write all container images",
+    )
+    parser.add_argument(
+        "--os-version",
+        type=str,
+        action="append",
+        default=[],
+        choices=[str(v) for v in ALL_OS_VERSIONS],
+        help="Write all container images of the specified OS version, can be "
+        "repeated to write the images of several OS versions",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of images that are written concurrently (defaults to the number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="CACHE_FILE",
+        help="Skip images that did not change since they were last written and "
+        "report only the changed images. The cache is stored in CACHE_FILE, "
+        "which defaults to $XDG_CACHE_HOME/bci-dockerfile-generator/render-cache.json",
+    )
 
     args = parser.parse_args()
 
+    for img in args.image:
+        if img not in ALL_CONTAINER_IMAGE_NAMES:
+            parser.error(f"invalid image: '{img}'")
+
+    if not args.image and not args.all and not args.os_version:
+        parser.error(
+            "No images selected, provide at least one image, --all or --os-version"
+        )
+
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(
-        ALL_CONTAINER_IMAGE_NAMES[args.image[0]].write_files_to_folder(
-            args.destination[0]
+    cache = RenderCache.load(args.cache or None) if args.cache is not None else None
+
+    # a single image is written directly into the destination
+    if len(args.image) == 1 and not args.all and not args.os_version:
+        loop.run_until_complete(
+            ALL_CONTAINER_IMAGE_NAMES[args.image[0]].write_files_to_folder(
+                args.destination[0], cache=cache
+            )
+        )
+        if cache:
+            cache.save()
+        return
+
+    os_versions = [OsVersion.parse(v) for v in args.os_version]
+    images = {
+        key: ALL_CONTAINER_IMAGE_NAMES[key]
+        for key, factory in ALL_CONTAINER_IMAGE_NAMES.factories.items()
+        if args.all or key in args.image or factory.os_version in os_versions
+    }
+
+    start = time.perf_counter()
+    timings = loop.run_until_complete(
+        write_images_to_folder(
+            images, args.destination[0], max_workers=args.jobs, cache=cache
         )
     )
+    total = time.perf_counter() - start
+
+    if cache:
+        cache.save()
+        print(f"{len(cache.unchanged)} images unchanged, changed images:")
+        for dest in sorted(cache.changed):
+            print(f"  {dest}")
+
+    key_width = max((len(key) for key in timings), default=0)
+    for key, duration in sorted(timings.items(), key=lambda t: t[1], reverse=True):
+        print(f"{key:<{key_width}}  {duration:.3f}s")
+    print(f"Wrote {len(timings)} images in {total:.3f}s")
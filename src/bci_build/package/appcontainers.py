@@ -1,7 +1,6 @@
 """Application Containers that are generated with the BCI tooling"""
 
 from itertools import product
-from pathlib import Path
 from typing import Dict
 
 from bci_build.package import ALL_BASE_OS_VERSIONS
@@ -10,6 +9,7 @@ from bci_build.package import CAN_BE_LATEST_OS_VERSION
 from bci_build.package import DOCKERFILE_RUN
 from bci_build.package import ApplicationStackContainer
 from bci_build.package import BuildType
+from bci_build.package import ImageFactory
 from bci_build.package import OsContainer
 from bci_build.package import OsVersion
 from bci_build.package import Package
@@ -17,22 +17,28 @@ from bci_build.package import PackageType
 from bci_build.package import Replacement
 from bci_build.package import SupportLevel
 from bci_build.package import _build_tag_prefix
+from bci_build.package import _read_asset
 from bci_build.package import generate_disk_size_constraints
 
-_PCP_FILES = {}
-for filename in (
-    "container-entrypoint",
-    "pmproxy.conf.template",
-    "10-host_mount.conf.template",
-    "pmcd",
-    "pmlogger",
-    "README.md",
-    "healthcheck",
-):
-    _PCP_FILES[filename] = (Path(__file__).parent / "pcp" / filename).read_bytes()
+
+def _pcp_files() -> Dict[str, str | bytes]:
+    return {
+        filename: _read_asset("pcp", filename)
+        for filename in (
+            "container-entrypoint",
+            "pmproxy.conf.template",
+            "10-host_mount.conf.template",
+            "pmcd",
+            "pmlogger",
+            "README.md",
+            "healthcheck",
+        )
+    }
+
 
 PCP_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="pcp",
         pretty_name="Performance Co-Pilot (pcp)",
         custom_description="{pretty_name} container {based_on_container}. {podman_only}",
@@ -63,7 +69,7 @@ PCP_CONTAINERS = [
         entrypoint=["/usr/local/bin/container-entrypoint"],
         cmd=["/usr/lib/systemd/systemd"],
         build_recipe_type=BuildType.DOCKER,
-        extra_files=_PCP_FILES,
+        extra_files=_pcp_files,
         volumes=["/var/log/pcp/pmlogger"],
         exposes_tcp=[44321, 44322, 44323],
         custom_end=f"""
@@ -84,12 +90,13 @@ HEALTHCHECK --start-period=30s --timeout=20s --interval=10s --retries=3 \
 ]
 
 
-_389DS_FILES: Dict[str, str | bytes] = {}
-_fname = "nsswitch.conf"
-_389DS_FILES[_fname] = (Path(__file__).parent / "389-ds" / _fname).read_bytes()
+def _389ds_files() -> Dict[str, str | bytes]:
+    return {"nsswitch.conf": _read_asset("389-ds", "nsswitch.conf")}
+
 
 THREE_EIGHT_NINE_DS_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         package_name="389-ds-container",
         os_version=os_version,
         is_latest=os_version in CAN_BE_LATEST_OS_VERSION,
@@ -101,7 +108,7 @@ THREE_EIGHT_NINE_DS_CONTAINERS = [
         package_list=["389-ds", "timezone", "openssl", "nss_synth"],
         cmd=["/usr/lib/dirsrv/dscontainer", "-r"],
         version="%%389ds_version%%",
-        extra_files=_389DS_FILES,
+        extra_files=_389ds_files,
         replacements_via_service=[
             Replacement(
                 regex_in_build_description="%%389ds_version%%",
@@ -129,8 +136,6 @@ HEALTHCHECK --start-period=5m --timeout=5s --interval=5s --retries=2 \
     for os_version in ALL_NONBASE_OS_VERSIONS
 ]
 
-_MARIADB_ENTRYPOINT = (Path(__file__).parent / "mariadb" / "entrypoint.sh").read_bytes()
-
 MARIADB_CONTAINERS = []
 MARIADB_CLIENT_CONTAINERS = []
 
@@ -143,7 +148,8 @@ for os_version in set(ALL_NONBASE_OS_VERSIONS) | {OsVersion.BASALT}:
         additional_names = ["mariadb"]
 
     MARIADB_CONTAINERS.append(
-        ApplicationStackContainer(
+        ImageFactory(
+            ApplicationStackContainer,
             package_name=f"{prefix}mariadb-image",
             additional_names=additional_names,
             os_version=os_version,
@@ -161,8 +167,8 @@ for os_version in set(ALL_NONBASE_OS_VERSIONS) | {OsVersion.BASALT}:
             pretty_name="MariaDB Server",
             package_list=["mariadb", "mariadb-tools", "gawk", "timezone", "util-linux"],
             entrypoint=["docker-entrypoint.sh"],
-            extra_files={
-                "docker-entrypoint.sh": _MARIADB_ENTRYPOINT,
+            extra_files=lambda: {
+                "docker-entrypoint.sh": _read_asset("mariadb", "entrypoint.sh"),
                 "_constraints": generate_disk_size_constraints(11),
             },
             support_level=SupportLevel.L3,
@@ -192,7 +198,8 @@ COPY docker-entrypoint.sh /usr/local/bin/
     )
 
     MARIADB_CLIENT_CONTAINERS.append(
-        ApplicationStackContainer(
+        ImageFactory(
+            ApplicationStackContainer,
             package_name=f"{prefix}mariadb-client-image",
             os_version=os_version,
             is_latest=os_version in CAN_BE_LATEST_OS_VERSION,
@@ -216,10 +223,9 @@ COPY docker-entrypoint.sh /usr/local/bin/
     )
 
 
-_RMT_ENTRYPOINT = (Path(__file__).parent / "rmt" / "entrypoint.sh").read_bytes()
-
 RMT_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="rmt-server",
         package_name="rmt-server-image",
         os_version=os_version,
@@ -239,7 +245,7 @@ RMT_CONTAINERS = [
         entrypoint=["/usr/local/bin/entrypoint.sh"],
         cmd=["/usr/share/rmt/bin/rails", "server", "-e", "production"],
         env={"RAILS_ENV": "production", "LANG": "en"},
-        extra_files={"entrypoint.sh": _RMT_ENTRYPOINT},
+        extra_files=lambda: {"entrypoint.sh": _read_asset("rmt", "entrypoint.sh")},
         custom_end=f"""COPY entrypoint.sh /usr/local/bin/entrypoint.sh
 {DOCKERFILE_RUN} chmod +x /usr/local/bin/entrypoint.sh
 """,
@@ -248,15 +254,11 @@ RMT_CONTAINERS = [
 ]
 
 
-_POSTGRES_ENTRYPOINT = (
-    Path(__file__).parent / "postgres" / "entrypoint.sh"
-).read_bytes()
-_POSTGRES_LICENSE = (Path(__file__).parent / "postgres" / "LICENSE").read_bytes()
-
 # first list the SLE15 versions, then the TW specific versions
 _POSTGRES_MAJOR_VERSIONS = [16, 15, 14] + [13, 12]
 POSTGRES_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         package_name=f"postgres-{ver}-image",
         os_version=os_version,
         is_latest=ver == _POSTGRES_MAJOR_VERSIONS[0],
@@ -274,9 +276,9 @@ POSTGRES_CONTAINERS = [
             "PG_VERSION": "%%pg_version%%",
             "PGDATA": "/var/lib/pgsql/data",
         },
-        extra_files={
-            "docker-entrypoint.sh": _POSTGRES_ENTRYPOINT,
-            "LICENSE": _POSTGRES_LICENSE,
+        extra_files=lambda: {
+            "docker-entrypoint.sh": _read_asset("postgres", "entrypoint.sh"),
+            "LICENSE": _read_asset("postgres", "LICENSE"),
             # prevent ftbfs on workers with a root partition with 4GB
             "_constraints": generate_disk_size_constraints(8),
         },
@@ -314,7 +316,8 @@ HEALTHCHECK --interval=10s --start-period=10s --timeout=5s \
 
 PROMETHEUS_PACKAGE_NAME = "golang-github-prometheus-prometheus"
 PROMETHEUS_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         package_name="prometheus-image",
         os_version=os_version,
         is_latest=os_version in CAN_BE_LATEST_OS_VERSION,
@@ -339,7 +342,8 @@ PROMETHEUS_CONTAINERS = [
 
 ALERTMANAGER_PACKAGE_NAME = "golang-github-prometheus-alertmanager"
 ALERTMANAGER_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         package_name="alertmanager-image",
         os_version=os_version,
         is_latest=os_version in CAN_BE_LATEST_OS_VERSION,
@@ -364,7 +368,8 @@ ALERTMANAGER_CONTAINERS = [
 
 BLACKBOX_EXPORTER_PACKAGE_NAME = "prometheus-blackbox_exporter"
 BLACKBOX_EXPORTER_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         package_name="blackbox_exporter-image",
         os_version=os_version,
         is_latest=os_version in CAN_BE_LATEST_OS_VERSION,
@@ -386,15 +391,17 @@ BLACKBOX_EXPORTER_CONTAINERS = [
     for os_version in ALL_NONBASE_OS_VERSIONS
 ]
 
-GRAFANA_FILES = {}
-for filename in ("run.sh", "LICENSE"):
-    GRAFANA_FILES[filename] = (
-        Path(__file__).parent / "grafana" / filename
-    ).read_bytes()
+
+def _grafana_files() -> Dict[str, str | bytes]:
+    return {
+        filename: _read_asset("grafana", filename) for filename in ("run.sh", "LICENSE")
+    }
+
 
 GRAFANA_PACKAGE_NAME = "grafana"
 GRAFANA_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         package_name="grafana-image",
         os_version=os_version,
         is_latest=os_version in CAN_BE_LATEST_OS_VERSION,
@@ -405,7 +412,7 @@ GRAFANA_CONTAINERS = [
         version="%%grafana_version%%",
         version_in_uid=False,
         entrypoint=["/run.sh"],
-        extra_files=GRAFANA_FILES,
+        extra_files=_grafana_files,
         env={
             "GF_PATHS_DATA": "/var/lib/grafana",
             "GF_PATHS_HOME": "/usr/share/grafana",
@@ -429,16 +436,19 @@ GRAFANA_CONTAINERS = [
     for os_version in ALL_NONBASE_OS_VERSIONS
 ]
 
-_NGINX_FILES = {}
-for filename in (
-    "docker-entrypoint.sh",
-    "LICENSE",
-    "10-listen-on-ipv6-by-default.sh",
-    "20-envsubst-on-templates.sh",
-    "30-tune-worker-processes.sh",
-    "index.html",
-):
-    _NGINX_FILES[filename] = (Path(__file__).parent / "nginx" / filename).read_bytes()
+
+def _nginx_files() -> Dict[str, str | bytes]:
+    return {
+        filename: _read_asset("nginx", filename)
+        for filename in (
+            "docker-entrypoint.sh",
+            "LICENSE",
+            "10-listen-on-ipv6-by-default.sh",
+            "20-envsubst-on-templates.sh",
+            "30-tune-worker-processes.sh",
+            "index.html",
+        )
+    }
 
 
 def _get_nginx_kwargs(os_version: OsVersion):
@@ -458,7 +468,7 @@ def _get_nginx_kwargs(os_version: OsVersion):
         "entrypoint": ["/usr/local/bin/docker-entrypoint.sh"],
         "cmd": ["nginx", "-g", "daemon off;"],
         "build_recipe_type": BuildType.DOCKER,
-        "extra_files": _NGINX_FILES,
+        "extra_files": _nginx_files,
         "support_level": SupportLevel.L3,
         "exposes_tcp": [80],
         "custom_end": f"""{DOCKERFILE_RUN} mkdir /docker-entrypoint.d
@@ -478,7 +488,8 @@ STOPSIGNAL SIGQUIT
 
 
 NGINX_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="rmt-nginx",
         package_name="rmt-nginx-image",
         pretty_name="NGINX for SUSE RMT",
@@ -486,7 +497,8 @@ NGINX_CONTAINERS = [
     )
     for os_version in ALL_NONBASE_OS_VERSIONS
 ] + [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="nginx",
         package_name="nginx-image",
         pretty_name="NGINX",
@@ -497,7 +509,8 @@ NGINX_CONTAINERS = [
 ]
 
 GIT_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="git",
         os_version=os_version,
         support_level=SupportLevel.L3,
@@ -534,7 +547,8 @@ GIT_CONTAINERS = [
 
 
 REGISTRY_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="registry",
         pretty_name="OCI Container Registry (Distribution)",
         package_name="distribution-image",
@@ -574,7 +588,8 @@ REGISTRY_CONTAINERS = [
 
 
 HELM_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="helm",
         pretty_name="Kubernetes Package Manager",
         package_name="helm-image",
@@ -608,7 +623,8 @@ HELM_CONTAINERS = [
 
 
 TRIVY_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="trivy",
         pretty_name="Container Vulnerability Scanner",
         package_name="trivy-image",
@@ -643,7 +659,8 @@ _TOMCAT_VERSIONS = [9, 10]
 assert _TOMCAT_VERSIONS == sorted(_TOMCAT_VERSIONS)
 
 TOMCAT_CONTAINERS = [
-    ApplicationStackContainer(
+    ImageFactory(
+        ApplicationStackContainer,
         name="tomcat",
         pretty_name=f"Apache Tomcat {tomcat_major}",
         package_name=f"tomcat-{tomcat_major}-image",
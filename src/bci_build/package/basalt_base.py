@@ -1,12 +1,14 @@
 """Base Container for the Basalt Project"""
 
 from bci_build.package import BuildType
+from bci_build.package import ImageFactory
 from bci_build.package import OsContainer
 from bci_build.package import OsVersion
 from bci_build.package import Package
 from bci_build.package import PackageType
 
-BASALT_BASE = OsContainer(
+BASALT_BASE = ImageFactory(
+    OsContainer,
     name="base",
     pretty_name="Base",
     package_name="base-image",
@@ -2,7 +2,6 @@
 
 import os
 import textwrap
-from pathlib import Path
 
 from bci_build.package import ALL_BASE_OS_VERSIONS
 from bci_build.package import ALL_OS_VERSIONS
@@ -10,6 +9,7 @@ from bci_build.package import CAN_BE_LATEST_OS_VERSION
 from bci_build.package import DOCKERFILE_RUN
 from bci_build.package import Arch
 from bci_build.package import BuildType
+from bci_build.package import ImageFactory
 from bci_build.package import LTSSContainer
 from bci_build.package import OsContainer
 from bci_build.package import OsVersion
@@ -17,6 +17,7 @@ from bci_build.package import Package
 from bci_build.package import PackageType
 from bci_build.package import SupportLevel
 from bci_build.package import _build_tag_prefix
+from bci_build.package import _read_asset
 from bci_build.package import generate_disk_size_constraints
 
 _DISABLE_GETTY_AT_TTY1_SERVICE = "systemctl disable getty@tty1.service"
@@ -31,7 +32,8 @@ def _get_os_container_package_names(os_version: OsVersion) -> tuple[str, ...]:
 
 
 MICRO_CONTAINERS = [
-    OsContainer(
+    ImageFactory(
+        OsContainer,
         name="micro",
         os_version=os_version,
         support_level=SupportLevel.L3,
@@ -65,7 +67,8 @@ MICRO_CONTAINERS = [
 
 
 INIT_CONTAINERS = [
-    OsContainer(
+    ImageFactory(
+        OsContainer,
         name="init",
         os_version=os_version,
         support_level=SupportLevel.L3,
@@ -103,7 +106,8 @@ _FIPS_15_SP2_BINARIES = [
 ]
 
 FIPS_BASE_CONTAINERS = [
-    LTSSContainer(
+    ImageFactory(
+        LTSSContainer,
         name="base-fips",
         package_name="base-fips-image",
         exclusive_arch=[Arch.X86_64],
@@ -164,7 +168,8 @@ def _get_minimal_kwargs(os_version: OsVersion):
 
 
 MINIMAL_CONTAINERS = [
-    OsContainer(
+    ImageFactory(
+        OsContainer,
         name="minimal",
         **_get_minimal_kwargs(os_version),
         support_level=SupportLevel.L3,
@@ -187,7 +192,8 @@ MINIMAL_CONTAINERS = [
 ]
 
 BUSYBOX_CONTAINERS = [
-    OsContainer(
+    ImageFactory(
+        OsContainer,
         name="busybox",
         from_image=None,
         os_version=os_version,
@@ -230,7 +236,8 @@ for os_version in ALL_OS_VERSIONS - {OsVersion.TUMBLEWEED}:
         pretty_prefix = "SLE 15"
 
     KERNEL_MODULE_CONTAINERS.append(
-        OsContainer(
+        ImageFactory(
+            OsContainer,
             name=f"{prefix}-kernel-module-devel",
             pretty_name=f"{pretty_prefix} Kernel Module Development",
             package_name=f"{prefix}-kernel-module-devel-image",
@@ -254,9 +261,8 @@ for os_version in ALL_OS_VERSIONS - {OsVersion.TUMBLEWEED}:
     )
 
 
-OSC_CHECKOUT = (Path(__file__).parent / "gitea-runner" / "osc_checkout").read_bytes()
-
-GITEA_RUNNER_CONTAINER = OsContainer(
+GITEA_RUNNER_CONTAINER = ImageFactory(
+    OsContainer,
     name="gitea-runner",
     pretty_name="Gitea Action Runner",
     package_name="gitea-runner-image",
@@ -271,7 +277,7 @@ GITEA_RUNNER_CONTAINER = OsContainer(
         "git",
         *_get_os_container_package_names(OsVersion.TUMBLEWEED),
     ],
-    extra_files={"osc_checkout": OSC_CHECKOUT},
+    extra_files=lambda: {"osc_checkout": _read_asset("gitea-runner", "osc_checkout")},
     custom_end=f"""COPY osc_checkout /usr/bin/osc_checkout
 {DOCKERFILE_RUN} chmod +x /usr/bin/osc_checkout""",
 )
@@ -7,6 +7,7 @@ from typing import Literal
 
 from bci_build.package import CAN_BE_LATEST_OS_VERSION
 from bci_build.package import DOCKERFILE_RUN
+from bci_build.package import ImageFactory
 from bci_build.package import LanguageStackContainer
 from bci_build.package import OsVersion
 from bci_build.package import Replacement
@@ -82,7 +83,8 @@ def _get_golang_kwargs(
 
 GOLANG_CONTAINERS = (
     [
-        LanguageStackContainer(
+        ImageFactory(
+            LanguageStackContainer,
             **_get_golang_kwargs(ver, govariant, sle15sp),
             support_level=SupportLevel.L3,
         )
@@ -91,7 +93,8 @@ GOLANG_CONTAINERS = (
         )
     ]
     + [
-        LanguageStackContainer(
+        ImageFactory(
+            LanguageStackContainer,
             **_get_golang_kwargs(ver, govariant, sle15sp),
             support_level=SupportLevel.L3,
         )
@@ -100,7 +103,9 @@ GOLANG_CONTAINERS = (
         )
     ]
     + [
-        LanguageStackContainer(**_get_golang_kwargs(ver, "", OsVersion.TUMBLEWEED))
+        ImageFactory(
+            LanguageStackContainer, **_get_golang_kwargs(ver, "", OsVersion.TUMBLEWEED)
+        )
         for ver in set(_GOLANG_VERSIONS + _GOLANG_TW_VERSIONS)
     ]
 )
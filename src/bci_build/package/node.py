@@ -5,6 +5,7 @@ from typing import Literal
 
 from bci_build.package import CAN_BE_LATEST_OS_VERSION
 from bci_build.package import _SUPPORTED_UNTIL_SLE
+from bci_build.package import ImageFactory
 from bci_build.package import LanguageStackContainer
 from bci_build.package import OsVersion
 from bci_build.package import SupportLevel
@@ -46,14 +47,20 @@ def _get_node_kwargs(ver: Literal[16, 18, 20], os_version: OsVersion):
 
 
 NODE_CONTAINERS = [
-    LanguageStackContainer(
-        **_get_node_kwargs(18, OsVersion.SP5), support_level=SupportLevel.L3
+    ImageFactory(
+        LanguageStackContainer,
+        **_get_node_kwargs(18, OsVersion.SP5),
+        support_level=SupportLevel.L3,
     ),
-    LanguageStackContainer(
-        **_get_node_kwargs(20, OsVersion.SP5), support_level=SupportLevel.L3
+    ImageFactory(
+        LanguageStackContainer,
+        **_get_node_kwargs(20, OsVersion.SP5),
+        support_level=SupportLevel.L3,
     ),
-    LanguageStackContainer(
-        **_get_node_kwargs(20, OsVersion.SP6), support_level=SupportLevel.L3
+    ImageFactory(
+        LanguageStackContainer,
+        **_get_node_kwargs(20, OsVersion.SP6),
+        support_level=SupportLevel.L3,
     ),
-    LanguageStackContainer(**_get_node_kwargs(20, OsVersion.TUMBLEWEED)),
+    ImageFactory(LanguageStackContainer, **_get_node_kwargs(20, OsVersion.TUMBLEWEED)),
 ]
@@ -3,6 +3,7 @@ from itertools import product
 
 from bci_build.package import DOCKERFILE_RUN
 from bci_build.package import _BASH_SET
+from bci_build.package import ImageFactory
 from bci_build.package import LanguageStackContainer
 from bci_build.package import OsVersion
 from bci_build.package import Replacement
@@ -125,7 +126,8 @@ EXPOSE 9000
         cmd = ["php", "-a"]
         custom_end = common_end
 
-    return LanguageStackContainer(
+    return ImageFactory(
+        LanguageStackContainer,
         name=str(php_variant).lower(),
         no_recommends=False,
         version=php_version,
@@ -3,6 +3,7 @@
 from typing import Literal
 
 from bci_build.package import CAN_BE_LATEST_OS_VERSION
+from bci_build.package import ImageFactory
 from bci_build.package import LanguageStackContainer
 from bci_build.package import OsVersion
 from bci_build.package import Replacement
@@ -63,13 +64,17 @@ def _get_ruby_kwargs(ruby_version: Literal["2.5", "3.3"], os_version: OsVersion)
 
 
 RUBY_CONTAINERS = [
-    LanguageStackContainer(
+    ImageFactory(
+        LanguageStackContainer,
         **_get_ruby_kwargs("2.5", OsVersion.SP5),
         support_level=SupportLevel.L3,
     ),
-    LanguageStackContainer(
+    ImageFactory(
+        LanguageStackContainer,
         **_get_ruby_kwargs("2.5", OsVersion.SP6),
         support_level=SupportLevel.L3,
     ),
-    LanguageStackContainer(**_get_ruby_kwargs("3.3", OsVersion.TUMBLEWEED)),
+    ImageFactory(
+        LanguageStackContainer, **_get_ruby_kwargs("3.3", OsVersion.TUMBLEWEED)
+    ),
 ]
@@ -5,6 +5,7 @@ from itertools import product
 
 from bci_build.package import ALL_NONBASE_OS_VERSIONS
 from bci_build.package import CAN_BE_LATEST_OS_VERSION
+from bci_build.package import ImageFactory
 from bci_build.package import LanguageStackContainer
 from bci_build.package import Replacement
 from bci_build.package import SupportLevel
@@ -32,7 +33,8 @@ assert (
 ), "Only two versions of rust must be supported at the same time"
 
 RUST_CONTAINERS = [
-    LanguageStackContainer(
+    ImageFactory(
+        LanguageStackContainer,
         name="rust",
         stability_tag=(
             stability_tag := (
@@ -0,0 +1,70 @@
+"""Inverted index from the packages that are installed into the container
+images to the images.
+
+The index is built from the :py:attr:`~BaseContainerImage.package_list` of
+each image (which includes e.g. the lifecycle data packages) and from the
+packages whose version is queried via
+:py:attr:`~BaseContainerImage.replacements_via_service`. Packages that are
+installed by custom commands, e.g. in
+:py:attr:`~BaseContainerImage.custom_end`, and packages that are inherited
+from the base image are not indexed.
+
+"""
+
+from typing import Iterable
+
+from bci_build.package import BaseContainerImage
+from bci_build.package import OsVersion
+from bci_build.package import Package
+from bci_build.package import PackageType
+
+#: package types of kiwi builds that remove a package from the image
+_REMOVING_PACKAGE_TYPES = (PackageType.DELETE, PackageType.UNINSTALL)
+
+
+def installed_packages(image: BaseContainerImage) -> set[str]:
+    """Names of the packages that are installed into ``image``."""
+    return {
+        str(pkg)
+        for pkg in image.package_list
+        if not (isinstance(pkg, Package) and pkg.pkg_type in _REMOVING_PACKAGE_TYPES)
+    } | {replacement.package_name for replacement in image.replacements_via_service}
+
+
+class PackageIndex:
+    """Maps the names of packages to the images that install them."""
+
+    def __init__(self, images: Iterable[BaseContainerImage]) -> None:
+        self._images: dict[str, list[BaseContainerImage]] = {}
+        for image in images:
+            for pkg in installed_packages(image):
+                self._images.setdefault(pkg, []).append(image)
+
+    def __contains__(self, package: object) -> bool:
+        return package in self._images
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def images_containing(
+        self, package: str, os_version: OsVersion | None = None
+    ) -> list[BaseContainerImage]:
+        """All images that install ``package``, optionally only those of
+        ``os_version``.
+
+        """
+        return [
+            image
+            for image in self._images.get(package, [])
+            if os_version is None or image.os_version == os_version
+        ]
+
+    def package_names_by_os_version(self, package: str) -> dict[OsVersion, list[str]]:
+        """The package names on OBS of all images that install ``package``
+        grouped by their OS version.
+
+        """
+        res: dict[OsVersion, list[str]] = {}
+        for image in self.images_containing(package):
+            res.setdefault(image.os_version, []).append(image.package_name)
+        return {os_version: sorted(names) for os_version, names in res.items()}
@@ -1,12 +1,79 @@
 """This module contains the Jinja2 templates used to generate the build
 descriptions.
 
+All templates are compiled by the shared :py:const:`ENVIRONMENT` when they are
+rendered for the first time. The compiled templates are stored in a bytecode
+cache on disk, so that only the first process has to parse and compile them.
+
 """
 
 import datetime
+import os
+from typing import Any
 
 import jinja2
 
+from bci_build.xdg import cache_path
+
+
+class _BytecodeCache(jinja2.FileSystemBytecodeCache):
+    """File system bytecode cache that creates its directory only once the
+    first template is stored and that is disabled if the directory cannot be
+    created.
+
+    """
+
+    def dump_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError:
+            return
+        super().dump_bytecode(bucket)
+
+
+def _bytecode_cache() -> jinja2.BytecodeCache:
+    return _BytecodeCache(cache_path("jinja2"))
+
+
+_LOADER = jinja2.DictLoader({})
+
+#: Jinja2 environment in which all templates are compiled. Its options are the
+#: defaults of :py:class:`jinja2.Template`. Compiled templates are cached in
+#: :file:`$XDG_CACHE_HOME/bci-dockerfile-generator/jinja2`.
+ENVIRONMENT = jinja2.Environment(loader=_LOADER, bytecode_cache=_bytecode_cache())
+
+
+class LazyTemplate:
+    """A template of :py:const:`ENVIRONMENT` that is only loaded when it is
+    used for the first time.
+
+    """
+
+    def __init__(self, name: str) -> None:
+        #: name of the template in :py:const:`ENVIRONMENT`
+        self.name = name
+
+    @property
+    def template(self) -> jinja2.Template:
+        """The compiled template."""
+        return ENVIRONMENT.get_template(self.name)
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        """Render the template, see :py:meth:`jinja2.Template.render`."""
+        return self.template.render(*args, **kwargs)
+
+
+def register_template(name: str, source: str) -> LazyTemplate:
+    """Adds the template ``source`` with the unique ``name`` to
+    :py:const:`ENVIRONMENT` and returns it.
+
+    """
+    if _LOADER.mapping.get(name, source) != source:
+        raise ValueError(f"A different template with the name {name} exists")
+    _LOADER.mapping[name] = source
+    return LazyTemplate(name)
+
+
 INFOHEADER_TEMPLATE = f"""
     Copyright (c) {datetime.datetime.now().year} SUSE LLC
 
@@ -24,7 +91,8 @@ You can contact the BCI team via https://github.com/SUSE/bci/discussions
 
 
 #: Jinja2 template used to generate :file:`Dockerfile`
-DOCKERFILE_TEMPLATE = jinja2.Template(
+DOCKERFILE_TEMPLATE = register_template(
+    "Dockerfile",
     """# SPDX-License-Identifier: {{ image.license }}
 {{ INFOHEADER }}
 {% if image.exclusive_arch %}#!ExclusiveArch: {% for arch in image.exclusive_arch %}{{ arch }}{{ " " if not loop.last }}{% endfor %}
@@ -72,11 +140,12 @@ LABEL com.suse.release-stage="{{ image.release_stage }}"{% endif %}
 {% if image.dockerfile_custom_end %}{{ image.dockerfile_custom_end }}{% endif %}
 {%- if image.entrypoint_user %}USER {{ image.entrypoint_user }}{% endif %}
 {%- if image.volume_dockerfile %}{{ image.volume_dockerfile }}{% endif %}
-"""
+""",
 )
 
 #: Jinja2 template used to generate :file:`$pkg_name.kiwi`
-KIWI_TEMPLATE = jinja2.Template(
+KIWI_TEMPLATE = register_template(
+    "kiwi",
     """<?xml version="1.0" encoding="utf-8"?>
 <!-- SPDX-License-Identifier: {{ image.license }} -->
 <!-- {{ INFOHEADER }}-->
@@ -139,11 +208,12 @@ KIWI_TEMPLATE = jinja2.Template(
   </repository>
 {{ image.kiwi_packages }}
 </image>
-"""
+""",
 )
 
 #: Jinja2 template used to generate :file:`_service`.
-SERVICE_TEMPLATE = jinja2.Template(
+SERVICE_TEMPLATE = register_template(
+    "_service",
     """<services>
   <service mode="buildtime" name="{{ image.build_recipe_type }}_label_helper"/>
   <service mode="buildtime" name="kiwi_metainfo_helper"/>
@@ -155,5 +225,5 @@ SERVICE_TEMPLATE = jinja2.Template(
     <param name="parse-version">{{ replacement.parse_version }}</param>{% endif %}
   </service>{% endfor %}
 </services>
-"""
+""",
 )
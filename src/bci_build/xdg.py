@@ -0,0 +1,22 @@
+"""Locations of the files that the generator and the staging bot persist
+between runs, following the XDG base directory specification.
+
+"""
+
+import os
+
+#: name of the directory of this project in the XDG base directories
+_DIRECTORY_NAME = "bci-dockerfile-generator"
+
+
+def cache_path(*parts: str) -> str:
+    """Returns the path ``parts`` in the cache directory of this project,
+    i.e. in :file:`$XDG_CACHE_HOME/bci-dockerfile-generator` (or in
+    :file:`~/.cache/bci-dockerfile-generator` if :envvar:`XDG_CACHE_HOME` is
+    unset). Nothing is created on disk.
+
+    """
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, _DIRECTORY_NAME, *parts)
@@ -0,0 +1,212 @@
+"""Persistent index of the packages in a rpm-md repository.
+
+The index is built from the ``primary`` metadata of the repository and stored
+in :file:`$XDG_CACHE_HOME/bci-dockerfile-generator/repo-index/` keyed by the
+checksum of the primary metadata from :file:`repomd.xml`. As long as the
+repository does not change, only :file:`repomd.xml` has to be fetched.
+
+"""
+
+import functools
+import gzip
+import json
+import os
+import urllib.request
+import xml.etree.ElementTree as ET
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from urllib.parse import urljoin
+
+from rpm_vercmp import vercmp
+
+from bci_build.logger import LOGGER
+from bci_build.xdg import cache_path
+
+#: Version of the format of the cached index, bump it whenever
+#: :py:class:`RepoPackage` changes
+INDEX_FORMAT_VERSION = 1
+
+#: environment variable pointing to a local directory containing a copy of the
+#: repository's :file:`repodata/`, which is then used instead of the remote
+#: repository (e.g. for working offline or in tests)
+REPODATA_DIR_ENVVAR_NAME = "BCI_DOTNET_REPODATA_DIR"
+
+_REPO_NS = "{http://linux.duke.edu/metadata/repo}"
+_COMMON_NS = "{http://linux.duke.edu/metadata/common}"
+
+
+def _evr_cmp(evr1: tuple[int, str, str], evr2: tuple[int, str, str]) -> int:
+    if evr1[0] != evr2[0]:
+        return -1 if evr1[0] < evr2[0] else 1
+    return vercmp(evr1[1], evr2[1]) or vercmp(evr1[2], evr2[2])
+
+
+@dataclass(frozen=True)
+class RepoPackage:
+    """A binary package in a rpm-md repository."""
+
+    name: str
+    arch: str
+    epoch: int
+    version: str
+    release: str
+
+    #: location of the rpm relative to the repository's base url
+    location: str
+
+    @property
+    def evr(self) -> tuple[int, str, str]:
+        return self.epoch, self.version, self.release
+
+    def evr_cmp(self, other: "RepoPackage") -> int:
+        """Compares the epoch, version and release of this package to
+        ``other`` like :command:`rpm` does.
+
+        """
+        return _evr_cmp(self.evr, other.evr)
+
+
+@dataclass
+class RepositoryIndex:
+    """Index of all packages in the repository at :py:attr:`baseurl`."""
+
+    #: base url of the repository, used to construct the package urls
+    baseurl: str
+
+    #: checksum of the primary metadata from which this index was built
+    checksum: str
+
+    packages: list[RepoPackage] = field(default_factory=list)
+
+    @functools.cached_property
+    def _by_name_arch(self) -> dict[tuple[str, str], list[RepoPackage]]:
+        res: dict[tuple[str, str], list[RepoPackage]] = {}
+        for pkg in self.packages:
+            res.setdefault((pkg.name, pkg.arch), []).append(pkg)
+        for pkgs in res.values():
+            pkgs.sort(key=functools.cmp_to_key(RepoPackage.evr_cmp))
+        return res
+
+    def query(self, name: str, arch: str) -> list[RepoPackage]:
+        """All packages with the ``name`` and ``arch``, sorted by ascending
+        version.
+
+        """
+        return self._by_name_arch.get((name, arch), [])
+
+    def latest(self, name: str, arch: str) -> RepoPackage | None:
+        """The package with the ``name`` and ``arch`` and the highest version
+        or ``None`` if no such package exists.
+
+        """
+        return pkgs[-1] if (pkgs := self.query(name, arch)) else None
+
+    def url(self, pkg: RepoPackage) -> str:
+        """Full url of the rpm of ``pkg``."""
+        return urljoin(self.baseurl, pkg.location)
+
+    @staticmethod
+    def load(
+        baseurl: str,
+        repodata_dir: str | None = None,
+        cache_dir: str | None = None,
+    ) -> "RepositoryIndex":
+        """Load the index of the repository at ``baseurl``.
+
+        The metadata is read from the local directory ``repodata_dir`` (which
+        defaults to the value of the environment variable
+        :py:const:`REPODATA_DIR_ENVVAR_NAME`) or fetched from ``baseurl``
+        otherwise. The parsed index is cached in ``cache_dir`` and reused as
+        long as the checksum of the primary metadata is unchanged.
+
+        """
+        repodata_dir = repodata_dir or os.getenv(REPODATA_DIR_ENVVAR_NAME)
+
+        def _read(location: str) -> bytes:
+            if repodata_dir:
+                with open(
+                    os.path.join(repodata_dir, location.removeprefix("repodata/")),
+                    "rb",
+                ) as repodata_f:
+                    return repodata_f.read()
+            with urllib.request.urlopen(urljoin(baseurl, location)) as response:
+                return response.read()
+
+        checksum, primary_location = _parse_repomd(_read("repodata/repomd.xml"))
+
+        cache_file = os.path.join(
+            cache_dir or cache_path("repo-index"), f"{checksum}.json"
+        )
+        try:
+            with open(cache_file, "r") as cache_f:
+                cached = json.load(cache_f)
+            if cached["version"] == INDEX_FORMAT_VERSION:
+                LOGGER.debug("Using the cached repository index %s", cache_file)
+                return RepositoryIndex(
+                    baseurl=baseurl,
+                    checksum=checksum,
+                    packages=[RepoPackage(**pkg) for pkg in cached["packages"]],
+                )
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        primary = _read(primary_location)
+        if primary_location.endswith(".gz"):
+            primary = gzip.decompress(primary)
+
+        index = RepositoryIndex(
+            baseurl=baseurl, checksum=checksum, packages=_parse_primary(primary)
+        )
+
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "w") as cache_f:
+                json.dump(
+                    {
+                        "version": INDEX_FORMAT_VERSION,
+                        "packages": [asdict(pkg) for pkg in index.packages],
+                    },
+                    cache_f,
+                )
+        except OSError as os_err:
+            LOGGER.debug("Could not write the repository index: %s", os_err)
+
+        return index
+
+
+def _parse_repomd(repomd: bytes) -> tuple[str, str]:
+    """Returns the checksum and the location of the primary metadata from
+    :file:`repomd.xml`.
+
+    """
+    for data in ET.fromstring(repomd).iter(f"{_REPO_NS}data"):
+        if data.get("type") != "primary":
+            continue
+        checksum = data.find(f"{_REPO_NS}checksum")
+        location = data.find(f"{_REPO_NS}location")
+        if checksum is not None and checksum.text and location is not None:
+            return checksum.text.strip(), location.attrib["href"]
+
+    raise ValueError("repomd.xml contains no primary metadata")
+
+
+def _parse_primary(primary: bytes) -> list[RepoPackage]:
+    packages = []
+    for pkg in ET.fromstring(primary).iter(f"{_COMMON_NS}package"):
+        if pkg.get("type") != "rpm":
+            continue
+        version = pkg.find(f"{_COMMON_NS}version")
+        location = pkg.find(f"{_COMMON_NS}location")
+        assert version is not None and location is not None
+        packages.append(
+            RepoPackage(
+                name=pkg.findtext(f"{_COMMON_NS}name", ""),
+                arch=pkg.findtext(f"{_COMMON_NS}arch", ""),
+                epoch=int(version.get("epoch") or 0),
+                version=version.attrib["ver"],
+                release=version.attrib["rel"],
+                location=location.attrib["href"],
+            )
+        )
+    return packages
@@ -1,20 +1,19 @@
 import logging
 from dataclasses import dataclass
 from dataclasses import field
-from functools import cmp_to_key
 from os.path import basename
 from typing import ClassVar
 from typing import Literal
 from urllib.parse import urlparse
 
-import dnf
-from jinja2 import Template
-
 from bci_build.logger import LOGGER
 from bci_build.package import CAN_BE_LATEST_OS_VERSION
 from bci_build.package import LanguageStackContainer
 from bci_build.package import OsVersion
 from bci_build.package import generate_disk_size_constraints
+from bci_build.templates import register_template
+from dotnet.repo_index import RepoPackage
+from dotnet.repo_index import RepositoryIndex
 from staging.build_result import Arch
 
 MS_ASC = """-----BEGIN PGP PUBLIC KEY BLOCK-----
@@ -68,7 +67,8 @@ SOFTWARE.
 """
 
 
-README_MD_TEMPLATE = Template(
+README_MD_TEMPLATE = register_template(
+    "dotnet/README.md",
     """# {{ image.title }}
 
 The .NET packages contained in this image come from a 3rd-party repository:
@@ -77,10 +77,11 @@ The .NET packages contained in this image come from a 3rd-party repository:
 You can find the respective source code in
 [github.com/dotnet](https://github.com/dotnet). SUSE doesn't provide any support
 or warranties.
-"""
+""",
 )
 
-CUSTOM_END_TEMPLATE = Template(
+CUSTOM_END_TEMPLATE = register_template(
+    "dotnet/custom_end",
     """{% if image.is_sdk %}# telemetry opt out: https://docs.microsoft.com/en-us/dotnet/core/tools/telemetry#how-to-opt-out
 ENV DOTNET_CLI_TELEMETRY_OPTOUT=1{% endif %}
 
@@ -112,7 +113,7 @@ RUN useradd --uid=$APP_UID -U -d /app -G '' -ms /bin/bash app
 WORKDIR /app
 EXPOSE 8080
 {% endif %}
-"""
+""",
 )
 
 
@@ -131,10 +132,12 @@ class RpmPackage(Package):
     url: str
 
     @staticmethod
-    def from_dnf_package(pkg: dnf.package.Package, arch: Arch) -> "RpmPackage":
+    def from_repo_package(
+        pkg: RepoPackage, index: RepositoryIndex, arch: Arch
+    ) -> "RpmPackage":
         return RpmPackage(
             arch=arch,
-            url=(url := pkg.remote_location()),
+            url=(url := index.url(pkg)),
             version=pkg.version,
             name=basename(urlparse(url).path),
         )
@@ -153,8 +156,8 @@ class DotNetBCI(LanguageStackContainer):
 
     package_list: list[str | Package] | list[str] = field(default_factory=list)
 
-    _base: ClassVar[dnf.Base | None] = None
-    _sle_bci_base: ClassVar[dict[OsVersion, dict[Arch, dnf.Base]]] = {}
+    #: index of the Microsoft repository, shared by all .Net images
+    _index: ClassVar[RepositoryIndex | None] = None
 
     _logger: ClassVar[logging.Logger] = LOGGER
 
@@ -189,7 +192,7 @@ class DotNetBCI(LanguageStackContainer):
         Returns:
             list of :py:class:`RpmPackage` representing the downloaded rpms, one for each architecture
         """
-        assert self._base and self.exclusive_arch
+        assert DotNetBCI._index and self.exclusive_arch
         pkgs = []
         pkg_name = str(pkg)
 
@@ -197,18 +200,18 @@ class DotNetBCI(LanguageStackContainer):
             if isinstance(pkg, Package) and pkg.arch != arch:
                 continue
 
-            pkgs_for_arch = list(
-                DotNetBCI._base.sack.query()
-                .available()
-                .filter(name=pkg_name, latest=True, arch=str(arch))
-            )
-            self._logger.debug("Found package %s: %s", pkg_name, pkgs_for_arch)
-            if len(pkgs_for_arch) != 1:
+            latest = DotNetBCI._index.latest(pkg_name, str(arch))
+            self._logger.debug("Found package %s: %s", pkg_name, latest)
+            if not latest:
                 raise RuntimeError(
-                    f"Repository contains {len(pkgs_for_arch)} packages with name='{pkg_name}' for {str(arch)}"
+                    f"Repository contains no packages with name='{pkg_name}' for {str(arch)}"
                 )
 
-            pkgs.append(RpmPackage.from_dnf_package(pkg=pkgs_for_arch[0], arch=arch))
+            pkgs.append(
+                RpmPackage.from_repo_package(
+                    pkg=latest, index=DotNetBCI._index, arch=arch
+                )
+            )
 
         if isinstance(pkg, str):
             assert len(pkgs) == len(
@@ -231,14 +234,11 @@ class DotNetBCI(LanguageStackContainer):
         Returns:
             list of :py:class:`RpmPackage` representing the downloaded rpm
         """
-        assert self._base and self.exclusive_arch
+        assert DotNetBCI._index and self.exclusive_arch
         pkgs = []
         for arch in self.exclusive_arch:
-            pkgs_per_arch = list(
-                DotNetBCI._base.sack.query()
-                .available()
-                .filter(name="dotnet-host", arch=str(arch))
-            )
+            # sorted by ascending version
+            pkgs_per_arch = DotNetBCI._index.query("dotnet-host", str(arch))
             matching_pkg = [
                 pkg
                 for pkg in pkgs_per_arch
@@ -249,11 +249,11 @@ class DotNetBCI(LanguageStackContainer):
                 self.version,
                 matching_pkg,
             )
-            latest_pkg = sorted(
-                matching_pkg, key=cmp_to_key(lambda p1, p2: p1.evr_cmp(p2))
-            )[-1]
+            latest_pkg = matching_pkg[-1]
             self._logger.debug("latest package versions: %s", latest_pkg)
-            pkgs.append(RpmPackage.from_dnf_package(latest_pkg, arch))
+            pkgs.append(
+                RpmPackage.from_repo_package(latest_pkg, DotNetBCI._index, arch)
+            )
 
         return pkgs
 
@@ -302,14 +302,8 @@ class DotNetBCI(LanguageStackContainer):
 
     def generate_custom_end(self) -> None:
         assert self.package_list
-        if not DotNetBCI._base:
-            DotNetBCI._base = dnf.Base()
-            DotNetBCI._base.repos.add_new_repo(
-                repoid="packages-microsoft-com-prod",
-                conf=DotNetBCI._base.conf,
-                baseurl=(MS_REPO_BASEURL,),
-            )
-            DotNetBCI._base.fill_sack()
+        if not DotNetBCI._index:
+            DotNetBCI._index = RepositoryIndex.load(MS_REPO_BASEURL)
 
         pkgs = self._fetch_packages()
 
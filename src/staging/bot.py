@@ -1,14 +1,11 @@
 import asyncio
-import itertools
 import os
 import random
 import string
-import tempfile
+import time
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass
 from dataclasses import field
-from datetime import datetime
-from datetime import timedelta
 from functools import reduce
 from typing import Callable
 from typing import ClassVar
@@ -19,27 +16,41 @@ from typing import Literal
 from typing import TypedDict
 
 import aiofiles.os
-import aiofiles.tempfile
 import aiohttp
 import git
-from obs_package_update.util import CommandError
 from obs_package_update.util import CommandResult
 from obs_package_update.util import RunCommand
 from obs_package_update.util import retry_async_run_cmd
 
+from bci_build.image_graph import ImageGraph
 from bci_build.logger import LOGGER
 from bci_build.package import ALL_CONTAINER_IMAGE_NAMES
 from bci_build.package import BaseContainerImage
 from bci_build.package import OsVersion
+from bci_build.package_index import PackageIndex
 from dotnet.updater import DOTNET_IMAGES
 from dotnet.updater import DotNetBCI
+from staging.build_history import BuildHistory
+from staging.build_history import render_statistics_as_markdown
 from staging.build_result import Arch
-from staging.build_result import PackageBuildResult
 from staging.build_result import PackageStatusCode
 from staging.build_result import RepositoryBuildResult
+from staging.change_classifier import ChangeKind
+from staging.change_classifier import classify_files
+from staging.config_cache import ConfigCache
+from staging.git_history import CommitGraph
+from staging.git_tree import CommitBuilder
+from staging.git_tree import DirectoryChanges
+from staging.obs import ObsClient
+from staging.tracing import TracedCommand
+from staging.tracing import Tracer
+from staging.tracing import traced
 from staging.user import User
-from staging.util import ensure_absent
 from staging.util import get_obs_project_url
+from staging.watcher import BuildResultWatcher
+from staging.watcher import PackageStateChange
+from staging.watcher import ServiceWaiter
+from staging.worktree import WorktreePool
 
 _CONFIG_T = Literal["meta", "prjconf"]
 _CONF_TO_ROUTE: dict[_CONFIG_T, str] = {"meta": "_meta", "prjconf": "_config"}
@@ -52,10 +63,10 @@ OSC_USER_ENVVAR_NAME = "OSC_USER"
 
 BRANCH_NAME_ENVVAR_NAME = "BRANCH_NAME"
 
-OS_VERSION_ENVVAR_NAME = "OS_VERSION"
+#: command to add an entry to a :file:`.changes` file (from ``obs-build``)
+VC_CMD = "/usr/lib/build/vc"
 
-#: environment variable from which the password of the bot's user is taken
-OSC_PASSWORD_ENVVAR_NAME = "OSC_PASSWORD"
+OS_VERSION_ENVVAR_NAME = "OS_VERSION"
 
 _GIT_COMMIT_ENV = {
     "GIT_COMMITTER_NAME": "SUSE Update Bot",
@@ -88,17 +99,23 @@ def _get_bci_project_name(os_version: OsVersion) -> str:
     return f"devel:BCI:{prj_suffix}"
 
 
-async def _fetch_bci_devel_project_config(
-    os_version: OsVersion, config_type: _CONFIG_T = "prjconf"
-) -> str:
-    """Fetches the prjconf for the specified ``os_version``"""
-    prj_name = _get_bci_project_name(os_version)
+def _get_pkg_meta(bci_pkg: BaseContainerImage, git_branch_name: str) -> ET.Element:
+    """Create the package ``_meta`` of ``bci_pkg`` so that the package is synced
+    from the git branch ``git_branch_name``.
+
+    """
+    (pkg_conf := ET.Element("package")).attrib["name"] = bci_pkg.package_name
+
+    (title := ET.Element("title")).text = bci_pkg.title
+    (descr := ET.Element("description")).text = bci_pkg.description
+    (
+        scmsync := ET.Element("scmsync")
+    ).text = f"https://github.com/SUSE/bci-dockerfile-generator?subdir={bci_pkg.package_name}#{git_branch_name}"
 
-    route = f"https://api.opensuse.org/public/source/{prj_name}/{_CONF_TO_ROUTE[config_type]}"
+    for elem in (title, descr, scmsync):
+        pkg_conf.append(elem)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(route) as response:
-            return await response.text()
+    return pkg_conf
 
 
 class _ProjectConfigs(TypedDict):
@@ -111,10 +128,9 @@ class StagingBot:
     """Bot that creates a staging project for the BCI images in the Open Build
     Service via the git scm bridge.
 
-    This bot creates a new worktree based on the "deployment branch" (see
-    :py:attr:`deployment_branch_name`) and writes all build recipes into it. If
-    this results in a change, then the changes are committed and pushed to
-    github.
+    This bot renders all build recipes on top of the "deployment branch" (see
+    :py:attr:`deployment_branch_name`) and commits them directly into git. If
+    this results in a change, then the commit is pushed to github.
 
     A new staging project with the name :py:attr:`staging_project_name` is then
     created where all packages that were **changed** are inserted via the scm
@@ -132,12 +148,10 @@ class StagingBot:
 
     The bot supports running all actions as a user that is not configured in
     :command:`osc`'s configuration file. All you have to do is to set the
-    environment variable :py:const:`OSC_PASSWORD_ENVVAR_NAME` to the password of
-    the user that is going to be used. The :py:meth:`setup` function will then
-    create a temporary configuration file for :command:`osc` and also set
-    ``XDG_STATE_HOME`` to a temporary directory so that your local osc
-    :file:`cookiejar` is not modified. Both files are cleaned up via
-    :py:meth:`teardown`
+    environment variable :py:const:`~staging.obs.OSC_PASSWORD_ENVVAR_NAME` to
+    the password of the user that is going to be used, see
+    :py:meth:`~staging.obs.ObsClient.from_env`. The password is only kept in
+    memory and your local osc :file:`cookiejar` is not modified.
 
     """
 
@@ -159,9 +173,9 @@ class StagingBot:
 
     _packages: list[str] | None = None
 
-    _osc_conf_file: str = ""
-
-    _xdg_state_home_dir: tempfile.TemporaryDirectory | None = None
+    #: name of the environment file written by this bot, defaults to
+    #: :py:attr:`DOTENV_FILE_NAME`
+    _dotenv_file_name: str = ""
 
     #: Maximum time to wait for a build to finish.
     #: github actions will run for 6h at most, no point in waiting longer
@@ -170,7 +184,27 @@ class StagingBot:
     #: filename of the environment file used to store the bot's settings
     DOTENV_FILE_NAME: ClassVar[str] = "test-build.env"
 
-    _run_cmd: RunCommand = field(default_factory=lambda: RunCommand(logger=LOGGER))
+    _run_cmd: TracedCommand = field(
+        default_factory=lambda: TracedCommand(RunCommand(logger=LOGGER))
+    )
+
+    _obs: ObsClient = field(default_factory=ObsClient, compare=False, repr=False)
+
+    _commit_graph: CommitGraph = field(
+        default_factory=CommitGraph, compare=False, repr=False
+    )
+
+    _worktrees: WorktreePool = field(
+        default_factory=WorktreePool, compare=False, repr=False
+    )
+
+    _configs: ConfigCache = field(
+        default_factory=ConfigCache, compare=False, repr=False
+    )
+
+    _history: BuildHistory = field(
+        default_factory=BuildHistory, compare=False, repr=False
+    )
 
     def __post_init__(self) -> None:
         if not self.branch_name:
@@ -191,10 +225,22 @@ class StagingBot:
         instance.
 
         """
-        all_bcis = list(ALL_CONTAINER_IMAGE_NAMES.values()) + DOTNET_IMAGES
+        all_bcis = [
+            ALL_CONTAINER_IMAGE_NAMES[key]
+            for key, factory in ALL_CONTAINER_IMAGE_NAMES.factories.items()
+            if factory.os_version == self.os_version
+        ] + DOTNET_IMAGES
         all_bcis.sort(key=lambda bci: bci.uid)
         return (bci for bci in all_bcis if bci.os_version == self.os_version)
 
+    @property
+    def image_graph(self) -> ImageGraph:
+        """Derivation graph of all images of this bot's
+        :py:attr:`~StagingBot.os_version`.
+
+        """
+        return ImageGraph(self._bcis)
+
     def _generate_project_name(self, prefix: str) -> str:
         assert self.osc_username
         res = f"home:{self.osc_username}:{prefix}:"
@@ -496,30 +542,16 @@ jobs:
 """
         )
 
-    async def setup(self) -> None:
-        if pw := os.getenv(OSC_PASSWORD_ENVVAR_NAME):
-            osc_conf = tempfile.NamedTemporaryFile("w", delete=False)
-            osc_conf.write(
-                f"""[general]
-apiurl = https://api.opensuse.org
-[https://api.opensuse.org]
-user = {self.osc_username}
-pass = {pw}
-aliases = obs
-"""
-            )
-            osc_conf.flush()
-            self._osc_conf_file = osc_conf.name
+    async def setup(self, write_env_file: bool = True) -> None:
+        self._obs = ObsClient.from_env(self.osc_username)
 
-            self._xdg_state_home_dir = tempfile.TemporaryDirectory()
-            self._run_cmd = RunCommand(
-                logger=LOGGER, env={"XDG_STATE_HOME": self._xdg_state_home_dir.name}
-            )
-
-        await self.write_env_file()
+        if write_env_file:
+            await self.write_env_file()
 
     async def write_env_file(self):
-        async with aiofiles.open(self.DOTENV_FILE_NAME, "w") as dot_env:
+        async with aiofiles.open(
+            self._dotenv_file_name or self.DOTENV_FILE_NAME, "w"
+        ) as dot_env:
             await dot_env.write(
                 f"""{BRANCH_NAME_ENVVAR_NAME}={self.branch_name}
 {OS_VERSION_ENVVAR_NAME}={self.os_version}
@@ -538,34 +570,24 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         repository itself is left untouched).
 
         """
-        if self._osc_conf_file:
-            await aiofiles.os.remove(self._osc_conf_file)
-
-            assert self._xdg_state_home_dir is not None
+        await self._obs.close()
+        self._history.close()
 
-            tasks = []
-            for suffix in ("", ".lock"):
-                tasks.append(
-                    ensure_absent(
-                        os.path.join(
-                            self._xdg_state_home_dir.name, "osc", f"cookiejar{suffix}"
-                        )
-                    )
-                )
-            await asyncio.gather(*tasks)
-            await ensure_absent(os.path.join(self._xdg_state_home_dir.name, "osc"))
-            self._xdg_state_home_dir.cleanup()
+    async def _fetch_bci_devel_project_config(
+        self, config_type: _CONFIG_T = "prjconf"
+    ) -> str:
+        """Fetches the ``meta`` or ``prjconf`` of the development project of
+        this :py:attr:`~StagingBot.os_version`.
 
-    @property
-    def _osc(self) -> str:
-        """command to invoke osc (may include a CLI flag for the custom config file)"""
-        return (
-            "osc" if not self._osc_conf_file else f"osc --config={self._osc_conf_file}"
+        """
+        prj_name = _get_bci_project_name(self.os_version)
+        return await self._configs.get(
+            self._obs, f"/public/source/{prj_name}/{_CONF_TO_ROUTE[config_type]}"
         )
 
     async def _generate_test_project_meta(self, target_project_name: str) -> ET.Element:
         bci_devel_meta = ET.fromstring(
-            await _fetch_bci_devel_project_config(self.os_version, "meta")
+            await self._fetch_bci_devel_project_config("meta")
         )
 
         # write the same project meta as devel:BCI, but replace the 'devel:BCI:*'
@@ -641,19 +663,9 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         ``target_project_name`` to the config ``prj_meta``.
 
         """
-        async with aiofiles.tempfile.NamedTemporaryFile(mode="wb") as tmp_meta:
-            await tmp_meta.write(ET.tostring(prj_meta))
-            await tmp_meta.flush()
-
-            async def _send_prj_meta():
-                await self._run_cmd(
-                    f"{self._osc} meta prj --file={tmp_meta.name} {target_project_name}"
-                )
-
-            # obs sometimes dies setting the project meta with SQL errors 🤯
-            # so we just try again…
-            await retry_async_run_cmd(_send_prj_meta)
+        await self._obs.put_meta(ET.tostring(prj_meta), target_project_name)
 
+    @traced
     async def write_cr_project_config(self) -> None:
         """Send the configuration of the continuous rebuild project to OBS.
 
@@ -670,6 +682,7 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         meta.append(scmsync)
         await self._send_prj_meta(self.continuous_rebuild_project_name, meta)
 
+    @traced
     async def write_staging_project_configs(self) -> None:
         """Submit the ``prjconf`` and ``meta`` to the test project on OBS.
 
@@ -689,9 +702,7 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         confs: _ProjectConfigs = {}
 
         async def _fetch_prjconf():
-            confs["prjconf"] = await _fetch_bci_devel_project_config(
-                self.os_version, "prjconf"
-            )
+            confs["prjconf"] = await self._fetch_bci_devel_project_config("prjconf")
 
         async def _fetch_prj():
             confs["meta"] = await self._generate_test_project_meta(
@@ -705,20 +716,9 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         # written before the project exists, which fails
         await self._send_prj_meta(self.staging_project_name, confs["meta"])
 
-        async with aiofiles.tempfile.NamedTemporaryFile(mode="w") as tmp_prjconf:
-            await tmp_prjconf.write(confs["prjconf"])
-            await tmp_prjconf.flush()
-            await self._run_cmd(
-                f"{self._osc} meta prjconf --file={tmp_prjconf.name} {self.staging_project_name}"
-            )
-
-    def _osc_fetch_results_cmd(self, extra_osc_flags: str = "") -> str:
-        return (
-            f"{self._osc} results --xml {extra_osc_flags} "
-            + " ".join("--repo=" + repo_name for repo_name in self.repositories)
-            + f" {self.staging_project_name}"
-        )
+        await self._obs.put_prjconf(self.staging_project_name, confs["prjconf"])
 
+    @traced
     async def remote_cleanup(
         self, branches: bool = True, obs_project: bool = True
     ) -> None:
@@ -738,52 +738,31 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         """
 
         async def remove_branch():
-            await self._run_cmd(
-                f"git branch -D {self.branch_name}", raise_on_error=False
-            )
-            await self._run_cmd(
-                f"git push origin -d {self.branch_name}", raise_on_error=False
-            )
+            async with self._worktrees.repository_lock:
+                await self._run_cmd(
+                    f"git branch -D {self.branch_name}", raise_on_error=False
+                )
+                await self._run_cmd(
+                    f"git push origin -d {self.branch_name}", raise_on_error=False
+                )
+
+        async def remove_project():
+            try:
+                await self._obs.delete_project(
+                    self.staging_project_name, comment="cleanup"
+                )
+            except aiohttp.ClientError as err:
+                LOGGER.debug("Failed to remove %s: %s", self.staging_project_name, err)
 
         tasks = []
         if branches:
             tasks.append(remove_branch())
         if obs_project:
-            tasks.append(
-                self._run_cmd(
-                    f"{self._osc} rdelete -m 'cleanup' --recursive --force {self.staging_project_name}",
-                    raise_on_error=False,
-                )
-            )
+            tasks.append(remove_project())
 
         await asyncio.gather(*tasks)
 
-    async def _write_pkg_meta(
-        self, bci_pkg: BaseContainerImage, target_obs_project: str, git_branch_name
-    ) -> None:
-        """Write the package ``_meta`` of the package with the name of the
-        ``bci_pkg`` in the ``target_obs_project`` to be synced from the git
-        branch ``git_branch_name``.
-
-        """
-        (pkg_conf := ET.Element("package")).attrib["name"] = bci_pkg.package_name
-
-        (title := ET.Element("title")).text = bci_pkg.title
-        (descr := ET.Element("description")).text = bci_pkg.description
-        (
-            scmsync := ET.Element("scmsync")
-        ).text = f"https://github.com/SUSE/bci-dockerfile-generator?subdir={bci_pkg.package_name}#{git_branch_name}"
-
-        for elem in (title, descr, scmsync):
-            pkg_conf.append(elem)
-
-        async with aiofiles.tempfile.NamedTemporaryFile(mode="w") as tmp_pkg_conf:
-            await tmp_pkg_conf.write(ET.tostring(pkg_conf).decode())
-            await tmp_pkg_conf.flush()
-            await self._run_cmd(
-                f"{self._osc} meta pkg --file={tmp_pkg_conf.name} {target_obs_project} {bci_pkg.package_name}"
-            )
-
+    @traced
     async def link_base_container_to_staging(self) -> None:
         """Links the base container for this os into
         :py:attr:`StagingBot.staging_project_name`. This function does nothing
@@ -796,10 +775,9 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
 
         prj, pkg = _get_base_image_prj_pkg(self.os_version)
 
-        await self._run_cmd(
-            f"{self._osc} linkpac {prj} {pkg} {self.staging_project_name}"
-        )
+        await self._obs.link_package(prj, pkg, self.staging_project_name)
 
+    @traced
     async def write_pkg_configs(
         self,
         packages: Iterable[BaseContainerImage],
@@ -810,6 +788,9 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         in ``packages`` to the project `target_obs_project` so that the package
         is fetched via the scm bridge from the branch `git_branch_name`.
 
+        Each package's ``_meta`` is sent only once, even if it appears multiple
+        times in ``packages``.
+
         Args:
             packages: the BCI packages that should be added
             git_branch_name: the name of the git branch from which the sources
@@ -818,58 +799,50 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
                 will be added
 
         """
-        tasks = [
-            self._write_pkg_meta(
-                bci,
-                git_branch_name=git_branch_name,
-                target_obs_project=target_obs_project,
-            )
-            for bci in packages
-        ]
-
+        pkg_metas: dict[str, bytes] = {}
         for bci in packages:
-            tasks.append(
-                self._write_pkg_meta(
-                    bci,
-                    git_branch_name=git_branch_name,
-                    target_obs_project=target_obs_project,
+            if bci.package_name not in pkg_metas:
+                pkg_metas[bci.package_name] = ET.tostring(
+                    _get_pkg_meta(bci, git_branch_name)
                 )
-            )
-
-        await asyncio.gather(*tasks)
 
-    def _get_changed_packages_by_commit(self, commit: str | git.Commit) -> list[str]:
-        git_commit = (
-            commit if isinstance(commit, git.Commit) else git.Repo(".").commit(commit)
+        # the connection pool of the client limits the number of concurrent
+        # requests
+        await asyncio.gather(
+            *(
+                self._obs.put_meta(meta, target_obs_project, pkg_name)
+                for pkg_name, meta in pkg_metas.items()
+            )
         )
 
+    def _get_changed_packages_by_commits(self, commits: list[git.Commit]) -> list[str]:
+        """Returns the names of all packages that are changed by any of the
+        ``commits`` compared to the deployment branch on the remote.
+
+        """
         bci_pkg_names = [bci.package_name for bci in self.bcis]
-        packages = []
+        packages = set()
 
-        # get the diff between the commit and the deployment branch on the remote
-        # => list of changed files
+        # get the diff between each commit and the deployment branch on the
+        # remote => list of changed files
         #    each file's first path element is the package name -> save that in
         #    `packages`
-        for diff in git_commit.diff(f"origin/{self.deployment_branch_name}"):
-            # no idea how this could happen, but in theory the diff mode can be
-            # `C` for conflict => abort if that's the case
-            assert (
-                diff.a_mode != "C" and diff.b_mode != "C"
-            ), f"diff must not be a conflict, but got {diff=}"
-
-            if (
-                (a_path := os.path.split(diff.a_path))
-                and a_path[0] in bci_pkg_names
-                and (b_path := os.path.split(diff.b_path))
-                and b_path[0] in bci_pkg_names
-            ):
-                packages.append(a_path[0])
+        for changed_paths in self._commit_graph.changed_paths(
+            commits, f"origin/{self.deployment_branch_name}"
+        ).values():
+            for a_path_str, b_path_str in changed_paths:
+                if (
+                    (a_path := os.path.split(a_path_str))
+                    and a_path[0] in bci_pkg_names
+                    and (b_path := os.path.split(b_path_str))
+                    and b_path[0] in bci_pkg_names
+                ):
+                    packages.add(a_path[0])
 
-                # account for files getting moved
-                if b_path[0] != a_path[0]:
-                    packages.append(b_path[0])
+                    # account for files getting moved
+                    packages.add(b_path[0])
 
-        res = list(set(packages))
+        res = list(packages)
 
         # it can happen that we only update a non-BCI package file,
         # e.g. .obs/workflows.yml, then we will have a commit, but the diff will
@@ -883,19 +856,43 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
         )
         return res
 
+    def _packages_with_build_changes(
+        self, changed_files: dict[str, set[str]]
+    ) -> list[str]:
+        """Returns the packages from ``changed_files`` (a mapping of package
+        names to the changed files in the package) in which at least one change
+        affects the build (see :py:func:`~staging.change_classifier.classify_files`).
+
+        """
+        bcis = {bci.package_name: bci for bci in self.bcis}
+        packages = []
+        for pkg, fnames in changed_files.items():
+            kinds = classify_files(bcis[pkg], fnames)
+            if ChangeKind.BUILD in kinds.values():
+                packages.append(pkg)
+            else:
+                LOGGER.info(
+                    "Skipping %s, only metadata changed: %s",
+                    pkg,
+                    ", ".join(sorted(fnames)),
+                )
+        return packages
+
     async def _run_git_action_in_worktree(
         self,
         new_branch_name: str,
         origin_branch_name: str,
         action: Callable[[str], Coroutine[None, None, bool]],
+        sparse_paths: list[str] | None = None,
     ) -> str | None:
         assert not origin_branch_name.startswith("origin/")
-        await self._run_cmd(
-            f"git worktree add -B {new_branch_name} {new_branch_name} origin/{origin_branch_name}"
-        )
-        worktree_dir = os.path.join(os.getcwd(), new_branch_name)
         commit = None
-        try:
+        async with self._worktrees.checkout(
+            self.deployment_branch_name,
+            new_branch_name,
+            f"origin/{origin_branch_name}",
+            sparse_paths=sparse_paths,
+        ) as worktree_dir:
             if await action(worktree_dir):
                 commit = (
                     await self._run_cmd(
@@ -904,200 +901,169 @@ PACKAGES={','.join(self.package_names) if self.package_names else None}
                 ).stdout.strip()
                 LOGGER.info("Created commit %s given the current state", commit)
 
-                await self._run_cmd(
-                    f"git pull --rebase origin {origin_branch_name}",
-                    cwd=worktree_dir,
-                    env={**_GIT_COMMIT_ENV, **os.environ},
-                )
-                await self._run_cmd(
-                    "git push --force-with-lease origin HEAD", cwd=worktree_dir
-                )
-
-        finally:
-            await self._run_cmd(f"git worktree remove --force {new_branch_name}")
+                async with self._worktrees.repository_lock:
+                    await self._run_cmd(
+                        f"git pull --rebase origin {origin_branch_name}",
+                        cwd=worktree_dir,
+                        env={**_GIT_COMMIT_ENV, **os.environ},
+                    )
+                    await self._run_cmd(
+                        "git push --force-with-lease origin HEAD", cwd=worktree_dir
+                    )
 
         return commit
 
+    @traced
     async def write_all_build_recipes_to_branch(
         self, commit_msg: str = ""
     ) -> str | None:
-        """Creates a worktree for the branch based on the deployment branch of
-        this :py:attr:`~StagingBot.os_version`, writes all image build recipes
-        into it, commits and then pushes the changes. Afterwards the worktree is
-        removed.
+        """Creates a commit with all image build recipes on top of the
+        deployment branch of this :py:attr:`~StagingBot.os_version` and pushes
+        it to the branch :py:attr:`branch_name`.
+
+        The commit is created directly in git's object database, no worktree is
+        checked out. Packages that are no longer generated are removed.
 
         Returns:
             The hash of the commit including all changes by the writing the
-            build recipes into the worktree. If no changes were made, then
-            ``None`` is returned.
+            build recipes. If no changes were made, then ``None`` is returned.
 
         """
+        return (
+            res[0]
+            if (res := await self._write_all_build_recipes_to_branch(commit_msg))
+            else None
+        )
 
-        async def _write_build_recipes_in_worktree(worktree_dir: str) -> bool:
-            written_files = await self.write_all_image_build_recipes(worktree_dir)
-
-            run_in_worktree = RunCommand(cwd=worktree_dir, logger=LOGGER)
-
-            # find all packages that are committed into the deployment branch,
-            # but are no longer generated by the dockerfile generator
-            # => i.e. they are orphaned and should be removed
-            packages_to_delete = []
-            expected_bci_pkg_names = set(bci.package_name for bci in self.bcis)
-
-            for dirname in os.listdir(worktree_dir):
-                if (
-                    # hidden files or directories are e.g. .git, .github and .obs, they belong there
-                    # as well as _config
-                    dirname[0] not in (".", "_")
-                    and dirname not in expected_bci_pkg_names
-                ):
-                    packages_to_delete.append(dirname)
-
-            if packages_to_delete:
-                await run_in_worktree("git rm -r " + " ".join(packages_to_delete))
-
-            worktree = git.Repo(worktree_dir)
-            # no changes => nothing to do & bail
-            # note: diff only checks for changes to *existing* packages, but not
-            # if anything new got added => need to check if the repo is dirty
-            # for that (= is there any output with `git status`) or there any
-            # untracked files
-            if (
-                not worktree.head.commit.diff()
-                and not worktree.is_dirty()
-                and not worktree.untracked_files
-            ):
-                LOGGER.info("Writing all build recipes resulted in no changes")
-                return False
-
-            await run_in_worktree("git add " + " ".join(written_files))
-            await run_in_worktree(
-                f"git commit -m '{commit_msg or 'Test build'}'",
-                env={**_GIT_COMMIT_ENV, **os.environ},
-            )
-            return True
+    async def _write_all_build_recipes_to_branch(
+        self, commit_msg: str
+    ) -> tuple[str, dict[str, DirectoryChanges]] | None:
+        """Implementation of :py:meth:`write_all_build_recipes_to_branch`,
+        which additionally returns the files of each package that differ from
+        the deployment branch on the remote. Packages without changes are
+        omitted.
 
+        """
         # we do not want to overwrite any existing changes from the origin which
         # could have been pushed there already
 
         # is there a origin/self.branch_name?
         branch_commit_hash_on_remote: str | None = None
         try:
-            branch_commit_hash_on_remote = (
-                git.Repo(".").commit(f"origin/{self.branch_name}").hexsha
-            )
+            branch_commit_hash_on_remote = self._commit_graph.repo.commit(
+                f"origin/{self.branch_name}"
+            ).hexsha
         except git.BadName:
             pass
 
         # yes => check if it is newer than the deployment branch
         commit_range = None
         if branch_commit_hash_on_remote:
-            try:
-                commit_range = self._get_commit_range_between_refs(
-                    branch_commit_hash_on_remote,
-                    f"origin/{self.deployment_branch_name}",
-                )
-            except RecursionError:
-                pass
+            commit_range = self._get_commit_range_between_refs(
+                branch_commit_hash_on_remote,
+                f"origin/{self.deployment_branch_name}",
+            )
 
         # it is newer? => base our work on origin/branch_name and not the
         # deployment_branch
         origin_branch = (
             self.deployment_branch_name if not commit_range else self.branch_name
         )
-        return await self._run_git_action_in_worktree(
-            self.branch_name,
-            origin_branch,
-            _write_build_recipes_in_worktree,
-        )
 
-    async def write_all_image_build_recipes(
-        self, destination_prj_folder: str
-    ) -> list[str]:
-        """Writes all build recipes into the folder
-        :file:`destination_prj_folder` and returns a list of files that were
-        written.
+        files = await self.render_all_build_recipes()
 
-        Returns:
-            A list of all files that were written to
-            :file:`destination_prj_folder`. The files are listed relative to
-            :file:`destination_prj_folder` and don't contain any leading path
-            components.
-
-        """
-        tasks: list[Coroutine[None, None, list[str]]] = []
-
-        await aiofiles.os.makedirs(destination_prj_folder, exist_ok=True)
-
-        for bci in self.bcis:
-
-            async def write_files(bci_pkg: BaseContainerImage, dest: str) -> list[str]:
-                await aiofiles.os.makedirs(dest, exist_ok=True)
-
-                # remove everything *but* the changes file (.changes is not
-                # autogenerated) so that we properly remove files that were dropped
-                to_remove = []
-                for fname in await aiofiles.os.listdir(dest):
-                    if fname == f"{bci_pkg.package_name}.changes":
-                        continue
-                    to_remove.append(aiofiles.os.remove(os.path.join(dest, fname)))
-
-                await asyncio.gather(*to_remove)
+        # base the commit on the current state of the origin, this is what
+        # `git pull --rebase` did when the commit was created in a worktree
+        async with self._worktrees.repository_lock:
+            await self._run_cmd(f"git fetch origin {origin_branch}")
+        builder = CommitBuilder(
+            self._commit_graph.repo,
+            f"origin/{origin_branch}",
+            changes_base_ref=f"origin/{self.deployment_branch_name}",
+        )
 
-                if isinstance(bci_pkg, DotNetBCI):
-                    bci_pkg.generate_custom_end()
+        # find all packages that are committed into the deployment branch,
+        # but are no longer generated by the dockerfile generator
+        # => i.e. they are orphaned and should be removed
+        expected_bci_pkg_names = set(bci.package_name for bci in self.bcis)
+        for name in builder.entries():
+            if (
+                # hidden files or directories are e.g. .git, .github and .obs,
+                # they belong there as well as _config
+                name[0] not in (".", "_") and name not in expected_bci_pkg_names
+            ):
+                builder.remove(name)
+
+        # replace everything *but* the changes file (.changes is not
+        # autogenerated) so that we properly remove files that were dropped
+        changes: dict[str, DirectoryChanges] = {}
+        for pkg_name in expected_bci_pkg_names:
+            prefix = f"{pkg_name}/"
+            if pkg_changes := builder.replace_directory(
+                pkg_name,
+                {
+                    path[len(prefix) :]: contents
+                    for path, contents in files.items()
+                    if path.startswith(prefix)
+                },
+                keep=(f"{pkg_name}.changes",),
+            ):
+                changes[pkg_name] = pkg_changes
+        for path, contents in files.items():
+            if path.split("/")[0] not in expected_bci_pkg_names:
+                builder.write_file(path, contents)
+
+        env = {**_GIT_COMMIT_ENV, **os.environ}
+        if not (
+            commit := builder.commit(
+                commit_msg or "Test build",
+                committer=git.Actor(
+                    env["GIT_COMMITTER_NAME"], env["GIT_COMMITTER_EMAIL"]
+                ),
+            )
+        ):
+            LOGGER.info("Writing all build recipes resulted in no changes")
+            return None
 
-                async def write_readme() -> str:
-                    async with aiofiles.open(
-                        os.path.join(destination_prj_folder, bci_pkg.readme_path), "w"
-                    ) as readme_md_f:
-                        await readme_md_f.write(bci_pkg.readme)
-                    return bci_pkg.readme_path
+        LOGGER.info("Created commit %s given the current state", commit.hexsha)
+        async with self._worktrees.repository_lock:
+            await self._run_cmd(
+                f"git push --force-with-lease=refs/heads/{self.branch_name} "
+                f"origin {commit.hexsha}:refs/heads/{self.branch_name}"
+            )
+        return commit.hexsha, changes
 
-                return [
-                    f"{bci_pkg.package_name}/{fname}"
-                    for fname in await bci_pkg.write_files_to_folder(dest)
-                ] + [await write_readme()]
+    @traced
+    async def render_all_build_recipes(self) -> dict[str, str | bytes]:
+        """Renders the build recipes of all images and the additional files of
+        the deployment branch (e.g. the project configuration and the github
+        workflows).
 
-            img_dest_dir = os.path.join(destination_prj_folder, bci.package_name)
-            tasks.append(write_files(bci, img_dest_dir))
+        Returns:
+            A dictionary mapping the path of each file relative to the root of
+            the deployment branch to its contents. The initial changelogs of
+            the images are included and must only be used if an image has no
+            changelog yet.
 
-        async def write_obs_workflows_yml() -> list[str]:
-            await aiofiles.os.makedirs(
-                (dot_obs := os.path.join(destination_prj_folder, ".obs")), exist_ok=True
-            )
-            async with aiofiles.open(
-                os.path.join(dot_obs, "workflows.yml"), "w"
-            ) as workflows_file:
-                await workflows_file.write(self.obs_workflows_yml)
-            return [".obs/workflows.yml"]
-
-        async def write_github_actions() -> list[str]:
-            await aiofiles.os.makedirs(
-                (
-                    github_workflows := os.path.join(
-                        destination_prj_folder, ".github", "workflows"
-                    )
-                ),
-                exist_ok=True,
-            )
+        """
+        files: dict[str, str | bytes] = {}
 
-            actions = []
-            for fname, contents in (
-                ("changelog_checker.yml", self.changelog_check_github_action),
-                ("find-missing-packages.yml", self.find_missing_packages_action),
-            ):
-                async with aiofiles.open(
-                    os.path.join(github_workflows, fname), "w"
-                ) as workflows_file:
-                    await workflows_file.write(contents)
-                actions.append(fname)
-
-            async with aiofiles.open(
-                os.path.join(destination_prj_folder, ".github", "dependabot.yml"), "w"
-            ) as dependabot_yml:
-                await dependabot_yml.write(
-                    """---
+        for bci in self.bcis:
+            if isinstance(bci, DotNetBCI):
+                bci.generate_custom_end()
+            for fname, contents in bci.render_files().items():
+                files[f"{bci.package_name}/{fname}"] = contents
+            files[bci.readme_path] = bci.readme
+
+        files[".obs/workflows.yml"] = self.obs_workflows_yml
+        files["_config"] = await self._fetch_bci_devel_project_config("prjconf")
+        files[".github/workflows/changelog_checker.yml"] = (
+            self.changelog_check_github_action
+        )
+        files[".github/workflows/find-missing-packages.yml"] = (
+            self.find_missing_packages_action
+        )
+        files[".github/dependabot.yml"] = """---
 version: 2
 updates:
   - package-ecosystem: "github-actions"
@@ -1105,58 +1071,153 @@ updates:
     schedule:
       interval: "daily"
 """
-                )
+        return files
 
-            return [f".github/workflows/{fname}" for fname in actions] + [
-                ".github/dependabot.yml"
-            ]
+    @traced
+    async def fetch_build_results(self) -> list[RepositoryBuildResult]:
+        """Retrieves the current build results of the staging project."""
+        build_results, _ = await self._obs.results(
+            self.staging_project_name, self.repositories
+        )
+        return build_results
 
-        async def write_underscore_config() -> list[str]:
-            prjconf = await _fetch_bci_devel_project_config(self.os_version, "prjconf")
-            async with aiofiles.open(
-                os.path.join(destination_prj_folder, "_config"), "w"
-            ) as conf:
-                await conf.write(prjconf)
+    @traced
+    async def force_rebuild(self, packages: list[str] | None = None) -> str:
+        """Deletes the binaries of ``packages`` (defaults to all packages) in
+        the staging project on OBS and force rebuilds them. Returns a message
+        naming the rebuilt packages.
 
-            return ["_config"]
+        All ``packages`` are rebuilt with a single request. OBS resolves the
+        build order itself: the images derived from a base image in the same
+        project require the base for their build, so OBS blocks them until the
+        base has been rebuilt instead of building them on top of the old base.
 
-        tasks.append(write_obs_workflows_yml())
-        tasks.append(write_underscore_config())
-        tasks.append(write_github_actions())
+        """
+        if packages is None:
+            await self._obs.wipe_binaries(self.staging_project_name)
+            await self._obs.rebuild(self.staging_project_name)
+            return f"Rebuilding all packages in {self.staging_project_name}"
+
+        if not packages:
+            return f"No packages in {self.staging_project_name} need a rebuild"
+        await self._obs.wipe_binaries(self.staging_project_name, packages)
+        await self._obs.rebuild(self.staging_project_name, packages)
+        return f"Rebuilding {', '.join(packages)} in {self.staging_project_name}"
+
+    @traced
+    async def rebuild_images_containing(
+        self, package: str, index: PackageIndex | None = None
+    ) -> list[str]:
+        """Triggers a rebuild of all images of this bot's
+        :py:attr:`~StagingBot.os_version` in the ``devel:BCI:*`` project that
+        install ``package`` and of all images derived from them.
 
-        files = await asyncio.gather(*tasks)
-        flattened_file_list = []
-        for file_list in files:
-            flattened_file_list.extend(file_list)
-        return flattened_file_list
+        The binaries are not wiped, so that the images stay available until
+        they have been rebuilt. As in :py:meth:`force_rebuild`, OBS builds the
+        derived images after their bases.
 
-    async def fetch_build_results(self) -> list[RepositoryBuildResult]:
-        """Retrieves the current build results of the staging project."""
-        return RepositoryBuildResult.from_resultlist(
-            (await self._run_cmd(self._osc_fetch_results_cmd())).stdout
+        Args:
+            package: name of the package, e.g. ``openssl``
+            index: the index of the packages in the images, defaults to an
+                index of all images of this bot's OS version
+
+        Returns:
+            The rebuilt packages in the topological order of the
+            :py:attr:`image_graph`
+
+        """
+        if index is None:
+            index = PackageIndex(self._bcis)
+        graph = self.image_graph
+        packages = graph.static_order(
+            graph.affected_by(
+                img.package_name
+                for img in index.images_containing(package, self.os_version)
+            )
         )
+        if packages:
+            await self._obs.rebuild(_get_bci_project_name(self.os_version), packages)
+        return packages
 
-    async def force_rebuild(self) -> str:
-        """Deletes all binaries of the project on OBS and force rebuilds everything."""
-        await self._run_cmd(
-            f"{self._osc} wipebinaries --all {self.staging_project_name}"
+    @traced
+    async def get_outdated_packages(self) -> list[str]:
+        """Returns the packages in the staging project whose current sources
+        have not been built successfully in every repository & architecture
+        and all images in the staging project that are derived from them, in
+        the order in which they have to be built.
+
+        """
+        if self.package_names is None:
+            raise RuntimeError("No packages have been set yet, cannot continue")
+
+        build_res = await self.fetch_build_results()
+        source_md5s = dict(
+            zip(
+                self.package_names,
+                await asyncio.gather(
+                    *(
+                        self._obs.source_md5(self.staging_project_name, pkg)
+                        for pkg in self.package_names
+                    )
+                ),
+            )
         )
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            # call osc rebuild --all in a tempdir not in the git repo, to
-            # workaround https://github.com/openSUSE/osc/issues/1390
-            await self._run_cmd(
-                f"{self._osc} rebuild --all {self.staging_project_name}", cwd=tmp_dir
+        built_md5s = await asyncio.gather(
+            *(
+                self._obs.built_source_md5s(
+                    self.staging_project_name,
+                    repo_res.repository,
+                    str(repo_res.arch),
+                    self.package_names,
+                )
+                for repo_res in build_res
             )
-        return self._osc_fetch_results_cmd("--watch")
+        )
 
+        # packages without a build result have never been built in here
+        outdated = set(self.package_names) - {
+            pkg.name.partition(":")[0]
+            for repo_res in build_res
+            for pkg in repo_res.packages
+        }
+        for repo_res, built in zip(build_res, built_md5s):
+            for pkg in repo_res.packages:
+                name = pkg.name.partition(":")[0]
+                if (
+                    name in source_md5s
+                    and pkg.code
+                    not in (PackageStatusCode.EXCLUDED, PackageStatusCode.DISABLED)
+                    and built.get(pkg.name) != source_md5s[name]
+                ):
+                    outdated.add(name)
+
+        graph = self.image_graph
+        return graph.static_order(graph.affected_by(outdated) & set(self.package_names))
+
+    @traced
     async def scratch_build(self, commit_message: str = "") -> None | str:
+        """Commits the build recipes to the branch, sets up the staging project
+        for the packages whose build changed and triggers their builds.
+
+        Returns:
+            The hash of the pushed commit or ``None`` if nothing changed. If
+            only metadata changed, then the commit is pushed but nothing is
+            built and :py:attr:`package_names` is empty.
+
+        """
         # no commit -> no changes -> no reason to build
-        if not (commit := await self.write_all_build_recipes_to_branch(commit_message)):
+        if not (res := await self._write_all_build_recipes_to_branch(commit_message)):
             return None
 
-        self.package_names = self._get_changed_packages_by_commit(commit)
+        # packages with metadata only changes don't need a scratch build
+        commit, changes = res
+        self.package_names = self._packages_with_build_changes(
+            {pkg: pkg_changes.files for pkg, pkg_changes in changes.items()}
+        )
         if not self.package_names:
-            return None
+            LOGGER.info("%s only changes metadata, no packages need a build", commit)
+            await self.write_env_file()
+            return commit
 
         LOGGER.debug(
             "packages that were changed by %s: %s",
@@ -1172,35 +1233,49 @@ updates:
         await self.link_base_container_to_staging()
         await self._wait_for_all_pkg_service_runs()
 
-        # "encourage" OBS to rebuild, in case this project existed before
-        await asyncio.gather(self.force_rebuild(), self.write_env_file())
+        # "encourage" OBS to rebuild the packages whose sources changed since
+        # their last build, in case this project existed before
+        outdated = await self.get_outdated_packages()
+        LOGGER.debug("rebuilding the packages: %s", ", ".join(outdated))
+        await asyncio.gather(self.force_rebuild(outdated), self.write_env_file())
 
         return commit
 
+    @traced
     async def _wait_for_all_pkg_service_runs(self) -> None:
-        """Run :command:`osc service wait` for all packages in the staging
-        project.
+        """Wait for the service runs of all packages in the staging project to
+        finish.
 
         """
         if self.package_names is None:
             raise RuntimeError("No packages have been set yet, cannot continue")
-        # we wait for the service sequentially here. if we wait for all of them
-        # in parallel, we can easily grab all wait slots that obs has
-        for pkg_name in self.package_names:
-            await self._run_cmd(
-                f"{self._osc} service wait {self.staging_project_name} {pkg_name}"
-            )
+        # we poll the service state over a small pool instead of blocking in
+        # `waitservice` for every package, that could easily grab all wait
+        # slots that obs has
+        await ServiceWaiter(self._obs, self.staging_project_name).wait(
+            self.package_names
+        )
 
+    @traced
     async def wait_for_build_to_finish(
-        self, timeout_sec: int | None = None
+        self,
+        timeout_sec: int | None = None,
+        on_prediction: Callable[[float], None] | None = None,
     ) -> list[RepositoryBuildResult]:
         """Blocks until all builds in the staging project have finished and the
         repositories are no longer dirty.
 
+        All state changes of the packages are recorded in the build history,
+        from which the completion of the builds is predicted.
+
         Args:
             timeout_sec: Total time in seconds to block. Defaults to
                 :py:attr:`~StagingBot.MAX_WAIT_TIME_SEC`
 
+            on_prediction: Function that is called with the predicted
+                completion time (as a unix timestamp) whenever the prediction
+                changes by more than a minute
+
 
         Raises:
             :py:class:`asyncio.TimeoutError`: when build takes longer than the
@@ -1216,147 +1291,76 @@ updates:
 
         """
 
-        start = datetime.now()
+        def _log_change(change: PackageStateChange) -> None:
+            LOGGER.debug(
+                "%s in %s/%s: %s -> %s",
+                change.package,
+                change.repository,
+                change.arch,
+                change.old,
+                change.new,
+            )
 
-        # OBS can be sometimes a bit slow with figuring out that there are
-        # packages to be build or with starting some builds that need to fetch
-        # remote assets
-        # It will then just give us an empty list of packages for all repos if
-        # we call the `/results/` route fast enough after project setup or even
-        # worse, it will figure out that our problematic packages are excluded
-        # in some repos, but have not been added to others. I.e. we have to
-        # remove excluded packages from our list as well
-        #
-        # If that happens (=> Σ packages == 0), when we wait for 60s and try
-        # again (and repeat this up to 10 times). If OBS hasn't managed to do
-        # *anything* by then, just bail…
-        def _get_number_of_packages_with_results(
-            build_result_list: list[RepositoryBuildResult],
-        ) -> int:
-            all_pkg_results: list[PackageBuildResult] = [
-                pkg_res
-                for pkg_res in itertools.chain.from_iterable(
-                    result.packages for result in build_result_list
-                )
-                if pkg_res.code
-                not in (PackageStatusCode.EXCLUDED, PackageStatusCode.SCHEDULED)
-            ]
-            return len(all_pkg_results)
-
-        def _dirty_repos_present(
-            build_result_list: Iterable[RepositoryBuildResult],
-        ) -> bool:
-            for build_res in build_result_list:
-                if build_res.dirty:
-                    return True
-            return False
-
-        build_res: list[RepositoryBuildResult] = []
-        retries = 0
-        while True:
-
-            def is_execution_time_exceeded() -> bool:
-                return (datetime.now() - start).total_seconds() > (
-                    timeout_sec or self.MAX_WAIT_TIME_SEC
-                )
+        def _record_change(change: PackageStateChange) -> None:
+            self._history.record(self.staging_project_name, change)
 
-            # We face the problem that `osc results --watch` stops reading after
-            # a while and just does nothing until all eternity.
-            # So we instead set the timeout of the watch command to 5 minutes
-            # and thereby periodically kill it. If the time is not yet up, we
-            # jest restart the whole thing again.
-            while not is_execution_time_exceeded():
-                try:
-                    timeout = timedelta(
-                        seconds=min(
-                            5 * 60,
-                            # total timeout - elapsed seconds
-                            (timeout_sec or self.MAX_WAIT_TIME_SEC)
-                            - (datetime.now() - start).total_seconds(),
-                        )
-                    )
-                    LOGGER.debug(
-                        "will watch the repository for results for %s",
-                        timeout.total_seconds(),
-                    )
-                    await self._run_cmd(
-                        self._osc_fetch_results_cmd("--watch"), timeout=timeout
-                    )
-                    # if we got here, then osc result --watch successfully
-                    # finished
-                    break
-                except asyncio.TimeoutError:
-                    if is_execution_time_exceeded():
-                        raise
-                except CommandError as cmd_err:
-                    if (
-                        "SSL Error: (104, 'Connection reset by peer')"
-                        in cmd_err.command_result.stderr
-                    ) or (
-                        "[Errno 101] Network is unreachable"
-                        in cmd_err.command_result.stderr
-                    ):
-                        LOGGER.debug("SSL Connection to OBS broke, retrying...")
-                    else:
-                        raise
+        last_prediction: float | None = None
 
-            build_res = await self.fetch_build_results()
-            if (
-                _get_number_of_packages_with_results(build_res) == 0
-                or _dirty_repos_present(build_res)
-            ) and retries < 10:
-                LOGGER.debug(
-                    "got 0 packages with build results or a dirty repository, sleeping and retrying"
-                )
-                retries += 1
-                await asyncio.sleep(60)
-            else:
-                break
+        def _predict_completion(_changes: list[PackageStateChange]) -> None:
+            nonlocal last_prediction
+            prediction = self._history.predict_completion(watcher.results)
+            if prediction is None or (
+                last_prediction is not None and abs(prediction - last_prediction) < 60
+            ):
+                return
+            last_prediction = prediction
+            LOGGER.info(
+                "Builds in %s are predicted to finish at %s",
+                self.staging_project_name,
+                time.strftime("%H:%M:%S", time.localtime(prediction)),
+            )
+            if on_prediction:
+                on_prediction(prediction)
+
+        watcher = BuildResultWatcher(
+            self._obs,
+            self.staging_project_name,
+            self.repositories,
+            callbacks=[_log_change, _record_change],
+            poll_callbacks=[_predict_completion],
+        )
+        # OBS can be sometimes a bit slow with figuring out that there are
+        # packages to be build or with starting some builds that need to fetch
+        # remote assets. The watcher therefore keeps polling for a while if no
+        # package has a build result
+        build_res = await asyncio.wait_for(
+            watcher.wait_until_finished(),
+            timeout=timeout_sec or self.MAX_WAIT_TIME_SEC,
+        )
 
-        if _get_number_of_packages_with_results(build_res) == 0:
+        if watcher.number_of_packages_with_results == 0:
             raise RuntimeError(
                 f"{self.staging_project_name} has no packages with build results, something is broken ⚡"
             )
 
-        if _dirty_repos_present(build_res):
+        if not watcher.finished:
             raise RuntimeError(f"{self.staging_project_name} is still dirty!")
 
         return build_res
 
     async def _fetch_user(self, username: str) -> User:
-        return User.from_xml(
-            (await self._run_cmd(f"{self._osc} api /person/{username}")).stdout
-        )
+        return User.from_xml(await self._obs.person(username))
 
     def _get_commit_range_between_refs(
         self, child_ref: str, ancestor_ref: str
-    ) -> set[git.Commit] | None:
+    ) -> list[git.Commit] | None:
         """Returns all commits leading from ``child_ref`` to ``ancestor_ref``,
         **excluding** ``ancestor_ref``.
 
         """
-        repo = git.Repo(".")
-        ancestor_commit = repo.commit(ancestor_ref)
-        child_commit = repo.commit(child_ref)
-
-        def _recurse_search_for_ancestor(
-            commit: git.Commit, ancestor: git.Commit
-        ) -> list[git.Commit] | None:
-            for parent in commit.parents:
-                if parent == ancestor:
-                    return [parent]
-
-                if hist := _recurse_search_for_ancestor(parent, ancestor):
-                    return [parent] + hist
-
-            return None
-
-        commits = _recurse_search_for_ancestor(child_commit, ancestor_commit)
-        if not commits:
-            return None
-        res = set([child_commit] + commits)
-        return res - {ancestor_commit}
+        return self._commit_graph.commit_range(child_ref, ancestor_ref)
 
+    @traced
     async def add_changelog_entry(
         self, entry: str, username: str, package_names: list[str] | None
     ) -> str:
@@ -1376,11 +1380,7 @@ updates:
                     f"origin/{self.deployment_branch_name} and no package names "
                     "provided, don't know where to add a changelog."
                 )
-            package_names = []
-            for commit in commits:
-                package_names.extend(self._get_changed_packages_by_commit(commit))
-
-            package_names = list(set(package_names))
+            package_names = self._get_changed_packages_by_commits(commits)
 
         if not package_names:
             raise ValueError(
@@ -1390,17 +1390,14 @@ updates:
 
         async def _add_changelog_in_worktree(worktree_dir: str) -> bool:
             assert package_names
-            run_in_worktree = RunCommand(
-                cwd=worktree_dir,
-                logger=LOGGER,
-            )
+            run_in_worktree = TracedCommand(RunCommand(cwd=worktree_dir, logger=LOGGER))
             tasks: list[Coroutine[None, None, CommandResult]] = []
             files = []
             for package_name in package_names:
                 fname = f"{package_name}/{package_name}.changes"
                 tasks.append(
                     run_in_worktree(
-                        f'/usr/lib/build/vc -m "{entry}" {package_name}.changes',
+                        f'{VC_CMD} -m "{entry}" {package_name}.changes',
                         env={"VC_REALNAME": user.realname, "VC_MAILADDR": user.email},
                         cwd=os.path.join(worktree_dir, package_name),
                     )
@@ -1435,6 +1432,7 @@ updates:
                 new_branch_name=target_branch_name,
                 origin_branch_name=target_branch_name,
                 action=_add_changelog_in_worktree,
+                sparse_paths=package_names,
             )
         )
         assert commit
@@ -1456,21 +1454,16 @@ updates:
         if not commit_range:
             raise RuntimeError(f"{base_ref} is not an ancestor of {change_ref}!")
 
-        packages: set[str] = set()
-        for commit in commit_range:
-            packages.update(self._get_changed_packages_by_commit(commit))
-
         package_changelog_appended: dict[str, bool] = {
-            package: False for package in packages
+            package: False
+            for package in self._get_changed_packages_by_commits(commit_range)
         }
 
-        for commit in commit_range:
+        for files in self._commit_graph.file_stats(commit_range).values():
             for package_name, changelog_appended in package_changelog_appended.items():
                 if changelog_appended:
                     continue
-                if changes_entry := commit.stats.files.get(
-                    f"{package_name}/{package_name}.changes"
-                ):
+                if changes_entry := files.get(f"{package_name}/{package_name}.changes"):
                     if changes_entry["insertions"] >= changes_entry["deletions"] + 4:
                         package_changelog_appended[package_name] = True
 
@@ -1494,8 +1487,8 @@ updates:
             len(bci) == 1
         ), f"Got {len(bci)} packages with the name {package_name}: {bci}"
 
-        await self._write_pkg_meta(
-            bci[0],
+        await self.write_pkg_configs(
+            bci,
             target_obs_project=_get_bci_project_name(self.os_version),
             git_branch_name=self.deployment_branch_name,
         )
@@ -1505,22 +1498,133 @@ updates:
         deployment branch, but have not been setup on OBS.
 
         """
-        repo = git.Repo(".")
-        deployment_branch_head = repo.commit(f"origin/{self.deployment_branch_name}")
+        deployment_branch_head = self._commit_graph.repo.commit(
+            f"origin/{self.deployment_branch_name}"
+        )
         pkgs_in_deployment_branch = {
             tree.name for tree in deployment_branch_head.tree
         } - {".obs", ".github", "_config"}
         pkgs_on_obs = set(
-            (
-                await self._run_cmd(
-                    f"{self._osc} ls {_get_bci_project_name(self.os_version)}"
-                )
-            ).stdout.splitlines()
+            await self._obs.list_packages(_get_bci_project_name(self.os_version))
         )
 
         return list(pkgs_in_deployment_branch - pkgs_on_obs)
 
 
+@dataclass
+class StagingBotMatrix:
+    """Runs the scratch build pipeline of several :py:class:`StagingBot`, one
+    per OS version, concurrently in a single event loop.
+
+    All bots share the resources that do not depend on the OS version: the
+    connection pool to OBS, the temporary :command:`osc` configuration, the
+    git repository with its caches and the worktrees. The waiting for OBS of
+    all bots overlaps, so that the whole matrix takes about as long as the
+    slowest OS version.
+
+    """
+
+    bots: list[StagingBot]
+
+    def __post_init__(self) -> None:
+        if not self.bots:
+            raise ValueError("A staging bot matrix needs at least one bot")
+        if len(set(bot.os_version for bot in self.bots)) != len(self.bots):
+            raise ValueError("Every OS version must only be used by one bot")
+
+    @staticmethod
+    def from_os_versions(
+        os_versions: Iterable[OsVersion], osc_username: str
+    ) -> "StagingBotMatrix":
+        """Create a matrix with a bot with an autogenerated branch name for
+        each of the ``os_versions``.
+
+        """
+        return StagingBotMatrix(
+            bots=[
+                StagingBot(os_version=os_version, osc_username=osc_username)
+                for os_version in os_versions
+            ]
+        )
+
+    async def setup(self) -> None:
+        """Sets up the first bot and shares its resources with the others.
+        Every bot writes its settings into its own environment file
+        :file:`test-build-$OS_VERSION.env`.
+
+        """
+        first, *others = self.bots
+        await first.setup(write_env_file=False)
+        for bot in others:
+            bot._obs = first._obs
+            bot._run_cmd = first._run_cmd
+            bot._commit_graph = first._commit_graph
+            bot._worktrees = first._worktrees
+            bot._configs = first._configs
+            bot._history = first._history
+        for bot in self.bots:
+            bot._dotenv_file_name = f"test-build-{bot.os_version}.env"
+
+    async def teardown(self) -> None:
+        """Clean up the resources of the first bot, which owns all shared
+        resources.
+
+        """
+        await self.bots[0].teardown()
+
+    async def scratch_build_and_wait(
+        self, commit_message: str = "", timeout_sec: int | None = None
+    ) -> dict[OsVersion, list[RepositoryBuildResult] | None | BaseException]:
+        """Runs :py:meth:`StagingBot.scratch_build` and
+        :py:meth:`StagingBot.wait_for_build_to_finish` for all bots
+        concurrently.
+
+        Returns:
+            A dictionary mapping each OS version to the build results, to
+            ``None`` if the scratch build resulted in no changes, to an empty
+            list if no package needs a build or to the exception with which the
+            scratch build or the wait failed. A failure of one OS version does
+            not abort the others.
+
+        """
+
+        async def _run(bot: StagingBot) -> list[RepositoryBuildResult] | None:
+            if not await bot.scratch_build(commit_message):
+                return None
+            if not bot.package_names:
+                return []
+            return await bot.wait_for_build_to_finish(timeout_sec=timeout_sec)
+
+        results = await asyncio.gather(
+            *(_run(bot) for bot in self.bots), return_exceptions=True
+        )
+        for bot, res in zip(self.bots, results):
+            if isinstance(res, BaseException):
+                LOGGER.error("Scratch build for %s failed: %s", bot.os_version, res)
+        return {bot.os_version: res for bot, res in zip(self.bots, results)}
+
+    async def rebuild_images_containing(
+        self, package: str
+    ) -> dict[OsVersion, list[str] | BaseException]:
+        """Runs :py:meth:`StagingBot.rebuild_images_containing` for all bots
+        concurrently with a shared index of the packages of all their images.
+
+        Returns:
+            A dictionary mapping each OS version to the rebuilt packages or to
+            the exception with which triggering the rebuilds failed.
+
+        """
+        index = PackageIndex(bci for bot in self.bots for bci in bot._bcis)
+        results = await asyncio.gather(
+            *(bot.rebuild_images_containing(package, index) for bot in self.bots),
+            return_exceptions=True,
+        )
+        for bot, res in zip(self.bots, results):
+            if isinstance(res, BaseException):
+                LOGGER.error("Rebuild for %s failed: %s", bot.os_version, res)
+        return {bot.os_version: res for bot, res in zip(self.bots, results)}
+
+
 def main() -> None:
     import argparse
     import logging
@@ -1529,6 +1633,7 @@ def main() -> None:
     from typing import Any
 
     from bci_build.package import ALL_OS_VERSIONS
+    from staging.build_result import GITHUB_COMMENT_MAX_BYTES
     from staging.build_result import is_build_failed
     from staging.build_result import render_as_markdown
 
@@ -1546,6 +1651,9 @@ def main() -> None:
         "changelog_check",
         "setup_obs_package",
         "find_missing_packages",
+        "matrix_build",
+        "build_stats",
+        "rebuild_containing",
     ]
 
     parser = argparse.ArgumentParser()
@@ -1553,9 +1661,9 @@ def main() -> None:
         "--os-version",
         type=str,
         choices=[str(v) for v in ALL_OS_VERSIONS],
-        nargs=1,
-        default=[os.getenv(OS_VERSION_ENVVAR_NAME)],
-        help=f"The OS version for which all actions shall be made. The value from the environment variable {OS_VERSION_ENVVAR_NAME} is used if not provided.",
+        action="append",
+        default=None,
+        help=f"The OS version for which all actions shall be made. The value from the environment variable {OS_VERSION_ENVVAR_NAME} is used if not provided. Only matrix_build and rebuild_containing accept multiple OS versions, which are passed by repeating this option.",
     )
     parser.add_argument(
         "--osc-user",
@@ -1584,6 +1692,13 @@ def main() -> None:
         action="store_true",
         help="Load the bot settings from a github comment passed via standard input",
     )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        nargs=1,
+        default=[""],
+        help="Record the duration of all phases, commands and requests in this Chrome trace file (a trace in an existing file is continued) and append a timing summary to the build results",
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -1602,8 +1717,32 @@ def main() -> None:
             default=[""],
         )
 
+    def add_markdown_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument(
+            "--format",
+            help="How the build results are rendered: one table per repository (default), one table with a column per repository or only the failed packages",
+            choices=["table", "matrix", "failures"],
+            nargs=1,
+            type=str,
+            default=["table"],
+        )
+        p.add_argument(
+            "--max-bytes",
+            help=f"Maximum size of the rendered build results including the timing summary (defaults to the maximum comment size on GitHub: {GITHUB_COMMENT_MAX_BYTES}, 0 disables the limit)",
+            nargs=1,
+            type=int,
+            default=[GITHUB_COMMENT_MAX_BYTES],
+        )
+
     subparsers = parser.add_subparsers(dest="action")
-    subparsers.add_parser("rebuild", help="Force rebuild the BCI test project")
+    rebuild_parser = subparsers.add_parser(
+        "rebuild", help="Force rebuild the BCI test project"
+    )
+    rebuild_parser.add_argument(
+        "--outdated-only",
+        action="store_true",
+        help="Only rebuild the packages whose current sources have not been built successfully and the images derived from them",
+    )
     subparsers.add_parser(
         "create_staging_project", help="Create the staging project on OBS"
     )
@@ -1620,10 +1759,11 @@ def main() -> None:
         help="Don't delete the staging project on OBS.",
         action="store_true",
     )
-    subparsers.add_parser(
+    query_build_result_parser = subparsers.add_parser(
         "query_build_result",
         help="Fetch the current build state and pretty print the results in markdown format",
     )
+    add_markdown_args(query_build_result_parser)
 
     commit_state_parser = subparsers.add_parser(
         "commit_state", help="commits the current state into a test branch"
@@ -1648,6 +1788,33 @@ def main() -> None:
         type=int,
         default=[None],
     )
+    add_markdown_args(wait_parser)
+
+    matrix_build_parser = subparsers.add_parser(
+        "matrix_build",
+        help="Run scratch_build and wait for all OS versions passed via --os-version concurrently and print the results of all of them",
+    )
+    add_commit_message_arg(matrix_build_parser)
+    matrix_build_parser.add_argument(
+        "-t",
+        "--timeout-sec",
+        help="Timeout of the wait for each OS version in seconds",
+        nargs=1,
+        type=int,
+        default=[None],
+    )
+    add_markdown_args(matrix_build_parser)
+    rebuild_containing_parser = subparsers.add_parser(
+        "rebuild_containing",
+        help="Rebuild all images in the devel projects of the OS versions passed via --os-version (or of all OS versions) that install the package and all images derived from them",
+    )
+    rebuild_containing_parser.add_argument(
+        "package", type=str, nargs=1, help="Name of the package, e.g. openssl"
+    )
+    subparsers.add_parser(
+        "build_stats",
+        help="Print the median and 95th percentile of the build duration of each package and the failure rate of each architecture from the local build history",
+    )
     subparsers.add_parser(
         "get_build_quality", help="Return 0 if the build succeeded or 1 if it failed"
     )
@@ -1715,7 +1882,12 @@ comma-separated list. The package list is taken from the environment variable
         required=True,
         type=str,
         help="Name of the package to configure on OBS",
-        choices=list({bci.package_name for bci in ALL_CONTAINER_IMAGE_NAMES.values()})
+        choices=list(
+            {
+                factory.package_name
+                for factory in ALL_CONTAINER_IMAGE_NAMES.factories.values()
+            }
+        )
         + [dotnet_img.package_name for dotnet_img in DOTNET_IMAGES],
     )
 
@@ -1726,6 +1898,8 @@ comma-separated list. The package list is taken from the environment variable
 
     loop = asyncio.get_event_loop()
     args = parser.parse_args()
+    if not args.os_version:
+        args.os_version = [os.getenv(OS_VERSION_ENVVAR_NAME)]
 
     if args.load and args.from_stdin:
         raise RuntimeError("The --from-stdin and --load flags are mutually exclusive")
@@ -1733,8 +1907,149 @@ comma-separated list. The package list is taken from the environment variable
     if not args.action:
         raise RuntimeError("No action specified")
 
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(levelname)s: %(message)s"))
+
+    if args.verbose > 0:
+        LOGGER.setLevel((3 - min(args.verbose, 2)) * 10)
+    else:
+        LOGGER.setLevel("ERROR")
+
+    tracer = Tracer.load(args.trace[0]) if args.trace[0] else Tracer()
+
+    def _run(coro: Coroutine[Any, Any, Any]) -> Any:
+        with tracer.activate():
+            return loop.run_until_complete(coro)
+
+    def _timing_summary() -> str:
+        if not args.trace[0]:
+            return ""
+        return f"""
+<details><summary>Timing summary</summary>
+
+{tracer.summary_markdown()}
+</details>
+"""
+
+    def _with_timing_summary(render: Callable[[int | None], str]) -> str:
+        """Appends the timing summary to the output of ``render``, which is
+        called with the maximum size of its output. The summary is omitted if
+        it does not fit into ``--max-bytes`` together with the output.
+
+        """
+        max_bytes = args.max_bytes[0] or None
+        if not (summary := _timing_summary()) or max_bytes is None:
+            return render(max_bytes) + summary
+        try:
+            return render(max_bytes - len(summary.encode())) + summary
+        except ValueError:
+            LOGGER.info("Omitting the timing summary, it exceeds the maximum size")
+            return render(max_bytes)
+
+    if args.action == "matrix_build":
+        if args.load or args.from_stdin or args.branch_name[0]:
+            raise ValueError(
+                "matrix_build generates the settings of each bot, it supports "
+                "neither --load, --from-stdin nor --branch-name"
+            )
+        if not args.os_version or not args.os_version[0]:
+            raise ValueError("No OS version has been set")
+
+        matrix = StagingBotMatrix.from_os_versions(
+            (OsVersion.parse(os_ver) for os_ver in args.os_version),
+            osc_username=args.osc_user[0],
+        )
+        _run(matrix.setup())
+        try:
+            results = _run(
+                matrix.scratch_build_and_wait(
+                    args.commit_message[0], timeout_sec=args.timeout_sec[0]
+                )
+            )
+        finally:
+            _run(matrix.teardown())
+            if args.trace[0]:
+                tracer.write(args.trace[0])
+
+        def _render_matrix(max_bytes: int | None) -> str:
+            sections: list[str | list[RepositoryBuildResult]] = []
+            for os_version, res in results.items():
+                sections.append(f"## {os_version.pretty_print}\n\n")
+                if res is None:
+                    sections.append("No changes\n\n")
+                elif isinstance(res, BaseException):
+                    sections.append(f"Scratch build failed: {res}\n\n")
+                elif not res:
+                    sections.append("No packages need a build\n\n")
+                else:
+                    sections.append(res)
+
+            # the build results share the space that is left by the headings
+            # and messages
+            build_results = [sec for sec in sections if isinstance(sec, list)]
+            budget = (
+                (
+                    max_bytes
+                    - sum(len(sec.encode()) for sec in sections if isinstance(sec, str))
+                )
+                // max(len(build_results), 1)
+                if max_bytes is not None
+                else None
+            )
+            return "".join(
+                sec
+                if isinstance(sec, str)
+                else render_as_markdown(sec, mode=args.format[0], max_bytes=budget)
+                for sec in sections
+            )
+
+        print(_with_timing_summary(_render_matrix))
+        if any(isinstance(res, BaseException) for res in results.values()):
+            sys.exit(1)
+        return
+
+    if args.action == "rebuild_containing":
+        os_versions = (
+            [OsVersion.parse(os_ver) for os_ver in args.os_version]
+            if args.os_version and args.os_version[0]
+            else list(ALL_OS_VERSIONS)
+        )
+        matrix = StagingBotMatrix.from_os_versions(
+            os_versions, osc_username=args.osc_user[0]
+        )
+        _run(matrix.setup())
+        try:
+            results = _run(matrix.rebuild_images_containing(args.package[0]))
+        finally:
+            _run(matrix.teardown())
+            if args.trace[0]:
+                tracer.write(args.trace[0])
+
+        for os_version, res in results.items():
+            print(f"## {os_version.pretty_print}\n")
+            if isinstance(res, BaseException):
+                print(f"Rebuild failed: {res}\n")
+            elif not res:
+                print(f"No image contains {args.package[0]}\n")
+            else:
+                print("\n".join(f"- {pkg}" for pkg in res) + "\n")
+        if any(isinstance(res, BaseException) for res in results.values()):
+            sys.exit(1)
+        return
+
+    if args.action == "build_stats":
+        history = BuildHistory()
+        try:
+            print(render_statistics_as_markdown(history))
+        finally:
+            history.close()
+        return
+
+    if len(args.os_version) > 1:
+        raise ValueError(f"{args.action} only supports a single OS version")
+
     if args.load:
-        bot = loop.run_until_complete(StagingBot.from_env_file())
+        bot = _run(StagingBot.from_env_file())
     elif args.from_stdin:
         comment = sys.stdin.read()
         bot = StagingBot.from_github_comment(comment, osc_username=args.osc_user[0])
@@ -1749,22 +2064,20 @@ comma-separated list. The package list is taken from the environment variable
             osc_username=args.osc_user[0],
         )
 
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter(fmt="%(levelname)s: %(message)s"))
-
-    if args.verbose > 0:
-        LOGGER.setLevel((3 - min(args.verbose, 2)) * 10)
-    else:
-        LOGGER.setLevel("ERROR")
-
-    loop.run_until_complete(bot.setup())
+    _run(bot.setup())
 
     try:
         action: ACTION_T = args.action
         coro: Coroutine[Any, Any, Any] | None = None
 
         if action == "rebuild":
-            coro = bot.force_rebuild()
+
+            async def _rebuild():
+                return await bot.force_rebuild(
+                    await bot.get_outdated_packages() if args.outdated_only else None
+                )
+
+            coro = _rebuild()
 
         elif action == "create_staging_project":
 
@@ -1783,16 +2096,14 @@ comma-separated list. The package list is taken from the environment variable
             coro = bot.write_all_build_recipes_to_branch(args.commit_message[0])
 
         elif action == "query_build_result":
-
-            async def print_build_res():
-                return render_as_markdown(await bot.fetch_build_results())
-
-            coro = print_build_res()
+            coro = bot.fetch_build_results()
 
         elif action == "scratch_build":
 
             async def _scratch():
                 commit_or_none = await bot.scratch_build(args.commit_message[0])
+                if commit_or_none and not bot.package_names:
+                    return f"{commit_or_none}\nNo packages need a build"
                 return commit_or_none or "No changes"
 
             coro = _scratch()
@@ -1806,8 +2117,18 @@ comma-separated list. The package list is taken from the environment variable
         elif action == "wait":
 
             async def _wait():
-                return render_as_markdown(
-                    await bot.wait_for_build_to_finish(timeout_sec=args.timeout_sec[0])
+                def _print_prediction(prediction: float) -> None:
+                    print(
+                        "Predicted completion of the builds: "
+                        + time.strftime(
+                            "%Y-%m-%d %H:%M:%S", time.localtime(prediction)
+                        ),
+                        file=sys.stderr,
+                        flush=True,
+                    )
+
+                return await bot.wait_for_build_to_finish(
+                    timeout_sec=args.timeout_sec[0], on_prediction=_print_prediction
                 )
 
             coro = _wait()
@@ -1877,8 +2198,17 @@ comma-separated list. The package list is taken from the environment variable
             assert False, f"invalid action: {action}"
 
         assert coro is not None
-        res = loop.run_until_complete(coro)
+        res = _run(coro)
+        if action in ("query_build_result", "wait"):
+            build_res = res
+            res = _with_timing_summary(
+                lambda max_bytes: render_as_markdown(
+                    build_res, mode=args.format[0], max_bytes=max_bytes
+                )
+            )
         if res:
             print(res)
     finally:
-        loop.run_until_complete(bot.teardown())
+        _run(bot.teardown())
+        if args.trace[0]:
+            tracer.write(args.trace[0])
@@ -0,0 +1,335 @@
+"""Persistent history of the package builds on OBS.
+
+:py:class:`BuildHistory` records the state transitions of the packages that
+are reported by the :py:class:`~staging.watcher.BuildResultWatcher` in a
+SQLite database in
+:file:`$XDG_CACHE_HOME/bci-dockerfile-generator/build-history.sqlite3`. Every
+build of a package in a repository & architecture is condensed into one row
+with the time when it was scheduled, started and finished, which is the base
+for the duration and failure rate statistics and for predicting when the
+currently running builds finish.
+
+"""
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from dataclasses import field
+
+from bci_build.logger import LOGGER
+from bci_build.xdg import cache_path
+from staging.build_result import PackageStatusCode
+from staging.build_result import RepositoryBuildResult
+from staging.watcher import PackageStateChange
+
+#: states that end a build
+_FINISHED_STATES = (
+    PackageStatusCode.SUCCEEDED,
+    PackageStatusCode.FAILED,
+    PackageStatusCode.UNRESOLVABLE,
+    PackageStatusCode.BROKEN,
+)
+
+#: states of a build that has not been started yet
+_WAITING_STATES = (PackageStatusCode.SCHEDULED, PackageStatusCode.BLOCKED)
+
+#: states of a build that has been started but not finished yet
+_RUNNING_STATES = (
+    PackageStatusCode.BUILDING,
+    PackageStatusCode.SIGNING,
+    PackageStatusCode.FINISHED,
+)
+
+#: states that count as a failed build in :py:meth:`BuildHistory.failure_rates`
+_FAILED_STATES = (
+    PackageStatusCode.FAILED,
+    PackageStatusCode.UNRESOLVABLE,
+    PackageStatusCode.BROKEN,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    project TEXT NOT NULL,
+    package TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    arch TEXT NOT NULL,
+    old TEXT,
+    new TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS builds (
+    project TEXT NOT NULL,
+    package TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    arch TEXT NOT NULL,
+    scheduled_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    code TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_by_key
+    ON builds (project, package, repository, arch, finished_at);
+"""
+
+#: nearest-rank percentiles of the duration of all started & finished builds
+_DURATION_QUERY = """
+WITH durations AS (
+    SELECT
+        package,
+        repository,
+        arch,
+        finished_at - started_at AS duration,
+        ROW_NUMBER() OVER (
+            PARTITION BY package, repository, arch
+            ORDER BY finished_at - started_at
+        ) AS rank,
+        COUNT(*) OVER (PARTITION BY package, repository, arch) AS builds
+    FROM builds
+    WHERE started_at IS NOT NULL AND finished_at IS NOT NULL
+)
+SELECT
+    package,
+    repository,
+    arch,
+    builds,
+    MIN(CASE WHEN rank >= 0.5 * builds THEN duration END),
+    MIN(CASE WHEN rank >= 0.95 * builds THEN duration END)
+FROM durations
+GROUP BY package, repository, arch
+ORDER BY package, repository, arch
+"""
+
+
+def _default_db_path() -> str:
+    return cache_path("build-history.sqlite3")
+
+
+@dataclass(frozen=True)
+class BuildDurationStats:
+    """Duration of the builds of a package in a repository & architecture."""
+
+    package: str
+    repository: str
+    arch: str
+
+    #: number of builds that the statistics are based on
+    builds: int
+
+    #: median build duration in seconds
+    p50_sec: float
+
+    #: 95th percentile of the build duration in seconds
+    p95_sec: float
+
+
+@dataclass(frozen=True)
+class ArchFailureRate:
+    """Share of the finished builds of an architecture that failed."""
+
+    arch: str
+    builds: int
+    failed: int
+
+    @property
+    def rate(self) -> float:
+        return self.failed / self.builds if self.builds else 0.0
+
+
+@dataclass
+class BuildHistory:
+    """Store of the state transitions and builds of packages on OBS.
+
+    The database is opened on first use, an empty :py:attr:`db_path` keeps the
+    history in memory only.
+
+    """
+
+    #: path to the SQLite database
+    db_path: str = field(default_factory=_default_db_path)
+
+    _db: sqlite3.Connection | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            if self.db_path:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_path or ":memory:")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def record(
+        self,
+        project: str,
+        change: PackageStateChange,
+        timestamp: float | None = None,
+    ) -> None:
+        """Record the state ``change`` of a package in ``project`` that has
+        been observed at ``timestamp`` (defaults to now).
+
+        """
+        now = timestamp if timestamp is not None else time.time()
+        key = (project, change.package, change.repository, str(change.arch))
+
+        with self.db:
+            self.db.execute(
+                "INSERT INTO transitions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, change.old and str(change.old), str(change.new), now),
+            )
+
+            row = self.db.execute(
+                """SELECT rowid, started_at FROM builds
+                WHERE project = ? AND package = ? AND repository = ? AND arch = ?
+                AND finished_at IS NULL ORDER BY rowid DESC LIMIT 1""",
+                key,
+            ).fetchone()
+            build_id, started_at = row if row else (None, None)
+
+            if change.new in _WAITING_STATES:
+                if build_id is not None and started_at is not None:
+                    # the running build was aborted and scheduled again
+                    self._delete(build_id)
+                    build_id = None
+                if build_id is None:
+                    self.db.execute(
+                        "INSERT INTO builds (project, package, repository, arch, scheduled_at) VALUES (?, ?, ?, ?, ?)",
+                        (*key, now),
+                    )
+
+            elif change.new in _RUNNING_STATES:
+                # we don't know when a build started that was running already
+                # before it was observed for the first time
+                if change.old is None:
+                    pass
+                elif build_id is None:
+                    self.db.execute(
+                        "INSERT INTO builds (project, package, repository, arch, started_at) VALUES (?, ?, ?, ?, ?)",
+                        (*key, now),
+                    )
+                elif started_at is None:
+                    self.db.execute(
+                        "UPDATE builds SET started_at = ? WHERE rowid = ?",
+                        (now, build_id),
+                    )
+
+            elif build_id is not None:
+                if change.new in _FINISHED_STATES and change.old is not None:
+                    self.db.execute(
+                        "UPDATE builds SET finished_at = ?, code = ? WHERE rowid = ?",
+                        (now, str(change.new), build_id),
+                    )
+                else:
+                    # the package got excluded/disabled or it finished while
+                    # no one was watching, so we don't know when
+                    self._delete(build_id)
+
+    def _delete(self, build_id: int) -> None:
+        self.db.execute("DELETE FROM builds WHERE rowid = ?", (build_id,))
+
+    def build_durations(self) -> list[BuildDurationStats]:
+        """The median and 95th percentile of the build duration of each
+        package in each repository & architecture.
+
+        """
+        return [BuildDurationStats(*row) for row in self.db.execute(_DURATION_QUERY)]
+
+    def failure_rates(self) -> list[ArchFailureRate]:
+        """The number of finished and failed builds of each architecture."""
+        failed = ", ".join(f"'{code}'" for code in _FAILED_STATES)
+        return [
+            ArchFailureRate(*row)
+            for row in self.db.execute(
+                f"""SELECT arch, COUNT(*), SUM(code IN ({failed})) FROM builds
+                WHERE finished_at IS NOT NULL GROUP BY arch ORDER BY arch"""
+            )
+        ]
+
+    def predict_completion(
+        self,
+        build_results: list[RepositoryBuildResult],
+        now: float | None = None,
+    ) -> float | None:
+        """Predict when all builds in ``build_results`` finish.
+
+        Builds that are running are expected to take the median duration of
+        the previous builds of the package in the same repository &
+        architecture. As OBS builds the packages in parallel, the prediction
+        is the time when the last build is expected to finish. Waiting builds
+        are assumed to start right away, so the prediction is optimistic if
+        OBS is busy.
+
+        Returns:
+            The predicted completion as a unix timestamp or ``None`` if there
+            is no history for any unfinished build.
+
+        """
+        now = now if now is not None else time.time()
+        medians = {
+            (stats.package, stats.repository, stats.arch): stats.p50_sec
+            for stats in self.build_durations()
+        }
+
+        completion: float | None = None
+        unknown = 0
+        for repo_res in build_results:
+            for pkg in repo_res.packages:
+                if pkg.code not in _WAITING_STATES + _RUNNING_STATES:
+                    continue
+                key = (pkg.name, repo_res.repository, str(repo_res.arch))
+                if (median := medians.get(key)) is None:
+                    unknown += 1
+                    continue
+
+                row = self.db.execute(
+                    """SELECT started_at FROM builds
+                    WHERE project = ? AND package = ? AND repository = ?
+                    AND arch = ? AND finished_at IS NULL
+                    ORDER BY rowid DESC LIMIT 1""",
+                    (repo_res.project, *key),
+                ).fetchone()
+                started_at = row[0] if row and row[0] is not None else now
+                finish = max(started_at + median, now)
+                completion = finish if completion is None else max(completion, finish)
+
+        if unknown:
+            LOGGER.debug("%d unfinished builds have no build history", unknown)
+        return completion
+
+
+def render_statistics_as_markdown(history: BuildHistory) -> str:
+    """Render the :py:meth:`~BuildHistory.build_durations` and the
+    :py:meth:`~BuildHistory.failure_rates` as markdown tables.
+
+    """
+    lines = [
+        "| Package | Repository | Arch | Builds | p50 | p95 |",
+        "|---------|------------|------|-------:|----:|----:|",
+    ]
+    for stats in sorted(
+        history.build_durations(), key=lambda stats: stats.p95_sec, reverse=True
+    ):
+        lines.append(
+            f"| {stats.package} | {stats.repository} | {stats.arch} | "
+            f"{stats.builds} | {stats.p50_sec / 60:.1f}min | "
+            f"{stats.p95_sec / 60:.1f}min |"
+        )
+
+    lines.extend(
+        [
+            "",
+            "| Arch | Builds | Failed | Failure rate |",
+            "|------|-------:|-------:|-------------:|",
+        ]
+    )
+    for arch_rate in history.failure_rates():
+        lines.append(
+            f"| {arch_rate.arch} | {arch_rate.builds} | {arch_rate.failed} | "
+            f"{arch_rate.rate:.0%} |"
+        )
+    return "\n".join(lines) + "\n"
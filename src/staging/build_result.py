@@ -1,7 +1,11 @@
 import enum
+import sys
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass
 from dataclasses import field
+from typing import Generator
+from typing import Literal
+from xml.parsers import expat
 
 from bci_build.package import Arch
 from staging.util import get_obs_project_url
@@ -26,25 +30,38 @@ class PackageStatusCode(enum.Enum):
     def __str__(self) -> str:
         return self.value
 
+    @property
+    def emoji(self) -> str:
+        """An emoji visualizing the status."""
+        return _STATUS_EMOJI[self]
+
     def pretty_print(self):
         """Returns the value of this enum with an emoji visualizing the status."""
-        _emoji: dict[PackageStatusCode, str] = {
-            PackageStatusCode.FAILED: "❌",
-            PackageStatusCode.SUCCEEDED: "✅",
-            PackageStatusCode.UNRESOLVABLE: "🚫",
-            PackageStatusCode.EXCLUDED: "⛔",
-            PackageStatusCode.BUILDING: "🛻",
-            PackageStatusCode.FINISHED: "🏁",
-            PackageStatusCode.SCHEDULED: "⏱",
-            PackageStatusCode.SIGNING: "🔑",
-            PackageStatusCode.BLOCKED: "✋",
-            PackageStatusCode.BROKEN: "💥",
-            PackageStatusCode.DISABLED: "➖",
-        }
-        return f"{_emoji[self]} {self}"
-
-
-@dataclass
+        return f"{self.emoji} {self}"
+
+
+_STATUS_EMOJI: dict[PackageStatusCode, str] = {
+    PackageStatusCode.FAILED: "❌",
+    PackageStatusCode.SUCCEEDED: "✅",
+    PackageStatusCode.UNRESOLVABLE: "🚫",
+    PackageStatusCode.EXCLUDED: "⛔",
+    PackageStatusCode.BUILDING: "🛻",
+    PackageStatusCode.FINISHED: "🏁",
+    PackageStatusCode.SCHEDULED: "⏱",
+    PackageStatusCode.SIGNING: "🔑",
+    PackageStatusCode.BLOCKED: "✋",
+    PackageStatusCode.BROKEN: "💥",
+    PackageStatusCode.DISABLED: "➖",
+}
+
+
+#: lookup table of the :py:class:`PackageStatusCode` by their value
+_STATUS_CODES: dict[str, PackageStatusCode] = {
+    code.value: code for code in PackageStatusCode
+}
+
+
+@dataclass(slots=True)
 class PackageBuildResult:
     """The build result of a single package."""
 
@@ -59,7 +76,7 @@ class PackageBuildResult:
     detail_message: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RepositoryBuildResult:
     """The build results of a repository for a specific architecture."""
 
@@ -80,62 +97,128 @@ class RepositoryBuildResult:
     dirty: bool = False
 
     @staticmethod
-    def _from_result(result: ET.Element) -> "RepositoryBuildResult":
-        assert (
-            result.tag == "result"
-        ), f"Invalid element passed, expected '<result>' but got: {ET.tostring(result).decode()}"
-        attr = result.attrib
-        for attr_name in ("project", "repository", "arch", "code", "state"):
-            if attr_name not in attr:
-                raise ValueError(
-                    f"Missing property {attr_name} in '<result> element: {ET.tostring(result).decode()}'"
-                )
+    def from_resultlist(obs_api_reply: str | bytes) -> "list[RepositoryBuildResult]":
+        """Creates a list of :py:class`RepositoryBuildResult` from the xml API reply
+        received from OBS via :command:`osc results --xml`.
 
-        pkgs = []
-        for pkg in result:
-            if pkg.tag != "status":
-                continue
+        """
+        parser = ResultListParser()
+        parser.feed(obs_api_reply)
+        return parser.close()
+
+
+def _status_code(code: str) -> PackageStatusCode:
+    return _STATUS_CODES.get(code) or PackageStatusCode(code)
 
-            msg = ""
-            for child in pkg:
-                if child.tag == "details" and child.text:
-                    msg += child.text
 
-            pkg_build_res = PackageBuildResult(
-                name=pkg.attrib["package"], code=PackageStatusCode(pkg.attrib["code"])
+def _repository_build_result(
+    attr: dict[str, str], packages: list[PackageBuildResult]
+) -> RepositoryBuildResult:
+    for attr_name in ("project", "repository", "arch", "code", "state"):
+        if attr_name not in attr:
+            raise ValueError(
+                f"Missing property {attr_name} in '<result>' element with the attributes {attr}"
             )
-            if msg:
-                pkg_build_res.detail_message = msg
-            pkgs.append(pkg_build_res)
-
-        build_res = RepositoryBuildResult(
-            project=attr["project"],
-            repository=attr["repository"],
-            arch=Arch(attr["arch"]),
-            code=attr["code"],
-            state=attr["state"],
-            packages=pkgs,
-        )
 
-        if "dirty" in attr:
-            build_res.dirty = attr["dirty"] == "true"
+    return RepositoryBuildResult(
+        project=sys.intern(attr["project"]),
+        repository=sys.intern(attr["repository"]),
+        arch=Arch(attr["arch"]),
+        code=sys.intern(attr["code"]),
+        state=sys.intern(attr["state"]),
+        packages=packages,
+        dirty=attr.get("dirty") == "true",
+    )
 
-        return build_res
 
-    @staticmethod
-    def from_resultlist(obs_api_reply: str) -> "list[RepositoryBuildResult]":
-        """Creates a list of :py:class`RepositoryBuildResult` from the xml API reply
-        received from OBS via :command:`osc results --xml`.
+class ResultListParser:
+    """Incremental parser for the ``<resultlist>`` replies of OBS.
 
-        """
-        tree = ET.fromstring(obs_api_reply)
-        build_results = [
-            RepositoryBuildResult._from_result(result)
-            for result in tree
-            if result.tag == "result"
-        ]
+    The reply is passed in chunks via :py:meth:`feed` and is directly converted
+    into :py:class:`RepositoryBuildResult` and :py:class:`PackageBuildResult`
+    without building an element tree of the reply.
 
-        return build_results
+    """
+
+    __slots__ = (
+        "_parser",
+        "_result",
+        "_packages",
+        "_results",
+        "_status",
+        "_details",
+        "state",
+    )
+
+    def __init__(self) -> None:
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+
+        self._result: dict[str, str] | None = None
+        self._packages: list[PackageBuildResult] = []
+        self._results: list[RepositoryBuildResult] = []
+        self._status: dict[str, str] | None = None
+        self._details: list[str] = []
+
+        #: the ``state`` attribute of the ``<resultlist>`` element
+        self.state = ""
+
+    def feed(self, data: str | bytes) -> None:
+        """Parse the next chunk of the reply.
+
+        Raises:
+            :py:class:`xml.etree.ElementTree.ParseError`: if the reply is not
+                well formed
+
+        """
+        self._parse(data, final=False)
+
+    def close(self) -> list[RepositoryBuildResult]:
+        """Finish parsing and return the build results of all repositories."""
+        self._parse(b"", final=True)
+        return self._results
+
+    def _parse(self, data: str | bytes, final: bool) -> None:
+        try:
+            self._parser.Parse(data, final)
+            if final:
+                # the handlers reference this object => break the cycle
+                self._parser.StartElementHandler = None
+                self._parser.EndElementHandler = None
+        except expat.ExpatError as exc:
+            raise ET.ParseError(str(exc)) from exc
+
+    def _start(self, tag: str, attrib: dict[str, str]) -> None:
+        if tag == "status" and self._result is not None:
+            self._status = attrib
+            self._details = []
+        elif tag == "details" and self._status is not None:
+            # only text in <details> is needed, avoid a callback for all the
+            # whitespace between the other elements
+            self._parser.CharacterDataHandler = self._details.append
+        elif tag == "result":
+            self._result = attrib
+            self._packages = []
+        elif tag == "resultlist":
+            self.state = attrib.get("state", "")
+
+    def _end(self, tag: str) -> None:
+        if tag == "details":
+            self._parser.CharacterDataHandler = None
+        elif tag == "status" and self._status is not None:
+            self._packages.append(
+                PackageBuildResult(
+                    name=sys.intern(self._status["package"]),
+                    code=_status_code(self._status["code"]),
+                    detail_message="".join(self._details) or None,
+                )
+            )
+            self._status = None
+        elif tag == "result" and self._result is not None:
+            self._results.append(_repository_build_result(self._result, self._packages))
+            self._result = None
 
 
 def _get_package_live_log_url(
@@ -150,6 +233,16 @@ def _get_package_live_log_url(
     return f"{base}/package/live_build_log/{project_name}/{package_name}/{repository_name}/{repository_architecture}"
 
 
+#: package states of a finished build that :py:func:`is_build_failed` accepts
+_FINISHED_CODES = (
+    PackageStatusCode.EXCLUDED,
+    PackageStatusCode.FAILED,
+    PackageStatusCode.SUCCEEDED,
+    PackageStatusCode.UNRESOLVABLE,
+    PackageStatusCode.DISABLED,
+)
+
+
 def is_build_failed(build_results: list[RepositoryBuildResult]) -> bool:
     """Returns ``True`` if any package in the list of build results is either
     unresolvable or failed to build. The repositories must **not** be dirty,
@@ -164,14 +257,7 @@ def is_build_failed(build_results: list[RepositoryBuildResult]) -> bool:
 
         for pkg_res in build_res.packages:
             assert (
-                pkg_res.code
-                in (
-                    PackageStatusCode.EXCLUDED,
-                    PackageStatusCode.FAILED,
-                    PackageStatusCode.SUCCEEDED,
-                    PackageStatusCode.UNRESOLVABLE,
-                    PackageStatusCode.DISABLED,
-                )
+                pkg_res.code in _FINISHED_CODES
             ), f"package {pkg_res.name} (from repository {build_res.repository} for {build_res.project} and {build_res.arch}) has unfinished state {pkg_res.code}"
 
             if pkg_res.code in (
@@ -183,44 +269,61 @@ def is_build_failed(build_results: list[RepositoryBuildResult]) -> bool:
     return False
 
 
-def render_as_markdown(
-    results: list[RepositoryBuildResult], base_url: str = "https://build.opensuse.org/"
-) -> str:
-    try:
-        if is_build_failed(results):
-            build_res = "Build failed ❌"
-        else:
-            build_res = "Build succeeded ✅"
-    except ValueError:
-        build_res = "Still building 🛻"
+#: Maximum size of an issue or pull request comment on GitHub
+GITHUB_COMMENT_MAX_BYTES = 65536
 
-    res = f"""
-{build_res}
-<details>
-<summary>Build Results</summary>
+#: How :py:func:`render_as_markdown` renders the build results:
+#:
+#: - ``table``: one table per repository & architecture with one row per
+#:   package
+#: - ``matrix``: a single table with one row per package and one column per
+#:   repository & architecture
+#: - ``failures``: like ``table`` but only packages that failed to build or are
+#:   unresolvable
+RENDER_MODE_T = Literal["table", "matrix", "failures"]
+
+_FAILED_CODES = (
+    PackageStatusCode.FAILED,
+    PackageStatusCode.UNRESOLVABLE,
+    PackageStatusCode.BROKEN,
+)
+
+
+def _render_repository_header(repo_res: RepositoryBuildResult, base_url: str) -> str:
+    return (
+        f"Repository `{repo_res.repository}` in "
+        + f"[{repo_res.project}]({get_obs_project_url(repo_res.project, base_url)})"
+        + f" for `{repo_res.arch}`: current state: {repo_res.state}"
+        + (" (repository is **dirty**)" if repo_res.dirty else "")
+        + "\n"
+    )
 
-"""
 
+def _render_tables(
+    results: list[RepositoryBuildResult], base_url: str, failures_only: bool
+) -> Generator[str, None, None]:
     for repo_res in results:
-        res += (
-            f"Repository `{repo_res.repository}` in "
-            + f"[{repo_res.project}]({get_obs_project_url(repo_res.project, base_url)})"
-            + f" for `{repo_res.arch}`: current state: {repo_res.state}"
-        )
-        if repo_res.dirty:
-            res += " (repository is **dirty**)"
+        yield _render_repository_header(repo_res, base_url)
 
-        res += "\n"
-        if not repo_res.packages:
-            res += "No packages\n"
+        packages = (
+            [pkg for pkg in repo_res.packages if pkg.code in _FAILED_CODES]
+            if failures_only
+            else repo_res.packages
+        )
+        if not packages:
+            yield (
+                "No failed packages\n"
+                if failures_only and repo_res.packages
+                else "No packages\n"
+            )
         else:
-            no_detail = all(not pkg.detail_message for pkg in repo_res.packages)
+            no_detail = all(not pkg.detail_message for pkg in packages)
 
-            res += f"""Build results:
+            yield f"""Build results:
 package name | status {'' if no_detail else '| detail '}| build log
 -------------|--------{'' if no_detail else '|--------'}|----------
 """
-            for package_res in repo_res.packages:
+            for package_res in packages:
                 if no_detail:
                     assert not package_res.detail_message
                     detail = ""
@@ -229,19 +332,129 @@ package name | status {'' if no_detail else '| detail '}| build log
                 else:
                     detail = " |"
 
-                res += (
+                yield (
                     f"""{package_res.name} | {package_res.code.pretty_print()} |"""
                     + detail
                     + f""" [live log]({_get_package_live_log_url(repo_res.project, package_res.name, repo_res.repository, repo_res.arch, base_url)})
 """
                 )
-        res += "\n"
+        yield "\n"
 
-    return (
-        res
-        + f"""
+
+def _render_matrix(
+    results: list[RepositoryBuildResult], base_url: str
+) -> Generator[str, None, None]:
+    for repo_res in results:
+        yield "- " + _render_repository_header(repo_res, base_url)
+    yield "\n"
+
+    codes: dict[str, list[str]] = {}
+    for col, repo_res in enumerate(results):
+        for pkg in repo_res.packages:
+            row = codes.setdefault(pkg.name, [""] * len(results))
+            row[col] = (
+                f"[{pkg.code.emoji}]({_get_package_live_log_url(repo_res.project, pkg.name, repo_res.repository, repo_res.arch, base_url)})"
+                if pkg.code in _FAILED_CODES
+                else pkg.code.emoji
+            )
+
+    if not codes:
+        yield "No packages\n"
+        return
+
+    yield (
+        "package name | "
+        + " | ".join(f"{res.repository}/{res.arch}" for res in results)
+        + "\n"
+    )
+    yield "-------------|" + "|".join("---" for _ in results) + "\n"
+    for pkg_name in sorted(codes):
+        yield f"{pkg_name} | " + " | ".join(codes[pkg_name]) + "\n"
+    yield "\n"
+
+
+def render_as_markdown(
+    results: list[RepositoryBuildResult],
+    base_url: str = "https://build.opensuse.org/",
+    mode: RENDER_MODE_T = "table",
+    max_bytes: int | None = None,
+) -> str:
+    """Render the build results as markdown, e.g. for a comment on GitHub.
+
+    Args:
+        results: the build results to render
+        base_url: url of the OBS instance to which the links point
+        mode: how the package results are rendered, see
+            :py:const:`RENDER_MODE_T`
+        max_bytes: maximum size of the utf-8 encoded output (e.g.
+            :py:const:`GITHUB_COMMENT_MAX_BYTES`). Lines of the results are
+            omitted from the end if the output would be larger.
+
+    Raises:
+        :py:class:`ValueError`: if ``max_bytes`` is too small for the summary
+            of the build and the note about the omitted lines
+
+    """
+    if any(
+        repo_res.dirty
+        or any(pkg.code not in _FINISHED_CODES for pkg in repo_res.packages)
+        for repo_res in results
+    ):
+        build_res = "Still building 🛻"
+    elif is_build_failed(results):
+        build_res = "Build failed ❌"
+    else:
+        build_res = "Build succeeded ✅"
+
+    header = f"""
+{build_res}
+<details>
+<summary>Build Results</summary>
+
+"""
+    footer = f"""
 </details>
 
 {build_res}
 """
+
+    body = list(
+        _render_matrix(results, base_url)
+        if mode == "matrix"
+        else _render_tables(results, base_url, failures_only=mode == "failures")
     )
+    if max_bytes is None:
+        return header + "".join(body) + footer
+
+    sizes = [len(line.encode()) for line in body]
+    budget = max_bytes - len(header.encode()) - len(footer.encode())
+    if sum(sizes) <= budget:
+        return header + "".join(body) + footer
+
+    def _truncation_note(omitted: int) -> str:
+        return (
+            f"\n**Output truncated**: {omitted} more lines are not shown"
+            + (
+                f", see [{results[0].project}]({get_obs_project_url(results[0].project, base_url)}) for all results"
+                if results
+                else ""
+            )
+            + "\n"
+        )
+
+    # reserve space for the note about the omitted lines
+    budget -= len(_truncation_note(sum(line.count("\n") for line in body)).encode())
+    if budget < 0:
+        raise ValueError(
+            f"max_bytes must be at least {max_bytes - budget} to fit the "
+            "summary of the build results"
+        )
+    for ind, size in enumerate(sizes):
+        if size > budget:
+            omitted = sum(line.count("\n") for line in body[ind:])
+            del body[ind:]
+            body.append(_truncation_note(omitted))
+            break
+        budget -= size
+
+    return header + "".join(body) + footer
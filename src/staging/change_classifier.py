@@ -0,0 +1,105 @@
+"""Classification of the changed files of a package in a deployment branch.
+
+Only some of the files in a package directory end up in the built image or
+steer its build on OBS: the build recipe, the files that it copies into the
+image and the OBS specific build configuration. Changes to all other files,
+e.g. the :file:`README.md` or the changelog, only modify metadata and do not
+require a rebuild.
+
+"""
+
+import enum
+import fnmatch
+import json
+import shlex
+from typing import Iterable
+
+from bci_build.package import BaseContainerImage
+from bci_build.package import BuildType
+
+
+@enum.unique
+class ChangeKind(enum.Enum):
+    """Impact of a change of a file on the build of the image."""
+
+    #: the change modifies the image or how it is built
+    BUILD = "build"
+
+    #: the change only modifies metadata, e.g. the documentation or changelog
+    METADATA = "metadata"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+#: files in a package directory that are always used when building the image
+BUILD_FILES = ("Dockerfile", "config.sh", "_service", "_constraints", "_multibuild")
+
+
+def copied_files(dockerfile: str) -> list[str]:
+    """Returns the sources (which can be glob patterns) of all ``COPY`` and
+    ``ADD`` instructions in ``dockerfile`` that copy files from the build
+    context.
+
+    """
+    sources: list[str] = []
+    for line in dockerfile.replace("\\\n", " ").splitlines():
+        instruction, _, args = line.strip().partition(" ")
+        if instruction.upper() not in ("COPY", "ADD"):
+            continue
+
+        flags = []
+        args = args.strip()
+        # globs like `[1-3]0-*.sh` start with a bracket too
+        if args.startswith('["'):
+            paths = json.loads(args)
+        else:
+            flags = [arg for arg in shlex.split(args) if arg.startswith("--")]
+            paths = [arg for arg in shlex.split(args) if not arg.startswith("--")]
+
+        # files from other stages are not part of the build context
+        if any(flag.startswith("--from") for flag in flags):
+            continue
+
+        # the last path is the destination
+        sources.extend(paths[:-1])
+    return sources
+
+
+def build_file_patterns(image: BaseContainerImage) -> list[str]:
+    """Returns the names (or glob patterns) of all files in the package
+    directory of ``image`` whose changes affect the build.
+
+    """
+    files = image.render_files()
+    patterns = list(BUILD_FILES)
+
+    if image.build_recipe_type == BuildType.DOCKER:
+        patterns.extend(copied_files(str(files["Dockerfile"])))
+    else:
+        kiwi_file = f"{image.package_name}.kiwi"
+        patterns.append(kiwi_file)
+        # kiwi has no copy instruction, we assume that every file that is
+        # referenced by the recipe ends up in the image
+        recipes = str(files[kiwi_file]) + str(files.get("config.sh", ""))
+        patterns.extend(fname for fname in image.extra_files if fname in recipes)
+
+    return patterns
+
+
+def classify_files(
+    image: BaseContainerImage, fnames: Iterable[str]
+) -> dict[str, ChangeKind]:
+    """Classify the changes of the files ``fnames`` in the package directory
+    of ``image``.
+
+    """
+    patterns = build_file_patterns(image)
+    return {
+        fname: (
+            ChangeKind.BUILD
+            if any(fnmatch.fnmatchcase(fname, pattern) for pattern in patterns)
+            else ChangeKind.METADATA
+        )
+        for fname in fnames
+    }
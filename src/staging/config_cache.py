@@ -0,0 +1,116 @@
+"""Cache for configuration files (``_meta``, ``_config``) fetched from OBS.
+
+Every file is downloaded at most once per :py:class:`ConfigCache` instance.
+The files are additionally persisted in
+:file:`$XDG_CACHE_HOME/bci-dockerfile-generator/obs-config/` together with
+their ``ETag`` and ``Last-Modified`` headers, so that later runs only send a
+conditional request, which OBS answers with an empty ``304 Not Modified`` if
+the file did not change.
+
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from dataclasses import field
+
+from bci_build.logger import LOGGER
+from bci_build.xdg import cache_path
+from staging.obs import ObsClient
+
+
+def _default_cache_dir() -> str:
+    return cache_path("obs-config")
+
+
+@dataclass
+class ConfigCache:
+    """Fetches files from OBS at most once and revalidates persisted copies
+    with conditional requests.
+
+    """
+
+    #: directory in which the files are persisted, they are only kept in memory
+    #: if empty
+    cache_dir: str = field(default_factory=_default_cache_dir)
+
+    #: persisted files that are younger than this are used without asking OBS
+    #: whether they changed
+    ttl_sec: float = 300.0
+
+    _files: dict[str, "asyncio.Future[str]"] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    async def get(self, client: ObsClient, route: str) -> str:
+        """Returns the contents of ``route`` fetched via ``client``.
+
+        Concurrent calls for the same route share a single request.
+
+        """
+        key = f"{client.api_url}{route}"
+        if key not in self._files:
+            self._files[key] = asyncio.ensure_future(self._fetch(client, route, key))
+
+        try:
+            return await asyncio.shield(self._files[key])
+        except Exception:
+            # don't cache failures, the next call should try again
+            self._files.pop(key, None)
+            raise
+
+    def _cache_file(self, key: str) -> str:
+        return os.path.join(
+            self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json"
+        )
+
+    def _load(self, key: str) -> dict[str, str | float] | None:
+        try:
+            with open(self._cache_file(key), "r") as cache_f:
+                cached = json.load(cache_f)
+            if cached["key"] == key and isinstance(cached["body"], str):
+                return cached
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _store(self, key: str, body: str, etag: str, last_modified: str) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._cache_file(key), "w") as cache_f:
+                json.dump(
+                    {
+                        "key": key,
+                        "body": body,
+                        "etag": etag,
+                        "last_modified": last_modified,
+                        "validated_at": time.time(),
+                    },
+                    cache_f,
+                )
+        except OSError as os_err:
+            LOGGER.debug("Could not persist %s: %s", key, os_err)
+
+    async def _fetch(self, client: ObsClient, route: str, key: str) -> str:
+        body, etag, last_modified = "", "", ""
+        if cached := self._load(key) if self.cache_dir else None:
+            body = str(cached["body"])
+            etag = str(cached.get("etag", ""))
+            last_modified = str(cached.get("last_modified", ""))
+            if time.time() - float(cached.get("validated_at", 0)) < self.ttl_sec:
+                LOGGER.debug("Using the cached %s", key)
+                return body
+
+        if res := await client.get_if_modified(
+            route, etag=etag, last_modified=last_modified
+        ):
+            body, etag, last_modified = res
+        else:
+            LOGGER.debug("%s has not been modified", key)
+
+        if self.cache_dir:
+            self._store(key, body, etag, last_modified)
+        return body
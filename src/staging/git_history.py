@@ -0,0 +1,128 @@
+"""Helpers for querying the commit history of the deployment branches."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+
+import git
+
+#: A changed file as a tuple of the path before and after the change
+_CHANGED_PATH_T = tuple[str, str]
+
+
+@dataclass
+class CommitGraph:
+    """Wrapper around a git repository that computes commit ranges with a
+    single traversal of the commit graph and caches the diffs of commits by
+    their SHA.
+
+    """
+
+    #: path to the git repository
+    repo_path: str = "."
+
+    #: maximum number of :command:`git` processes that are run in parallel
+    max_workers: int = min(8, os.cpu_count() or 1)
+
+    _repo: git.Repo | None = field(default=None, repr=False, compare=False)
+
+    _diff_cache: dict[tuple[str, str], list[_CHANGED_PATH_T]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    _stats_cache: dict[str, dict[str, dict[str, int]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    @property
+    def repo(self) -> git.Repo:
+        if self._repo is None:
+            self._repo = git.Repo(self.repo_path)
+        return self._repo
+
+    def commit_range(
+        self, child_ref: str, ancestor_ref: str
+    ) -> list[git.Commit] | None:
+        """Returns all commits that are reachable from ``child_ref`` but not
+        from ``ancestor_ref`` (i.e. ``git rev-list ancestor_ref..child_ref``),
+        newest first.
+
+        ``None`` is returned if ``ancestor_ref`` is not an ancestor of
+        ``child_ref`` or if both refer to the same commit.
+
+        """
+        ancestor = self.repo.commit(ancestor_ref)
+        child = self.repo.commit(child_ref)
+
+        if child == ancestor or not self.repo.is_ancestor(ancestor, child):
+            return None
+
+        return list(self.repo.iter_commits(f"{ancestor.hexsha}..{child.hexsha}"))
+
+    def changed_paths(
+        self, commits: list[git.Commit], against_ref: str
+    ) -> dict[str, list[_CHANGED_PATH_T]]:
+        """Diffs each commit in ``commits`` against ``against_ref`` and returns
+        a dictionary mapping the SHA of each commit to the list of changed
+        files.
+
+        Diffs that have not been computed before are run in parallel.
+
+        """
+        against = self.repo.commit(against_ref).hexsha
+
+        def _diff(commit: git.Commit) -> list[_CHANGED_PATH_T]:
+            res = []
+            for diff in commit.diff(against):
+                # no idea how this could happen, but in theory the diff mode
+                # can be `C` for conflict => abort if that's the case
+                assert (
+                    diff.a_mode != "C" and diff.b_mode != "C"
+                ), f"diff must not be a conflict, but got {diff=}"
+                res.append((diff.a_path, diff.b_path))
+            return res
+
+        missing = {
+            commit.hexsha: commit
+            for commit in commits
+            if (commit.hexsha, against) not in self._diff_cache
+        }
+        for sha, paths in zip(missing, self._map(_diff, list(missing.values()))):
+            self._diff_cache[(sha, against)] = paths
+
+        return {
+            commit.hexsha: self._diff_cache[(commit.hexsha, against)]
+            for commit in commits
+        }
+
+    def file_stats(
+        self, commits: list[git.Commit]
+    ) -> dict[str, dict[str, dict[str, int]]]:
+        """Returns a dictionary mapping the SHA of each commit to the
+        :py:attr:`git.Stats.files` of the commit (i.e. the number of inserted
+        and deleted lines per file compared to its first parent).
+
+        """
+        missing = {
+            commit.hexsha: commit
+            for commit in commits
+            if commit.hexsha not in self._stats_cache
+        }
+        # the parents are read via git's persistent cat-file process, which
+        # must not be used from multiple threads => load them here
+        for commit in missing.values():
+            commit.parents
+        for sha, stats in zip(
+            missing,
+            self._map(lambda commit: commit.stats.files, list(missing.values())),
+        ):
+            self._stats_cache[sha] = stats
+
+        return {commit.hexsha: self._stats_cache[commit.hexsha] for commit in commits}
+
+    def _map(self, func, commits: list[git.Commit]) -> list:
+        if len(commits) <= 1:
+            return [func(commit) for commit in commits]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, commits))
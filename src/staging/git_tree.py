@@ -0,0 +1,240 @@
+"""Creation of commits directly in the git object database.
+
+:py:class:`CommitBuilder` modifies the tree of a base commit in memory and
+writes only the blobs and trees that differ from the base into the object
+database, without touching a worktree or the index.
+
+"""
+
+import hashlib
+import io
+from dataclasses import dataclass
+from dataclasses import field
+
+import git
+from git.objects.fun import tree_to_stream
+from gitdb.base import IStream
+
+#: mode of a subdirectory in a git tree
+TREE_MODE = 0o040000
+
+#: mode of a regular, non-executable file in a git tree
+BLOB_MODE = 0o100644
+
+#: an entry of a git tree: its mode and its binary SHA
+_ENTRY_T = tuple[int, bytes]
+
+
+def _hash_object(obj_type: str, data: bytes) -> bytes:
+    return hashlib.sha1(f"{obj_type} {len(data)}\0".encode() + data).digest()
+
+
+@dataclass
+class _Directory:
+    """A directory of the new tree, which is only created for directories that
+    are modified.
+
+    """
+
+    entries: dict[str, "_ENTRY_T | _Directory"] = field(default_factory=dict)
+
+
+@dataclass
+class DirectoryChanges:
+    """Files that were added, modified or removed by
+    :py:meth:`CommitBuilder.replace_directory`. All paths are relative to the
+    replaced directory.
+
+    """
+
+    added: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    @property
+    def files(self) -> set[str]:
+        """All files that were added, modified or removed."""
+        return {*self.added, *self.modified, *self.removed}
+
+
+@dataclass
+class CommitBuilder:
+    """Builds a new commit on top of the commit :py:attr:`base_ref`.
+
+    All paths are relative to the repository root and use ``/`` as the
+    separator. Unmodified directories of the base commit are reused as they
+    are, so that the cost of a new commit is proportional to the amount of
+    changed files and not to the size of the tree.
+
+    """
+
+    repo: git.Repo
+
+    #: the commit on which the new commit is based
+    base_ref: str
+
+    #: the commit against which :py:meth:`replace_directory` reports the
+    #: changes, defaults to :py:attr:`base_ref`
+    changes_base_ref: str | None = None
+
+    _root: _Directory | None = field(default=None, repr=False)
+
+    @property
+    def base(self) -> git.Commit:
+        return self.repo.commit(self.base_ref)
+
+    def _base_entries(self, path: str, ref: str | None = None) -> dict[str, _ENTRY_T]:
+        base = self.repo.commit(ref) if ref else self.base
+        try:
+            tree = base.tree / path if path else base.tree
+        except KeyError:
+            return {}
+        if not isinstance(tree, git.Tree):
+            return {}
+        return {obj.name: (obj.mode, obj.binsha) for obj in tree}
+
+    def _directory(self, path: str, create: bool = True) -> _Directory | None:
+        if self._root is None:
+            self._root = _Directory(self._base_entries(""))
+
+        directory = self._root
+        prefix = ""
+        for name in path.split("/") if path else []:
+            prefix = f"{prefix}/{name}" if prefix else name
+            entry = directory.entries.get(name)
+            if not isinstance(entry, _Directory):
+                if entry is None and not create:
+                    return None
+                entry = _Directory(
+                    self._base_entries(prefix) if entry is not None else {}
+                )
+                directory.entries[name] = entry
+            directory = entry
+        return directory
+
+    def _store(self, obj_type: str, data: bytes) -> bytes:
+        binsha = _hash_object(obj_type, data)
+        if not self.repo.odb.has_object(binsha):
+            self.repo.odb.store(IStream(obj_type, len(data), io.BytesIO(data)))
+        return binsha
+
+    def _blob_entry(self, contents: str | bytes, old: object) -> _ENTRY_T:
+        data = contents.encode() if isinstance(contents, str) else contents
+        binsha = _hash_object("blob", data)
+        if isinstance(old, tuple) and old[0] != TREE_MODE:
+            # keep the mode, e.g. the executable bit, of existing files
+            return old if old[1] == binsha else (old[0], self._store("blob", data))
+        return BLOB_MODE, self._store("blob", data)
+
+    def entries(self, path: str = "") -> list[str]:
+        """Names of all entries in the directory ``path`` of the new tree."""
+        return (
+            list(directory.entries)
+            if (directory := self._directory(path, create=False))
+            else []
+        )
+
+    def write_file(self, path: str, contents: str | bytes) -> None:
+        """Set the contents of the file ``path``."""
+        dirname, _, fname = path.rpartition("/")
+        assert (directory := self._directory(dirname))
+        directory.entries[fname] = self._blob_entry(
+            contents, directory.entries.get(fname)
+        )
+
+    def replace_directory(
+        self, path: str, files: dict[str, str | bytes], keep: tuple[str, ...] = ()
+    ) -> DirectoryChanges:
+        """Replace the contents of the directory ``path`` with ``files``.
+
+        Entries whose names are in ``keep`` are not replaced if they exist in
+        the directory already, all other existing entries are removed.
+
+        Returns:
+            The files of the directory that differ from the commit
+            :py:attr:`changes_base_ref`, compared by the SHAs of their blobs.
+
+        """
+        assert (directory := self._directory(path))
+        old_entries = directory.entries
+        directory.entries = {
+            fname: self._blob_entry(contents, old_entries.get(fname))
+            for fname, contents in files.items()
+        }
+        for name in keep:
+            if name in old_entries:
+                directory.entries[name] = old_entries[name]
+
+        reference = {
+            name: binsha
+            for name, (mode, binsha) in self._base_entries(
+                path, self.changes_base_ref
+            ).items()
+            if mode != TREE_MODE
+        }
+        changes = DirectoryChanges()
+        for name, entry in sorted(directory.entries.items()):
+            if isinstance(entry, _Directory):
+                continue
+            if name not in reference:
+                changes.added.append(name)
+            elif reference[name] != entry[1]:
+                changes.modified.append(name)
+        changes.removed = sorted(set(reference) - set(directory.entries))
+        return changes
+
+    def remove(self, path: str) -> None:
+        """Remove the file or directory ``path`` if it exists."""
+        dirname, _, name = path.rpartition("/")
+        if directory := self._directory(dirname, create=False):
+            directory.entries.pop(name, None)
+
+    def _write_tree(self, directory: _Directory) -> bytes:
+        entries: list[tuple[bytes, int, str]] = []
+        for name, entry in directory.entries.items():
+            if isinstance(entry, _Directory):
+                # git does not store empty directories
+                if not entry.entries:
+                    continue
+                entries.append((self._write_tree(entry), TREE_MODE, name))
+            else:
+                entries.append((entry[1], entry[0], name))
+
+        # git sorts the entries of a tree as if directories had a trailing /
+        entries.sort(key=lambda e: e[2] + "/" if e[1] == TREE_MODE else e[2])
+        stream = io.BytesIO()
+        tree_to_stream(entries, stream.write)
+        return self._store("tree", stream.getvalue())
+
+    def commit(
+        self,
+        message: str,
+        author: git.Actor | None = None,
+        committer: git.Actor | None = None,
+    ) -> git.Commit | None:
+        """Write the new tree and a commit with the ``message`` into the object
+        database. No branch is updated.
+
+        Returns:
+            The new commit or ``None`` if the tree is unchanged.
+
+        """
+        if self._root is None:
+            return None
+
+        binsha = self._write_tree(self._root)
+        if binsha == self.base.tree.binsha:
+            return None
+
+        return git.Commit.create_from_tree(
+            self.repo,
+            git.Tree(self.repo, binsha, mode=TREE_MODE, path=""),
+            message,
+            parent_commits=[self.base],
+            head=False,
+            author=author,
+            committer=committer,
+        )
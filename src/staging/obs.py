@@ -0,0 +1,558 @@
+"""Asynchronous client for the API of the Open Build Service."""
+
+import asyncio
+import base64
+import bz2
+import configparser
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Awaitable
+from typing import Callable
+from typing import Literal
+from typing import TypeVar
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from bci_build.logger import LOGGER
+from staging.build_result import RepositoryBuildResult
+from staging.build_result import ResultListParser
+from staging.tracing import span
+
+#: URL of the API of the Open Build Service
+OBS_API_URL = "https://api.opensuse.org"
+
+#: environment variable from which the password of the bot's user is taken
+OSC_PASSWORD_ENVVAR_NAME = "OSC_PASSWORD"
+
+_PARAMS_T = list[tuple[str, str]]
+
+_T = TypeVar("_T")
+
+#: size of the chunks in which the build results are passed to the parser
+_RESULTS_CHUNK_SIZE = 64 * 1024
+
+#: HTTP methods whose requests can be repeated without changing the result,
+#: only these are retried
+_IDEMPOTENT_METHODS = ("GET", "PUT", "DELETE")
+
+
+def _oscrc_paths() -> list[str]:
+    if conf := os.getenv("OSC_CONFIG"):
+        return [conf]
+    config_home = os.getenv("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+    return [
+        os.path.join(config_home, "osc", "oscrc"),
+        os.path.join(os.path.expanduser("~"), ".oscrc"),
+    ]
+
+
+def read_oscrc_credentials(api_url: str = OBS_API_URL) -> tuple[str, str] | None:
+    """Reads the username and the password for ``api_url`` from the
+    :command:`osc` configuration file and returns them as a tuple. ``None`` is
+    returned if no configuration file exists or it contains no plain text or
+    obfuscated (``passx``) password for ``api_url``.
+
+    """
+    conf = configparser.ConfigParser(interpolation=None)
+    conf.read(_oscrc_paths())
+
+    for section in (api_url, api_url.rstrip("/") + "/"):
+        if not conf.has_section(section):
+            continue
+        if not (user := conf.get(section, "user", fallback="")):
+            return None
+        if pw := conf.get(section, "pass", fallback=""):
+            return user, pw
+        if passx := conf.get(section, "passx", fallback=""):
+            return user, bz2.decompress(base64.b64decode(passx)).decode()
+    return None
+
+
+async def _read_text(response: aiohttp.ClientResponse) -> str:
+    return await response.text()
+
+
+def _status_summary(body: str) -> str:
+    """Extract the summary from an OBS ``<status>`` response or return the body
+    unchanged.
+
+    """
+    try:
+        status = ET.fromstring(body)
+    except ET.ParseError:
+        return body
+    if (summary := status.find("summary")) is not None and summary.text:
+        return summary.text
+    return body
+
+
+@dataclass
+class ObsClient:
+    """Client for the API of the Open Build Service using a single pooled
+    :py:class:`aiohttp.ClientSession`.
+
+    The session is created on the first request and reused (including the
+    session cookie set by OBS) until :py:meth:`close` is called. Failed
+    requests due to connection errors or server errors (OBS sometimes dies with
+    SQL errors 🤯) are retried with an exponential backoff, unless they are
+    ``POST`` requests, which could trigger an action twice.
+
+    """
+
+    #: login of the user
+    username: str = ""
+
+    #: password of the user, requests are sent without authentication if empty
+    password: str = field(default="", repr=False)
+
+    #: URL of the OBS API
+    api_url: str = OBS_API_URL
+
+    #: Maximum number of connections to OBS that are open at the same time
+    max_connections: int = 8
+
+    #: Number of times a failed idempotent request is retried
+    retries: int = 3
+
+    #: Time to wait before the first retry, doubled after each retry
+    backoff_sec: float = 1.0
+
+    _session: aiohttp.ClientSession | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    @staticmethod
+    def from_env(username: str = "", api_url: str = OBS_API_URL) -> "ObsClient":
+        """Create a client with the same credentials that :command:`osc` would
+        use: the password is taken from the environment variable
+        :py:const:`OSC_PASSWORD_ENVVAR_NAME` or from the :command:`osc`
+        configuration file.
+
+        Passwords in a keyring or another credential manager of :command:`osc`
+        are not supported. Without a password, the client sends its requests
+        unauthenticated and fails with an error naming the missing credentials
+        once OBS requires authentication.
+
+        """
+        if pw := os.getenv(OSC_PASSWORD_ENVVAR_NAME):
+            return ObsClient(username=username, password=pw, api_url=api_url)
+        if creds := read_oscrc_credentials(api_url):
+            if not username or username == creds[0]:
+                return ObsClient(username=creds[0], password=creds[1], api_url=api_url)
+        LOGGER.warning(
+            "No password for %s found in $%s or in the pass/passx entry of the osc configuration",
+            api_url,
+            OSC_PASSWORD_ENVVAR_NAME,
+        )
+        return ObsClient(username=username, api_url=api_url)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                base_url=self.api_url,
+                headers=(
+                    {
+                        "Authorization": "Basic "
+                        + base64.b64encode(
+                            f"{self.username}:{self.password}".encode()
+                        ).decode()
+                    }
+                    if self.password
+                    else None
+                ),
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                cookie_jar=aiohttp.CookieJar(),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "ObsClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def request(
+        self,
+        method: Literal["GET", "PUT", "POST", "DELETE"],
+        route: str,
+        params: _PARAMS_T | None = None,
+        data: str | bytes | None = None,
+        timeout: aiohttp.ClientTimeout | None = None,
+        retry_timeouts: bool = True,
+    ) -> str:
+        """Send a request to ``route`` and return the body of the response.
+        Requests that time out are only retried if ``retry_timeouts`` is
+        ``True``.
+
+        Raises:
+            :py:class:`aiohttp.ClientResponseError`: if OBS replied with an
+                error status, the message is the summary of the error that OBS
+                reported
+            :py:class:`aiohttp.ClientConnectionError`: if the connection
+                failed more than :py:attr:`retries` times
+
+        """
+        return (
+            await self._request(
+                method,
+                route,
+                _read_text,
+                params,
+                data,
+                timeout,
+                retry_timeouts=retry_timeouts,
+            )
+        )[1]
+
+    async def get_if_modified(
+        self, route: str, etag: str = "", last_modified: str = ""
+    ) -> tuple[str, str, str] | None:
+        """Fetch ``route`` unless it has not been modified since the response
+        with the ``ETag`` header ``etag`` or the ``Last-Modified`` header
+        ``last_modified`` was received.
+
+        Returns:
+            ``None`` if the resource is unchanged or otherwise the body of the
+            response with its ``ETag`` and ``Last-Modified`` headers (which are
+            empty if OBS did not send them).
+
+        Raises:
+            The same exceptions as :py:meth:`request`.
+
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        status, body, response_headers = await self._request(
+            "GET", route, _read_text, headers=headers
+        )
+        if status == 304:
+            return None
+        return (
+            body,
+            response_headers.get("ETag", ""),
+            response_headers.get("Last-Modified", ""),
+        )
+
+    async def _request(
+        self,
+        method: Literal["GET", "PUT", "POST", "DELETE"],
+        route: str,
+        read: Callable[[aiohttp.ClientResponse], Awaitable[_T]],
+        params: _PARAMS_T | None = None,
+        data: str | bytes | None = None,
+        timeout: aiohttp.ClientTimeout | None = None,
+        headers: dict[str, str] | None = None,
+        retry_timeouts: bool = True,
+    ) -> tuple[int, _T, CIMultiDictProxy[str]]:
+        """Send a request and read the body of a successful response with
+        ``read``, which is called again for each retry.
+
+        """
+        with span(
+            f"{method} /{route.lstrip('/').split('/')[0]}", "http", route=route
+        ) as http_span:
+            if data:
+                http_span.attrs["sent_bytes"] = len(data)
+            (
+                status,
+                body,
+                response_headers,
+                received_bytes,
+            ) = await self._request_with_retries(
+                method, route, read, params, data, timeout, headers, retry_timeouts
+            )
+            http_span.attrs["status"] = status
+            http_span.attrs["received_bytes"] = received_bytes
+            return status, body, response_headers
+
+    async def _request_with_retries(
+        self,
+        method: Literal["GET", "PUT", "POST", "DELETE"],
+        route: str,
+        read: Callable[[aiohttp.ClientResponse], Awaitable[_T]],
+        params: _PARAMS_T | None,
+        data: str | bytes | None,
+        timeout: aiohttp.ClientTimeout | None,
+        headers: dict[str, str] | None,
+        retry_timeouts: bool,
+    ) -> tuple[int, _T, CIMultiDictProxy[str], int]:
+        retries = self.retries if method in _IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(
+                    method,
+                    route,
+                    params=params,
+                    data=data,
+                    timeout=timeout or aiohttp.ClientTimeout(total=5 * 60),
+                    headers=headers,
+                ) as response:
+                    if response.ok or response.status == 304:
+                        return (
+                            response.status,
+                            await read(response),
+                            response.headers,
+                            response.content.total_bytes,
+                        )
+                    body = await response.text()
+                    if response.status == 401 and not self.password:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=f"No password for {self.api_url} has been "
+                            f"provided, set ${OSC_PASSWORD_ENVVAR_NAME} or the "
+                            "pass entry in the osc configuration file",
+                        )
+                    if response.status < 500 or attempt >= retries:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=_status_summary(body),
+                        )
+                    LOGGER.debug(
+                        "%s %s failed with %d: %s",
+                        method,
+                        route,
+                        response.status,
+                        _status_summary(body),
+                    )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                if attempt >= retries or (
+                    isinstance(exc, asyncio.TimeoutError) and not retry_timeouts
+                ):
+                    raise
+                LOGGER.debug("%s %s failed: %s", method, route, exc)
+
+            await asyncio.sleep(self.backoff_sec * 2**attempt)
+            attempt += 1
+
+    async def get_meta(self, project: str, package: str | None = None) -> str:
+        """Fetch the ``_meta`` of ``project`` or of ``package`` in ``project``."""
+        return await self.request("GET", _meta_route(project, package))
+
+    async def put_meta(
+        self, meta: str | bytes, project: str, package: str | None = None
+    ) -> None:
+        """Set the ``_meta`` of ``project`` or of ``package`` in ``project``,
+        creating the project or package if it does not exist.
+
+        """
+        await self.request("PUT", _meta_route(project, package), data=meta)
+
+    async def get_prjconf(self, project: str) -> str:
+        """Fetch the project configuration of ``project``."""
+        return await self.request("GET", f"/source/{project}/_config")
+
+    async def put_prjconf(self, project: str, prjconf: str) -> None:
+        """Set the project configuration of ``project``."""
+        await self.request("PUT", f"/source/{project}/_config", data=prjconf)
+
+    async def results(
+        self,
+        project: str,
+        repositories: list[str] | None = None,
+        packages: list[str] | None = None,
+        oldstate: str | None = None,
+        lastbuild: bool = False,
+        timeout: aiohttp.ClientTimeout | None = None,
+        retry_timeouts: bool = True,
+    ) -> tuple[list[RepositoryBuildResult], str]:
+        """Fetch the ``<resultlist>`` with the build results of ``project``,
+        optionally only of the specified ``repositories`` and ``packages``.
+
+        The reply is parsed while it is received, so that the ``<resultlist>``
+        of large projects is never kept in memory as a whole. The build
+        results are returned together with the ``state`` attribute of the
+        ``<resultlist>``.
+
+        If ``oldstate`` is set to the ``state`` attribute of a previously
+        fetched ``<resultlist>``, then OBS only replies once the state differs
+        from ``oldstate`` (or the server side timeout expired). If
+        ``lastbuild`` is ``True``, then OBS reports the result of the last
+        finished build instead of currently scheduled or running builds.
+        ``timeout`` overrides the default timeout of the request, which is
+        not retried once it expired if ``retry_timeouts`` is ``False``.
+
+        """
+        params: _PARAMS_T = [
+            ("view", "status"),
+            ("multibuild", "1"),
+            ("locallink", "1"),
+        ]
+        params.extend(("repository", repo) for repo in repositories or [])
+        params.extend(("package", pkg) for pkg in packages or [])
+        if oldstate:
+            params.append(("oldstate", oldstate))
+        if lastbuild:
+            params.append(("lastbuild", "1"))
+
+        async def _parse(
+            response: aiohttp.ClientResponse,
+        ) -> tuple[list[RepositoryBuildResult], str]:
+            parser = ResultListParser()
+            async for chunk in response.content.iter_chunked(_RESULTS_CHUNK_SIZE):
+                parser.feed(chunk)
+            return parser.close(), parser.state
+
+        return (
+            await self._request(
+                "GET",
+                f"/build/{project}/_result",
+                _parse,
+                params=params,
+                timeout=timeout,
+                retry_timeouts=retry_timeouts,
+            )
+        )[1]
+
+    async def wipe_binaries(
+        self, project: str, package: str | list[str] | None = None
+    ) -> None:
+        """Delete the built binaries of all packages in ``project`` or only of
+        ``package`` (or of all packages if a list is passed).
+
+        """
+        await self._build_cmd("wipe", project, package)
+
+    async def rebuild(
+        self, project: str, package: str | list[str] | None = None
+    ) -> None:
+        """Trigger a rebuild of all packages in ``project`` or only of
+        ``package`` (or of all packages if a list is passed).
+
+        """
+        await self._build_cmd("rebuild", project, package)
+
+    async def _build_cmd(
+        self, cmd: str, project: str, package: str | list[str] | None
+    ) -> None:
+        params: _PARAMS_T = [("cmd", cmd)]
+        packages = [package] if isinstance(package, str) else package or []
+        params.extend(("package", pkg) for pkg in packages)
+        await self.request("POST", f"/build/{project}", params=params)
+
+    async def built_source_md5s(
+        self, project: str, repository: str, arch: str, packages: list[str]
+    ) -> dict[str, str]:
+        """Returns the MD5 sum of the sources (the ``srcmd5``) from which each
+        of ``packages`` was last built successfully in ``repository`` and
+        ``arch``. Packages that have never been built successfully are
+        omitted.
+
+        """
+        params: _PARAMS_T = [("code", "succeeded")]
+        params.extend(("package", pkg) for pkg in packages)
+        jobhistlist = ET.fromstring(
+            await self.request(
+                "GET",
+                f"/build/{project}/{repository}/{arch}/_jobhistory",
+                params=params,
+            )
+        )
+        # the job history is sorted from the oldest to the newest job
+        return {
+            job.get("package", ""): job.get("srcmd5", "")
+            for job in jobhistlist.iter("jobhist")
+        }
+
+    async def source_md5(self, project: str, package: str) -> str:
+        """Returns the MD5 sum of the current expanded sources of ``package``,
+        i.e. of the sources after the links have been applied and the source
+        services have run. This is the ``srcmd5`` that OBS records for the
+        builds in the job history.
+
+        """
+        directory = ET.fromstring(
+            await self.request(
+                "GET", f"/source/{project}/{package}", params=[("expand", "1")]
+            )
+        )
+        for info in ("serviceinfo", "linkinfo"):
+            if (elem := directory.find(info)) is not None and (
+                xsrcmd5 := elem.get("xsrcmd5")
+            ):
+                return xsrcmd5
+        return directory.get("srcmd5", "")
+
+    async def service_state(self, project: str, package: str) -> tuple[str, str]:
+        """Returns the state of the last source service run of ``package`` (e.g.
+        ``running``, ``succeeded`` or ``failed``) and the error message of the
+        run. The state is empty if no service run has been scheduled for the
+        package yet.
+
+        """
+        directory = ET.fromstring(
+            await self.request("GET", f"/source/{project}/{package}")
+        )
+        if (serviceinfo := directory.find("serviceinfo")) is None:
+            return "", ""
+        return serviceinfo.get("code", ""), serviceinfo.findtext("error", "")
+
+    async def person(self, username: str) -> str:
+        """Fetch the ``<person>`` entry of the user ``username``."""
+        return await self.request("GET", f"/person/{username}")
+
+    async def list_packages(self, project: str) -> list[str]:
+        """Returns the names of all packages in ``project``."""
+        directory = ET.fromstring(await self.request("GET", f"/source/{project}"))
+        return [
+            entry.attrib["name"]
+            for entry in directory.iter("entry")
+            if "name" in entry.attrib
+        ]
+
+    async def delete_project(self, project: str, comment: str = "") -> None:
+        """Delete ``project`` including all its packages, even if other
+        projects depend on it.
+
+        """
+        params: _PARAMS_T = [("force", "1")]
+        if comment:
+            params.append(("comment", comment))
+        await self.request("DELETE", f"/source/{project}", params=params)
+
+    async def link_package(
+        self, source_project: str, package: str, target_project: str
+    ) -> None:
+        """Create the package ``package`` in ``target_project`` as a link to
+        the package with the same name in ``source_project``.
+
+        """
+        meta = ET.fromstring(await self.get_meta(source_project, package))
+        meta.attrib["project"] = target_project
+        for tag in ("person", "group", "devel", "lock", "scmsync"):
+            for elem in meta.findall(tag):
+                meta.remove(elem)
+
+        await self.put_meta(ET.tostring(meta), target_project, package)
+
+        (link := ET.Element("link")).attrib["project"] = source_project
+        link.attrib["package"] = package
+        await self.request(
+            "PUT", f"/source/{target_project}/{package}/_link", data=ET.tostring(link)
+        )
+
+
+def _meta_route(project: str, package: str | None) -> str:
+    return (
+        f"/source/{project}/{package}/_meta" if package else f"/source/{project}/_meta"
+    )
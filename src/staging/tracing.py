@@ -0,0 +1,226 @@
+"""Lightweight tracing of the phases of the bot's actions.
+
+Code marks a phase with :py:func:`span` (or :py:func:`traced` for coroutine
+functions). The spans are recorded by the :py:class:`Tracer` that was
+activated via :py:meth:`Tracer.activate` in the current context; without an
+active tracer, :py:func:`span` does nothing. Spans opened while another span
+is open are nested into it, also across :py:mod:`asyncio` tasks.
+
+The recorded spans can be exported in the `Chrome trace event format
+<https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU>`_
+(viewable in :file:`chrome://tracing` or https://ui.perfetto.dev) and summarized
+as a markdown table.
+
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Iterator
+from typing import TypeVar
+
+#: separator of the span names in the path of a span
+PATH_SEPARATOR = " › "
+
+_T = TypeVar("_T")
+
+
+@dataclass(slots=True)
+class Span:
+    """A phase with its start time and duration in microseconds."""
+
+    name: str
+
+    #: category of the span, e.g. ``phase``, ``cmd`` or ``http``
+    category: str
+
+    #: names of all enclosing spans and of this span joined by
+    #: :py:const:`PATH_SEPARATOR`
+    path: str
+
+    start_us: int = 0
+    duration_us: int = 0
+
+    #: additional information like exit codes or byte counts
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+_TRACER: contextvars.ContextVar["Tracer | None"] = contextvars.ContextVar(
+    "tracer", default=None
+)
+_CURRENT_SPAN: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+@dataclass
+class Tracer:
+    """Collects the spans of a process and of previous processes whose traces
+    were loaded via :py:meth:`load`.
+
+    """
+
+    #: the trace events of previous processes
+    events: list[dict[str, Any]] = field(default_factory=list)
+
+    spans: list[Span] = field(default_factory=list)
+
+    _task_ids: dict[int, int] = field(default_factory=dict, repr=False)
+
+    _tids: list[int] = field(default_factory=list, repr=False)
+
+    @staticmethod
+    def load(trace_file: str) -> "Tracer":
+        """Create a tracer that continues the trace in ``trace_file`` if it
+        exists.
+
+        """
+        try:
+            with open(trace_file, "r") as trace_f:
+                return Tracer(events=json.load(trace_f)["traceEvents"])
+        except FileNotFoundError:
+            return Tracer()
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """Record all spans in the current context with this tracer."""
+        token = _TRACER.set(self)
+        try:
+            yield self
+        finally:
+            _TRACER.reset(token)
+
+    def _tid(self) -> int:
+        # spans of concurrent tasks must not be drawn into the same row
+        try:
+            task = id(asyncio.current_task())
+        except RuntimeError:
+            task = 0
+        if task not in self._task_ids:
+            self._task_ids[task] = len(self._task_ids) + 1
+        return self._task_ids[task]
+
+    @property
+    def trace_events(self) -> list[dict[str, Any]]:
+        """The events of previous processes and of all spans of this process
+        in the Chrome trace event format.
+
+        """
+        pid = os.getpid()
+        return self.events + [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_us,
+                "dur": span.duration_us,
+                "pid": pid,
+                "tid": tid,
+                "args": {"path": span.path, **span.attrs},
+            }
+            for span, tid in zip(self.spans, self._tids)
+        ]
+
+    def write(self, trace_file: str) -> None:
+        """Write all events as a Chrome trace into ``trace_file``."""
+        with open(trace_file, "w") as trace_f:
+            json.dump({"traceEvents": self.trace_events}, trace_f)
+
+    def summary_markdown(self) -> str:
+        """A markdown table with the number of calls and the total duration of
+        each phase.
+
+        """
+        totals: dict[str, list[int]] = {}
+        for event in sorted(self.trace_events, key=lambda ev: ev["ts"]):
+            path = event.get("args", {}).get("path", event["name"])
+            totals.setdefault(path, [0, 0])
+            totals[path][0] += 1
+            totals[path][1] += event["dur"]
+
+        lines = ["| Phase | Calls | Total time |", "|-------|------:|-----------:|"]
+        for path, (calls, duration_us) in totals.items():
+            lines.append(f"| {path} | {calls} | {duration_us / 1e6:.2f}s |")
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "phase", **attrs: Any) -> Iterator[Span]:
+    """Record the enclosed block as a span with the ``name``.
+
+    Attributes can be added to the yielded span until the block is left. If
+    the block raises an exception, it is recorded in the ``error`` attribute.
+
+    """
+    parent = _CURRENT_SPAN.get()
+    current = Span(
+        name=name,
+        category=category,
+        path=f"{parent.path}{PATH_SEPARATOR}{name}" if parent else name,
+        attrs=attrs,
+    )
+    if (tracer := _TRACER.get()) is None:
+        yield current
+        return
+
+    token = _CURRENT_SPAN.set(current)
+    current.start_us = time.time_ns() // 1000
+    start = time.perf_counter_ns()
+    try:
+        yield current
+    except BaseException as exc:
+        current.attrs["error"] = repr(exc)
+        raise
+    finally:
+        current.duration_us = (time.perf_counter_ns() - start) // 1000
+        _CURRENT_SPAN.reset(token)
+        tracer.spans.append(current)
+        tracer._tids.append(tracer._tid())
+
+
+def traced(
+    func: Callable[..., Awaitable[_T]],
+) -> Callable[..., Awaitable[_T]]:
+    """Decorator recording every call of the coroutine function ``func`` as a
+    span with the name of the function.
+
+    """
+
+    @functools.wraps(func)
+    async def _wrapper(*args: Any, **kwargs: Any) -> _T:
+        with span(func.__name__):
+            return await func(*args, **kwargs)
+
+    return _wrapper
+
+
+@dataclass
+class TracedCommand:
+    """Wrapper around a :py:class:`~obs_package_update.util.RunCommand` that
+    records every command as a span with its exit code and the size of its
+    output.
+
+    """
+
+    run_cmd: Callable[..., Awaitable[Any]]
+
+    async def __call__(self, cmd: str, **kwargs: Any) -> Any:
+        with span("$ " + " ".join(cmd.split()[:2]), "cmd", cmd=cmd) as cmd_span:
+            res = await self.run_cmd(cmd, **kwargs)
+            for attr in ("exit_code", "stdout", "stderr"):
+                if (val := getattr(res, attr, None)) is None:
+                    continue
+                if isinstance(val, str):
+                    cmd_span.attrs[f"{attr}_bytes"] = len(val.encode())
+                else:
+                    cmd_span.attrs[attr] = val
+            return res
@@ -0,0 +1,330 @@
+"""Event driven watcher for the build results of a project on OBS."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+
+import aiohttp
+
+from bci_build.logger import LOGGER
+from bci_build.package import Arch
+from staging.build_result import PackageStatusCode
+from staging.build_result import RepositoryBuildResult
+from staging.obs import ObsClient
+
+#: package states in which the package is no longer built
+FINAL_PACKAGE_STATES = (
+    PackageStatusCode.SUCCEEDED,
+    PackageStatusCode.FAILED,
+    PackageStatusCode.UNRESOLVABLE,
+    PackageStatusCode.BROKEN,
+    PackageStatusCode.EXCLUDED,
+    PackageStatusCode.DISABLED,
+)
+
+#: codes of repositories that still have builds to schedule or to run
+_BUSY_REPOSITORY_CODES = ("scheduling", "blocked", "building")
+
+
+@dataclass(frozen=True)
+class PackageStateChange:
+    """Transition of the state of a package in a repository & architecture."""
+
+    repository: str
+    arch: Arch
+    package: str
+
+    #: previous state of the package, ``None`` if the package was not known
+    #: before
+    old: PackageStatusCode | None
+
+    #: the new state of the package
+    new: PackageStatusCode
+
+
+@dataclass
+class BuildResultWatcher:
+    """Watches the build results of a project by long polling the ``_result``
+    route of OBS.
+
+    Each poll passes the ``state`` of the previous ``<resultlist>`` to OBS,
+    which only replies once the state changed. Only the current state of each
+    package is kept and every change is passed to all :py:attr:`callbacks`.
+
+    With :py:attr:`lastbuild`, OBS reports the result of the last finished
+    build of a package that is currently rebuilt. The builds are therefore only
+    :py:attr:`finished` once no repository is busy anymore.
+
+    """
+
+    #: client used to talk to OBS
+    client: ObsClient
+
+    #: name of the watched project
+    project: str
+
+    #: repositories that are watched (all repositories if empty)
+    repositories: list[str] = field(default_factory=list)
+
+    #: functions that are called with every state change of a package
+    callbacks: list[Callable[[PackageStateChange], None]] = field(default_factory=list)
+
+    #: functions that are called with all state changes of a poll once the
+    #: current state has been updated, but only if anything changed
+    poll_callbacks: list[Callable[[list[PackageStateChange]], None]] = field(
+        default_factory=list
+    )
+
+    #: maximum time that a single long poll may take, the poll is restarted
+    #: afterwards
+    poll_timeout_sec: int = 5 * 60
+
+    #: time to wait between the polls while OBS reports no build results, these
+    #: polls do not wait for a change of the state
+    empty_poll_interval_sec: float = 30
+
+    #: report the result of the last finished build instead of the state of
+    #: scheduled or running builds
+    lastbuild: bool = True
+
+    _oldstate: str = ""
+
+    _results: dict[tuple[str, Arch], RepositoryBuildResult] = field(
+        default_factory=dict
+    )
+
+    @property
+    def results(self) -> list[RepositoryBuildResult]:
+        """The current build results of all watched repositories."""
+        return list(self._results.values())
+
+    @property
+    def finished(self) -> bool:
+        """``True`` if no repository is dirty or busy and all packages are in
+        a :py:const:`final state <FINAL_PACKAGE_STATES>`.
+
+        """
+        return all(
+            not repo_res.dirty
+            and repo_res.code not in _BUSY_REPOSITORY_CODES
+            and all(pkg.code in FINAL_PACKAGE_STATES for pkg in repo_res.packages)
+            for repo_res in self._results.values()
+        )
+
+    @property
+    def number_of_packages_with_results(self) -> int:
+        """Number of packages that are neither excluded nor only scheduled."""
+        return sum(
+            1
+            for repo_res in self._results.values()
+            for pkg in repo_res.packages
+            if pkg.code not in (PackageStatusCode.EXCLUDED, PackageStatusCode.SCHEDULED)
+        )
+
+    async def poll(self, long_poll: bool = True) -> list[PackageStateChange]:
+        """Wait for the next change of the build results (or until
+        :py:attr:`poll_timeout_sec` passed), update the current state and
+        return all package state changes.
+
+        The current build results are fetched right away if ``long_poll`` is
+        ``False`` or if no state of the build results has been seen yet.
+
+        """
+        try:
+            repo_results, state = await self.client.results(
+                self.project,
+                self.repositories,
+                oldstate=(self._oldstate or None) if long_poll else None,
+                lastbuild=self.lastbuild,
+                timeout=aiohttp.ClientTimeout(total=self.poll_timeout_sec),
+                # an expired poll is restarted right away by the caller
+                retry_timeouts=False,
+            )
+        except asyncio.TimeoutError:
+            LOGGER.debug("No change of the build results of %s", self.project)
+            return []
+
+        return self._update(repo_results, state)
+
+    def _update(
+        self, repo_results: list[RepositoryBuildResult], state: str
+    ) -> list[PackageStateChange]:
+        self._oldstate = state
+
+        changes = []
+        for repo_res in repo_results:
+            key = (repo_res.repository, repo_res.arch)
+
+            old_codes = {
+                pkg.name: pkg.code
+                for pkg in (self._results[key].packages if key in self._results else [])
+            }
+            for pkg in repo_res.packages:
+                if (old := old_codes.get(pkg.name)) != pkg.code:
+                    changes.append(
+                        PackageStateChange(
+                            repository=repo_res.repository,
+                            arch=repo_res.arch,
+                            package=pkg.name,
+                            old=old,
+                            new=pkg.code,
+                        )
+                    )
+            self._results[key] = repo_res
+
+        for change in changes:
+            for callback in self.callbacks:
+                callback(change)
+        if changes:
+            for poll_callback in self.poll_callbacks:
+                poll_callback(changes)
+
+        return changes
+
+    async def wait_until_finished(
+        self, max_empty_polls: int = 10
+    ) -> list[RepositoryBuildResult]:
+        """Poll OBS until all builds are :py:attr:`finished` and return the
+        build results.
+
+        OBS sometimes reports no packages at all shortly after a project has
+        been set up. Polling therefore continues until at least one package has
+        a result, but at most for ``max_empty_polls`` further polls. OBS will
+        not change the state of the build results until it reports packages,
+        so these polls do not wait for a change but are sent every
+        :py:attr:`empty_poll_interval_sec`.
+
+        """
+        empty_polls = 0
+        await self.poll()
+        while True:
+            if not self.finished:
+                await self.poll()
+                continue
+            if (
+                self.number_of_packages_with_results > 0
+                or empty_polls >= max_empty_polls
+            ):
+                return self.results
+            empty_polls += 1
+            await asyncio.sleep(self.empty_poll_interval_sec)
+            await self.poll(long_poll=False)
+
+
+#: HTTP status codes with which OBS signals that it is overloaded
+_THROTTLING_STATUS_CODES = (429, 503)
+
+
+@dataclass
+class ServiceWaiter:
+    """Waits for the source service runs of many packages by polling their
+    service state.
+
+    The states are polled by a pool of at most :py:attr:`max_concurrency`
+    concurrent requests, so that not all of the service wait slots of OBS are
+    occupied. If OBS throttles the requests, the pool size is halved and the
+    poll interval doubled, both recover gradually once the requests succeed
+    again.
+
+    A freshly created package does not exist for a short while and afterwards
+    has no service state until its first service run has been scheduled, both
+    are treated like a running service.
+
+    """
+
+    #: client used to talk to OBS
+    client: ObsClient
+
+    #: name of the project of the packages
+    project: str
+
+    #: upper limit of concurrent requests
+    max_concurrency: int = 4
+
+    #: time to wait between two polls of a package
+    poll_interval_sec: float = 5.0
+
+    #: upper limit of the poll interval when OBS throttles the requests
+    max_poll_interval_sec: float = 120.0
+
+    #: maximum time to wait for all service runs
+    timeout_sec: float = 60 * 60
+
+    _concurrency: int = 0
+
+    _interval_sec: float = 0.0
+
+    async def _poll(
+        self, package: str, semaphore: asyncio.Semaphore
+    ) -> tuple[str, str] | None:
+        async with semaphore:
+            try:
+                return await self.client.service_state(self.project, package)
+            except aiohttp.ClientResponseError as err:
+                if err.status == 404:
+                    # the package has not been created yet
+                    return "", ""
+                if err.status not in _THROTTLING_STATUS_CODES:
+                    raise
+                LOGGER.debug("OBS throttles the service state polls: %s", err)
+                return None
+
+    async def wait(self, packages: list[str]) -> None:
+        """Wait until the service runs of all ``packages`` have finished.
+
+        Raises:
+            :py:class:`RuntimeError`: if the service run of any package failed
+            :py:class:`asyncio.TimeoutError`: if the service runs did not
+                finish within :py:attr:`timeout_sec`
+
+        """
+        self._concurrency = self.max_concurrency
+        self._interval_sec = self.poll_interval_sec
+        deadline = time.monotonic() + self.timeout_sec
+
+        pending = list(packages)
+        failed: dict[str, str] = {}
+
+        while pending:
+            semaphore = asyncio.Semaphore(self._concurrency)
+            states = await asyncio.gather(
+                *(self._poll(pkg, semaphore) for pkg in pending)
+            )
+
+            if any(state is None for state in states):
+                self._concurrency = max(1, self._concurrency // 2)
+                self._interval_sec = min(
+                    2 * self._interval_sec, self.max_poll_interval_sec
+                )
+            else:
+                self._concurrency = min(self._concurrency + 1, self.max_concurrency)
+                self._interval_sec = max(self._interval_sec / 2, self.poll_interval_sec)
+
+            still_pending = []
+            for pkg, state in zip(pending, states):
+                if state is None or state[0] in ("", "running"):
+                    still_pending.append(pkg)
+                elif state[0] == "failed":
+                    failed[pkg] = state[1]
+            pending = still_pending
+
+            if pending:
+                if time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError(
+                        "Service runs did not finish within "
+                        f"{self.timeout_sec}s: {', '.join(pending)}"
+                    )
+                LOGGER.debug(
+                    "Waiting for the service runs of %s (concurrency: %d)",
+                    ", ".join(pending),
+                    self._concurrency,
+                )
+                await asyncio.sleep(self._interval_sec)
+
+        if failed:
+            raise RuntimeError(
+                "Service run failed for "
+                + ", ".join(f"{pkg}: {err}" for pkg, err in failed.items())
+            )
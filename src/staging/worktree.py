@@ -0,0 +1,171 @@
+"""Pool of persistent git worktrees in which the bot prepares its commits."""
+
+import asyncio
+import contextlib
+import os
+from dataclasses import dataclass
+from dataclasses import field
+from typing import AsyncGenerator
+
+from bci_build.logger import LOGGER
+from staging.tracing import span
+
+
+async def _git(*args: str, cwd: str) -> str:
+    """Runs :command:`git` with ``args`` in ``cwd`` and returns its stdout.
+
+    Raises:
+        :py:class:`RuntimeError`: if :command:`git` exits with a non-zero
+            exit code
+
+    """
+    with span(f"$ git {args[0]}", "cmd", cmd=" ".join(("git", *args))) as cmd:
+        proc = await asyncio.create_subprocess_exec(
+            "git",
+            *args,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate()
+        cmd.attrs["exit_code"] = proc.returncode
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"git {' '.join(args)} failed with {proc.returncode}: "
+            + stderr.decode().strip()
+        )
+    return stdout.decode()
+
+
+@dataclass
+class WorktreePool:
+    """Keeps one worktree per key (e.g. the deployment branch) alive between
+    bot actions.
+
+    The first checkout of a key creates the worktree, every following checkout
+    only resets it to the requested branch, so that :command:`git` has to
+    update only the files that differ instead of checking out the whole tree.
+    The worktrees are stored in the :file:`.git` directory of the repository
+    so that they neither appear as untracked files nor have to be cleaned up.
+
+    All worktrees share the refs and the objects of the repository. Commands
+    that update them from several coroutines at once (e.g. :command:`git
+    fetch` or :command:`git push` of bots for different OS versions) fail on
+    git's lock files, they have to hold :py:attr:`repository_lock`.
+
+    """
+
+    #: path to the git repository whose worktrees are managed
+    repo_path: str = "."
+
+    #: lock of the repository that is shared by all worktrees
+    repository_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    _root: str = ""
+
+    _locks: dict[str, asyncio.Lock] = field(default_factory=dict, repr=False)
+
+    async def root(self) -> str:
+        """Directory in which the worktrees are created."""
+        if not self._root:
+            common_dir = (
+                await _git("rev-parse", "--git-common-dir", cwd=self.repo_path)
+            ).strip()
+            self._root = os.path.join(
+                os.path.abspath(os.path.join(self.repo_path, common_dir)),
+                "bot-worktrees",
+            )
+        return self._root
+
+    @contextlib.asynccontextmanager
+    async def checkout(
+        self,
+        key: str,
+        branch: str,
+        origin_ref: str,
+        sparse_paths: list[str] | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """Check out ``origin_ref`` as the new ``branch`` in the worktree of
+        ``key`` and yield the path to the worktree.
+
+        All local changes, untracked files and interrupted rebases from
+        previous actions are discarded. If ``sparse_paths`` are provided, then
+        only these directories (and the files in the top level directory) are
+        checked out.
+
+        Once the context is left, ``branch`` is detached from the worktree so
+        that it can be checked out elsewhere.
+
+        """
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            worktree_dir = os.path.join(await self.root(), key)
+
+            if os.path.exists(os.path.join(worktree_dir, ".git")):
+                LOGGER.debug("Reusing the worktree %s", worktree_dir)
+                await self._abort_rebase(worktree_dir)
+            else:
+                async with self.repository_lock:
+                    # remove the administrative files of a worktree that has
+                    # been deleted by someone else
+                    await _git("worktree", "prune", cwd=self.repo_path)
+                    await _git(
+                        "worktree",
+                        "add",
+                        "--detach",
+                        "--no-checkout",
+                        worktree_dir,
+                        origin_ref,
+                        cwd=self.repo_path,
+                    )
+
+            if sparse_paths:
+                await _git(
+                    "sparse-checkout", "set", "--cone", *sparse_paths, cwd=worktree_dir
+                )
+            elif await self._is_sparse(worktree_dir):
+                await _git("sparse-checkout", "disable", cwd=worktree_dir)
+
+            await _git(
+                "checkout", "--force", "-B", branch, origin_ref, cwd=worktree_dir
+            )
+            await _git("clean", "-ffdx", cwd=worktree_dir)
+
+            try:
+                yield worktree_dir
+            finally:
+                try:
+                    await _git("checkout", "--detach", cwd=worktree_dir)
+                except RuntimeError as err:
+                    # the next checkout resets the worktree anyway
+                    LOGGER.debug("Could not detach %s: %s", branch, err)
+
+    async def remove(self, key: str) -> None:
+        """Remove the worktree of ``key`` if it exists."""
+        worktree_dir = os.path.join(await self.root(), key)
+        if os.path.exists(worktree_dir):
+            async with self.repository_lock:
+                await _git(
+                    "worktree", "remove", "--force", worktree_dir, cwd=self.repo_path
+                )
+
+    @staticmethod
+    async def _is_sparse(worktree_dir: str) -> bool:
+        return (
+            await _git(
+                "config",
+                "--get",
+                "--default=false",
+                "core.sparseCheckout",
+                cwd=worktree_dir,
+            )
+        ).strip() == "true"
+
+    @staticmethod
+    async def _abort_rebase(worktree_dir: str) -> None:
+        git_dir = (
+            await _git("rev-parse", "--absolute-git-dir", cwd=worktree_dir)
+        ).strip()
+        if os.path.exists(os.path.join(git_dir, "rebase-merge")) or os.path.exists(
+            os.path.join(git_dir, "rebase-apply")
+        ):
+            await _git("rebase", "--abort", cwd=worktree_dir)
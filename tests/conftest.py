@@ -1,3 +1,6 @@
+import os
+import pathlib
+from typing import AsyncGenerator
 from typing import Generator
 from typing import List
 from typing import Tuple
@@ -6,6 +9,7 @@ from typing import TypedDict
 from typing import Union
 
 import pytest
+import pytest_asyncio
 from _pytest.fixtures import SubRequest
 from _pytest.python import Metafunc
 
@@ -14,6 +18,10 @@ from bci_build.package import BaseContainerImage
 from bci_build.package import LanguageStackContainer
 from bci_build.package import OsContainer
 from bci_build.package import OsVersion
+from staging.obs import ObsClient
+
+from .fake_obs import FakeObs
+from .fake_obs import GitOrigin
 
 BCI_CLASSES = [OsContainer, LanguageStackContainer, ApplicationStackContainer]
 
@@ -56,3 +64,48 @@ def bci(request: SubRequest) -> Generator[BCI_FIXTURE_RET_T, None, None]:
 def pytest_generate_tests(metafunc: Metafunc):
     if "bci" in metafunc.fixturenames:
         metafunc.parametrize("bci", BCI_CLASSES, indirect=True)
+
+
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Bot Tester",
+    "GIT_AUTHOR_EMAIL": "bot@example.com",
+    "GIT_COMMITTER_NAME": "Bot Tester",
+    "GIT_COMMITTER_EMAIL": "bot@example.com",
+}
+
+
+@pytest.fixture
+def git_origin(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> Generator[GitOrigin, None, None]:
+    """Bare git repository with all deployment branches that is the origin of a
+    clone, which is the current working directory during the test.
+
+    """
+    for key, value in _GIT_ENV.items():
+        monkeypatch.setenv(key, value)
+
+    origin = GitOrigin.create(
+        tmp_path,
+        branches=[os_version.deployment_branch_name for os_version in OsVersion]
+        + [f"for-deploy-{os_version}" for os_version in OsVersion],
+        files={
+            "_config": "",
+            ".obs/workflows.yml": "",
+            "pcp-image/pcp-image.changes": "",
+        },
+    )
+    monkeypatch.setenv("PATH", f"{origin.bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(origin.clone_path)
+    yield origin
+
+
+@pytest_asyncio.fixture
+async def fake_obs_server() -> AsyncGenerator[tuple[FakeObs, ObsClient], None]:
+    """A :py:class:`~tests.fake_obs.FakeObs` running on a local port and a
+    client connected to it.
+
+    """
+    obs = FakeObs()
+    async with obs.serve() as client:
+        yield obs, client
@@ -0,0 +1,486 @@
+"""Local stand-ins for OBS and the git remote to exercise the bot end to end.
+
+:py:class:`FakeObs` is an :py:mod:`aiohttp` application implementing the
+subset of the OBS API that the bot uses and replays scripted build result
+timelines. :py:class:`GitOrigin` creates a bare git repository that is used as
+``origin`` by a clone in the current working directory and counts all
+:command:`git` invocations via a wrapper script in :envvar:`PATH`.
+:py:class:`BotRunReport` combines both to record the wall time, HTTP requests
+and git calls per bot action.
+
+"""
+
+import asyncio
+import collections
+import contextlib
+import hashlib
+import pathlib
+import shutil
+import stat
+import subprocess
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from dataclasses import field
+from typing import AsyncGenerator
+from typing import Iterator
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bci_build.package import Arch
+from staging.build_result import PackageStatusCode
+from staging.obs import ObsClient
+
+#: package states which OBS does not change anymore without a trigger
+_FINAL_STATES = (
+    PackageStatusCode.SUCCEEDED,
+    PackageStatusCode.FAILED,
+    PackageStatusCode.UNRESOLVABLE,
+    PackageStatusCode.BROKEN,
+    PackageStatusCode.EXCLUDED,
+    PackageStatusCode.DISABLED,
+)
+
+#: the state of all packages in a project at one point in time
+BUILD_STEP_T = dict[str, PackageStatusCode]
+
+_DEVEL_META = """<project name="{name}">
+  <title>BCI Development project</title>
+  <description/>
+  <repository name="images">
+    <path project="{name}" repository="containerfile"/>
+    <arch>x86_64</arch>
+    <arch>aarch64</arch>
+  </repository>
+  <repository name="containerfile">
+    <path project="{name}" repository="standard"/>
+    <arch>x86_64</arch>
+    <arch>aarch64</arch>
+  </repository>
+  <repository name="standard">
+    <arch>x86_64</arch>
+    <arch>aarch64</arch>
+  </repository>
+</project>
+"""
+
+_PERSON = """<person>
+  <login>{login}</login>
+  <email>{login}@example.com</email>
+  <realname>{login} tester</realname>
+</person>
+"""
+
+
+def _resultlist(
+    project: str, repositories: list[str], arches: list[Arch], step: BUILD_STEP_T
+) -> str:
+    (resultlist := ET.Element("resultlist")).attrib["state"] = ""
+    dirty = any(code not in _FINAL_STATES for code in step.values())
+
+    for repo in repositories:
+        for arch in arches:
+            result = ET.SubElement(
+                resultlist,
+                "result",
+                project=project,
+                repository=repo,
+                arch=str(arch),
+                code="building" if dirty else "published",
+                state="building" if dirty else "published",
+            )
+            if dirty:
+                result.attrib["dirty"] = "true"
+            for pkg_name, code in step.items():
+                ET.SubElement(result, "status", package=pkg_name, code=str(code))
+
+    resultlist.attrib["state"] = hashlib.md5(ET.tostring(resultlist)).hexdigest()
+    return ET.tostring(resultlist).decode()
+
+
+@dataclass
+class FakeObs:
+    """In-memory fake of the OBS API."""
+
+    #: architectures that are reported in the build results
+    arches: list[Arch] = field(default_factory=lambda: [Arch.X86_64, Arch.AARCH64])
+
+    #: number of requests by method and route, e.g. ``PUT /source/{prj}/_meta``
+    calls: collections.Counter[str] = field(default_factory=collections.Counter)
+
+    #: files stored by route (``_meta``, ``_config``, ``_link``)
+    files: dict[str, str] = field(default_factory=dict)
+
+    #: commands sent to a route (e.g. ``rebuild`` to ``/build/$prj``)
+    commands: list[str] = field(default_factory=list)
+
+    #: query parameters of all requests of the build results
+    result_queries: list[dict[str, str]] = field(default_factory=list)
+
+    #: project configuration of the development projects
+    devel_prjconf: str = "Prefer: foo\n"
+
+    #: number of polls per package that report that the package does not
+    #: exist yet, followed by polls reporting no service state
+    missing_package_polls: int = 0
+
+    #: number of polls per package that report no service state, before the
+    #: service is running
+    missing_serviceinfo_polls: int = 0
+
+    #: number of service state polls per package that report a running
+    #: service before it succeeds
+    service_polls: int = 0
+
+    #: packages whose service run fails with the error message
+    failing_services: dict[str, str] = field(default_factory=dict)
+
+    #: MD5 sums of the current expanded sources of the packages (after the
+    #: service run), defaults to the MD5 sum of the package name. The
+    #: unexpanded sources have a different MD5 sum.
+    source_md5s: dict[str, str] = field(default_factory=dict)
+
+    #: MD5 sums of the sources of the last successful build of the packages
+    built_source_md5s: dict[str, str] = field(default_factory=dict)
+
+    #: number of upcoming service state polls that are rejected with ``429``
+    throttled_polls: int = 0
+
+    #: highest number of service state polls that were handled concurrently
+    max_concurrent_polls: int = 0
+
+    _concurrent_polls: int = 0
+
+    _service_polls: collections.Counter[str] = field(
+        default_factory=collections.Counter
+    )
+
+    _timelines: dict[str, list[str]] = field(default_factory=dict)
+
+    _position: dict[str, int] = field(default_factory=dict)
+
+    def script_build(self, project: str, steps: list[BUILD_STEP_T]) -> None:
+        """Set the timeline of build results of ``project``.
+
+        The ``_result`` route replies with the first step. Every request
+        passing the ``state`` of the current step as ``oldstate`` advances the
+        timeline by one step, until the last step is reached.
+
+        """
+        meta = self.files.get(f"/source/{project}/_meta")
+        repositories = (
+            [
+                repo.attrib["name"]
+                for repo in ET.fromstring(meta).iter("repository")
+                if repo.attrib.get("name") != "standard"
+            ]
+            if meta
+            else ["images", "containerfile"]
+        )
+        self._timelines[project] = [
+            _resultlist(project, repositories, self.arches, step) for step in steps
+        ]
+        self._position[project] = 0
+
+    @property
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/public/source/{prj}/_meta", self._public_meta)
+        app.router.add_get("/public/source/{prj}/_config", self._public_config)
+        app.router.add_get("/build/{prj}/_result", self._result)
+        app.router.add_get("/build/{prj}/{repo}/{arch}/_jobhistory", self._jobhistory)
+        app.router.add_post("/build/{prj}", self._command)
+        app.router.add_get("/person/{login}", self._person)
+        app.router.add_get("/source/{prj}", self._list_packages)
+        app.router.add_post("/source/{prj}/{pkg}", self._command)
+        app.router.add_delete("/source/{prj}", self._delete_project)
+        for route in (
+            "/source/{prj}/_meta",
+            "/source/{prj}/_config",
+            "/source/{prj}/{pkg}/_meta",
+            "/source/{prj}/{pkg}/_link",
+        ):
+            app.router.add_get(route, self._get_file)
+            app.router.add_put(route, self._put_file)
+        app.router.add_get("/source/{prj}/{pkg}", self._service_state)
+
+        @web.middleware
+        async def _count(request: web.Request, handler):
+            assert (resource := request.match_info.route.resource)
+            self.calls[f"{request.method} {resource.canonical}"] += 1
+            return await handler(request)
+
+        app.middlewares.append(_count)
+        return app
+
+    @contextlib.asynccontextmanager
+    async def serve(self) -> AsyncGenerator[ObsClient, None]:
+        """Run the fake OBS on a local port and yield a client talking to it."""
+        async with TestServer(self.app) as server:
+            async with ObsClient(
+                username="bot",
+                password="secret",
+                api_url=f"http://{server.host}:{server.port}",
+                backoff_sec=0,
+            ) as client:
+                yield client
+
+    @staticmethod
+    def _conditional(request: web.Request, text: str) -> web.Response:
+        etag = f'"{hashlib.md5(text.encode()).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=text, headers={"ETag": etag})
+
+    async def _public_meta(self, request: web.Request) -> web.Response:
+        return self._conditional(
+            request, _DEVEL_META.format(name=request.match_info["prj"])
+        )
+
+    async def _public_config(self, request: web.Request) -> web.Response:
+        return self._conditional(request, self.devel_prjconf)
+
+    async def _result(self, request: web.Request) -> web.Response:
+        prj = request.match_info["prj"]
+        self.result_queries.append(dict(request.query))
+        if not (timeline := self._timelines.get(prj)):
+            return web.Response(text='<resultlist state="empty"/>')
+
+        pos = self._position[prj]
+        if request.query.get("oldstate") == ET.fromstring(timeline[pos]).get(
+            "state"
+        ) and pos + 1 < len(timeline):
+            self._position[prj] = pos = pos + 1
+        return web.Response(text=timeline[pos])
+
+    async def _jobhistory(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text="<jobhistlist>"
+            + "".join(
+                f'<jobhist package="{pkg}" srcmd5="{self.built_source_md5s[pkg]}" code="succeeded"/>'
+                for pkg in request.query.getall("package", [])
+                if pkg in self.built_source_md5s
+            )
+            + "</jobhistlist>"
+        )
+
+    def source_md5(self, package: str) -> str:
+        return self.source_md5s.get(package, hashlib.md5(package.encode()).hexdigest())
+
+    async def _command(self, request: web.Request) -> web.Response:
+        self.commands.append(
+            " ".join(
+                [request.path, str(request.query.get("cmd"))]
+                + request.query.getall("package", [])
+            )
+        )
+        return web.Response(text='<status code="ok"/>')
+
+    async def _person(self, request: web.Request) -> web.Response:
+        return web.Response(text=_PERSON.format(login=request.match_info["login"]))
+
+    async def _list_packages(self, request: web.Request) -> web.Response:
+        prefix = f"/source/{request.match_info['prj']}/"
+        packages = sorted(
+            {
+                route[len(prefix) :].split("/")[0]
+                for route in self.files
+                if route.startswith(prefix) and route.count("/") == 4
+            }
+        )
+        return web.Response(
+            text="<directory>"
+            + "".join(f'<entry name="{pkg}"/>' for pkg in packages)
+            + "</directory>"
+        )
+
+    async def _service_state(self, request: web.Request) -> web.Response:
+        self._concurrent_polls += 1
+        self.max_concurrent_polls = max(
+            self.max_concurrent_polls, self._concurrent_polls
+        )
+        try:
+            # give concurrent polls the chance to overlap
+            await asyncio.sleep(0.01)
+        finally:
+            self._concurrent_polls -= 1
+
+        if self.throttled_polls > 0:
+            self.throttled_polls -= 1
+            return web.Response(
+                status=429,
+                text='<status code="too_many_requests"><summary>slow down</summary></status>',
+            )
+
+        pkg = request.match_info["pkg"]
+        self._service_polls[pkg] += 1
+        polls = self._service_polls[pkg]
+        if polls <= self.missing_package_polls:
+            return web.Response(
+                status=404,
+                text='<status code="unknown_package"><summary>not found</summary></status>',
+            )
+        polls -= self.missing_package_polls
+        if polls <= self.missing_serviceinfo_polls:
+            serviceinfo = ""
+        elif polls - self.missing_serviceinfo_polls <= self.service_polls:
+            serviceinfo = '<serviceinfo code="running"/>'
+        elif (error := self.failing_services.get(pkg)) is not None:
+            serviceinfo = (
+                f'<serviceinfo code="failed"><error>{error}</error></serviceinfo>'
+            )
+        else:
+            serviceinfo = (
+                f'<serviceinfo code="succeeded" xsrcmd5="{self.source_md5(pkg)}"/>'
+            )
+        # only the service run produces the expanded sources
+        srcmd5 = hashlib.md5(f"_service:{pkg}".encode()).hexdigest()
+        return web.Response(
+            text=f'<directory name="{pkg}" srcmd5="{srcmd5}">{serviceinfo}</directory>'
+        )
+
+    async def _delete_project(self, request: web.Request) -> web.Response:
+        prefix = f"/source/{request.match_info['prj']}/"
+        for route in [route for route in self.files if route.startswith(prefix)]:
+            del self.files[route]
+        return web.Response(text='<status code="ok"/>')
+
+    async def _get_file(self, request: web.Request) -> web.Response:
+        if (content := self.files.get(request.path)) is None:
+            return web.Response(
+                status=404,
+                text='<status code="unknown_package"><summary>not found</summary></status>',
+            )
+        return web.Response(text=content)
+
+    async def _put_file(self, request: web.Request) -> web.Response:
+        self.files[request.path] = await request.text()
+        return web.Response(text='<status code="ok"/>')
+
+
+_GIT_WRAPPER = """#!/bin/sh
+echo "$1" >> "{log}"
+exec "{git}" "$@"
+"""
+
+
+@dataclass
+class GitOrigin:
+    """A bare git repository in ``path`` that is the ``origin`` of a clone in
+    ``clone_path``.
+
+    """
+
+    path: pathlib.Path
+
+    clone_path: pathlib.Path
+
+    #: directory with the :command:`git` wrapper, has to be prepended to
+    #: :envvar:`PATH` for counting the calls
+    bin_dir: pathlib.Path
+
+    _log: pathlib.Path
+
+    @staticmethod
+    def create(
+        tmp_path: pathlib.Path, branches: list[str], files: dict[str, str]
+    ) -> "GitOrigin":
+        """Create the origin with the ``branches``, each containing ``files``,
+        and clone it.
+
+        """
+        origin = tmp_path / "origin.git"
+        seed = tmp_path / "seed"
+        clone = tmp_path / "clone"
+
+        def _git(*args: str, cwd: pathlib.Path = seed) -> None:
+            subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+        subprocess.run(
+            ["git", "init", "--bare", str(origin)], check=True, capture_output=True
+        )
+        seed.mkdir()
+        _git("init")
+        for fname, content in files.items():
+            (seed / fname).parent.mkdir(parents=True, exist_ok=True)
+            (seed / fname).write_text(content)
+        _git("add", ".")
+        _git("commit", "-m", "Initial commit")
+        _git("remote", "add", "origin", str(origin))
+        for branch in branches:
+            _git("push", "origin", f"HEAD:refs/heads/{branch}")
+
+        subprocess.run(
+            ["git", "clone", str(origin), str(clone)], check=True, capture_output=True
+        )
+
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        log = tmp_path / "git-calls.log"
+        log.touch()
+        (wrapper := bin_dir / "git").write_text(
+            _GIT_WRAPPER.format(log=log, git=shutil.which("git"))
+        )
+        wrapper.chmod(wrapper.stat().st_mode | stat.S_IEXEC)
+
+        return GitOrigin(path=origin, clone_path=clone, bin_dir=bin_dir, _log=log)
+
+    @property
+    def calls(self) -> collections.Counter[str]:
+        """Number of :command:`git` invocations by subcommand."""
+        return collections.Counter(self._log.read_text().splitlines())
+
+
+@dataclass
+class ActionStats:
+    """Costs of a single bot action."""
+
+    action: str
+    wall_time_sec: float
+    http_calls: collections.Counter[str]
+    git_calls: collections.Counter[str]
+
+
+@dataclass
+class BotRunReport:
+    """Records the wall time, HTTP requests and :command:`git` calls of each
+    bot action.
+
+    """
+
+    obs: FakeObs
+
+    origin: GitOrigin
+
+    actions: list[ActionStats] = field(default_factory=list)
+
+    @contextlib.contextmanager
+    def measure(self, action: str) -> Iterator[None]:
+        http_before = self.obs.calls.copy()
+        git_before = self.origin.calls
+        start = time.perf_counter()
+        yield
+        self.actions.append(
+            ActionStats(
+                action=action,
+                wall_time_sec=time.perf_counter() - start,
+                http_calls=self.obs.calls - http_before,
+                git_calls=self.origin.calls - git_before,
+            )
+        )
+
+    def __getitem__(self, action: str) -> ActionStats:
+        return next(stats for stats in self.actions if stats.action == action)
+
+    def __str__(self) -> str:
+        lines = [
+            "action | wall time | HTTP requests | git calls",
+            "-------|-----------|---------------|----------",
+        ]
+        for stats in self.actions:
+            lines.append(
+                f"{stats.action} | {stats.wall_time_sec:.2f}s | "
+                f"{stats.http_calls.total()} | {stats.git_calls.total()}"
+            )
+        return "\n".join(lines)
@@ -1,12 +1,28 @@
+import functools
 import os
 import pathlib
 
 import pytest
 import yaml
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
+import staging.bot
 from bci_build.package import ALL_NONBASE_OS_VERSIONS
 from bci_build.package import OsVersion
+from bci_build.package_index import installed_packages
 from staging.bot import StagingBot
+from staging.bot import StagingBotMatrix
+from staging.bot import _get_bci_project_name
+from staging.build_history import BuildHistory
+from staging.build_result import PackageStatusCode
+from staging.build_result import is_build_failed
+from staging.config_cache import ConfigCache
+from staging.obs import ObsClient
+
+from .fake_obs import BotRunReport
+from .fake_obs import FakeObs
+from .fake_obs import GitOrigin
 
 
 @pytest.fixture(autouse=True)
@@ -40,6 +56,35 @@ async def test_load_from_env(
     assert await StagingBot.from_env_file() == bot
 
 
+@pytest.mark.asyncio
+async def test_matrix_shares_resources():
+    matrix = StagingBotMatrix.from_os_versions(
+        [OsVersion.SP6, OsVersion.TUMBLEWEED], osc_username="foobar"
+    )
+    await matrix.setup()
+    try:
+        sp6, tw = matrix.bots
+        assert sp6._obs is tw._obs
+        assert sp6._commit_graph is tw._commit_graph
+        assert sp6._worktrees is tw._worktrees
+        assert sp6._history is tw._history
+        assert sp6.branch_name != tw.branch_name
+
+        await sp6.write_env_file()
+        await tw.write_env_file()
+        assert sorted(os.listdir(".")) == [
+            "test-build-6.env",
+            "test-build-Tumbleweed.env",
+        ]
+    finally:
+        await matrix.teardown()
+
+    with pytest.raises(ValueError, match="only be used by one bot"):
+        StagingBotMatrix.from_os_versions(
+            [OsVersion.SP6, OsVersion.SP6], osc_username="foobar"
+        )
+
+
 _osc_user = "defolos"
 
 
@@ -98,3 +143,167 @@ _bot = StagingBot(os_version=OsVersion.SP5, osc_username=_osc_user)
 )
 def test_github_actions_valid_yaml(action: str) -> None:
     assert yaml.safe_load(action)
+
+
+@pytest.mark.asyncio
+async def test_write_pkg_configs_deduplicates():
+    routes: list[str] = []
+
+    async def record(request: web.Request) -> web.Response:
+        routes.append(request.path)
+        return web.Response(text="<status code='ok'/>")
+
+    app = web.Application()
+    app.router.add_put("/source/{prj}/{pkg}/_meta", record)
+
+    async with TestServer(app) as server:
+        bot = StagingBot(os_version=OsVersion.TUMBLEWEED, osc_username="foobar")
+        bot._obs = ObsClient(api_url=f"http://{server.host}:{server.port}")
+        bcis = list(bot.bcis)
+
+        await bot.write_pkg_configs(
+            bcis + bcis, git_branch_name="foo", target_obs_project="home:foobar"
+        )
+        await bot.teardown()
+
+    assert sorted(routes) == sorted(
+        f"/source/home:foobar/{pkg_name}/_meta"
+        for pkg_name in {bci.package_name for bci in bcis}
+    )
+
+
+_FAKE_VC = """#!/bin/sh
+# stand-in for obs-build's vc: vc -m "$entry" $changes_file
+printf -- '-------------------------------------------------------------------\\n%s - %s\\n\\n- %s\\n\\n' "$(date)" "$VC_MAILADDR" "$2" >> "$3"
+"""
+
+
+@pytest.mark.asyncio
+async def test_bot_actions_against_fake_obs(
+    git_origin: GitOrigin,
+    fake_obs_server: tuple[FakeObs, ObsClient],
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    obs, client = fake_obs_server
+    report = BotRunReport(obs=obs, origin=git_origin)
+
+    (vc := tmp_path / "vc").write_text(_FAKE_VC)
+    vc.chmod(0o755)
+    monkeypatch.setattr(staging.bot, "VC_CMD", str(vc))
+
+    # the new packages appear and start their service runs with a delay
+    obs.missing_package_polls = 1
+    obs.missing_serviceinfo_polls = 1
+    obs.service_polls = 1
+    monkeypatch.setattr(
+        staging.bot,
+        "ServiceWaiter",
+        functools.partial(staging.bot.ServiceWaiter, poll_interval_sec=0),
+    )
+
+    bot = StagingBot(os_version=OsVersion.TUMBLEWEED, osc_username="bot")
+    bot._obs = client
+    bot._configs = ConfigCache(cache_dir="")
+    bot._history = BuildHistory(db_path="")
+
+    with report.measure("scratch_build"):
+        assert await bot.scratch_build("Test build")
+
+    assert bot.package_names
+    scratch_build = report["scratch_build"]
+    assert scratch_build.http_calls["PUT /source/{prj}/{pkg}/_meta"] == len(
+        bot.package_names
+    )
+    # every service run is finished on the fourth poll, afterwards the srcmd5
+    # of every package is fetched once
+    assert scratch_build.http_calls["GET /source/{prj}/{pkg}"] == 5 * len(
+        bot.package_names
+    )
+    assert scratch_build.http_calls["PUT /source/{prj}/_meta"] == 1
+    assert scratch_build.http_calls["PUT /source/{prj}/_config"] == 1
+    # the prjconf is written to the staging project and the branch
+    assert scratch_build.http_calls["GET /public/source/{prj}/_config"] == 1
+    assert scratch_build.git_calls["push"] == 1
+    # the commit is created without a checkout
+    assert scratch_build.git_calls["worktree"] == 0
+    assert scratch_build.git_calls["checkout"] == 0
+    # nothing has been built in the new project yet => rebuild every package
+    # with one request, OBS builds the bases first
+    rebuild_cmd = f"/build/{bot.staging_project_name} rebuild "
+    assert [
+        cmd.removeprefix(rebuild_cmd).split()
+        for cmd in obs.commands
+        if cmd.startswith(rebuild_cmd)
+    ] == [bot.image_graph.static_order(bot.package_names)]
+
+    obs.script_build(
+        bot.staging_project_name,
+        [
+            {pkg: code for pkg in bot.package_names}
+            for code in (
+                PackageStatusCode.SCHEDULED,
+                PackageStatusCode.BUILDING,
+                PackageStatusCode.SUCCEEDED,
+            )
+        ],
+    )
+    with report.measure("wait_for_build_to_finish"):
+        build_res = await bot.wait_for_build_to_finish(timeout_sec=60)
+
+    assert not is_build_failed(build_res)
+    assert report["wait_for_build_to_finish"].http_calls == {
+        "GET /build/{prj}/_result": 3
+    }
+    assert {stats.package for stats in bot._history.build_durations()} == set(
+        bot.package_names
+    )
+
+    obs.built_source_md5s = {pkg: obs.source_md5(pkg) for pkg in bot.package_names}
+    assert await bot.get_outdated_packages() == []
+    obs.source_md5s[bot.package_names[0]] = "changed"
+    assert await bot.get_outdated_packages() == bot.image_graph.static_order(
+        bot.image_graph.affected_by([bot.package_names[0]]) & set(bot.package_names)
+    )
+
+    with report.measure("add_changelog_entry"):
+        await bot.add_changelog_entry("Update pcp", "bot", ["pcp-image"])
+
+    add_changelog_entry = report["add_changelog_entry"]
+    assert add_changelog_entry.http_calls == {"GET /person/{login}": 1}
+    assert add_changelog_entry.git_calls["push"] == 1
+
+    with report.measure("changelog_check"):
+        assert (
+            bot.get_packages_without_changelog_addition(
+                f"origin/{bot.deployment_branch_name}",
+                f"origin/for-deploy-{bot.os_version}",
+            )
+            == []
+        )
+
+
+@pytest.mark.asyncio
+async def test_rebuild_images_containing(fake_obs_server: tuple[FakeObs, ObsClient]):
+    obs, client = fake_obs_server
+    bot = StagingBot(os_version=OsVersion.SP6, osc_username="bot")
+    bot._obs = client
+
+    rebuilt = await bot.rebuild_images_containing("curl")
+
+    graph = bot.image_graph
+    assert rebuilt == graph.static_order(
+        graph.affected_by(
+            img.package_name for img in bot._bcis if "curl" in installed_packages(img)
+        )
+    )
+    # the published images are rebuilt with one request but not wiped
+    rebuild_cmd = f"/build/{_get_bci_project_name(OsVersion.SP6)} rebuild "
+    assert [
+        cmd.removeprefix(rebuild_cmd).split()
+        for cmd in obs.commands
+        if cmd.startswith(rebuild_cmd)
+    ] == [rebuilt]
+    assert not any("wipe" in cmd for cmd in obs.commands)
+
+    assert await bot.rebuild_images_containing("no-such-package") == []
@@ -0,0 +1,139 @@
+import pytest
+
+from bci_build.package import Arch
+from staging.build_history import BuildHistory
+from staging.build_history import render_statistics_as_markdown
+from staging.build_result import PackageBuildResult
+from staging.build_result import PackageStatusCode
+from staging.build_result import RepositoryBuildResult
+from staging.watcher import PackageStateChange
+
+
+def _build(
+    history: BuildHistory,
+    project: str,
+    package: str,
+    arch: Arch,
+    start: float,
+    duration: float,
+    result: PackageStatusCode = PackageStatusCode.SUCCEEDED,
+) -> None:
+    states = [
+        (None, PackageStatusCode.SCHEDULED, start - 10),
+        (PackageStatusCode.SCHEDULED, PackageStatusCode.BUILDING, start),
+        (PackageStatusCode.BUILDING, result, start + duration),
+    ]
+    for old, new, timestamp in states:
+        history.record(
+            project,
+            PackageStateChange(
+                repository="images", arch=arch, package=package, old=old, new=new
+            ),
+            timestamp=timestamp,
+        )
+
+
+@pytest.fixture
+def history():
+    history = BuildHistory(db_path="")
+    yield history
+    history.close()
+
+
+def test_build_durations(history: BuildHistory):
+    for i, duration in enumerate((100, 300, 200, 1000)):
+        _build(history, f"prj:{i}", "pcp-image", Arch.X86_64, 1000 * i, duration)
+    _build(history, "prj:0", "pcp-image", Arch.AARCH64, 0, 50)
+
+    (aarch64, x86_64) = history.build_durations()
+    assert (aarch64.arch, aarch64.builds, aarch64.p50_sec, aarch64.p95_sec) == (
+        "aarch64",
+        1,
+        50,
+        50,
+    )
+    assert (x86_64.arch, x86_64.builds, x86_64.p50_sec, x86_64.p95_sec) == (
+        "x86_64",
+        4,
+        200,
+        1000,
+    )
+
+
+def test_failure_rates(history: BuildHistory):
+    _build(history, "prj", "pcp-image", Arch.X86_64, 0, 10)
+    _build(history, "prj", "nginx-image", Arch.X86_64, 0, 10, PackageStatusCode.FAILED)
+    _build(history, "prj", "pcp-image", Arch.S390X, 0, 10)
+
+    rates = {rate.arch: (rate.builds, rate.failed) for rate in history.failure_rates()}
+    assert rates == {"s390x": (1, 0), "x86_64": (2, 1)}
+    assert "| x86_64 | 2 | 1 | 50% |" in render_statistics_as_markdown(history)
+
+
+def test_unobserved_build_start_is_ignored(history: BuildHistory):
+    for old, new in (
+        (None, PackageStatusCode.BUILDING),
+        (PackageStatusCode.BUILDING, PackageStatusCode.SUCCEEDED),
+    ):
+        history.record(
+            "prj",
+            PackageStateChange(
+                repository="images",
+                arch=Arch.X86_64,
+                package="pcp-image",
+                old=old,
+                new=new,
+            ),
+        )
+
+    assert history.build_durations() == []
+    assert history.failure_rates() == []
+
+
+def test_predict_completion(history: BuildHistory):
+    _build(history, "prj:old", "pcp-image", Arch.X86_64, 0, 600)
+    _build(history, "prj:old", "nginx-image", Arch.X86_64, 0, 300)
+
+    # pcp-image started building at 1000, nginx-image is still scheduled
+    history.record(
+        "prj:new",
+        PackageStateChange(
+            repository="images",
+            arch=Arch.X86_64,
+            package="pcp-image",
+            old=None,
+            new=PackageStatusCode.SCHEDULED,
+        ),
+        timestamp=900,
+    )
+    history.record(
+        "prj:new",
+        PackageStateChange(
+            repository="images",
+            arch=Arch.X86_64,
+            package="pcp-image",
+            old=PackageStatusCode.SCHEDULED,
+            new=PackageStatusCode.BUILDING,
+        ),
+        timestamp=1000,
+    )
+    results = [
+        RepositoryBuildResult(
+            project="prj:new",
+            repository="images",
+            arch=Arch.X86_64,
+            code="building",
+            state="building",
+            packages=[
+                PackageBuildResult("pcp-image", PackageStatusCode.BUILDING),
+                PackageBuildResult("nginx-image", PackageStatusCode.SCHEDULED),
+            ],
+        )
+    ]
+
+    assert history.predict_completion(results, now=1100) == 1600
+    # nginx-image is expected to take longer than the rest of the pcp-image build
+    assert history.predict_completion(results, now=1400) == 1700
+    # packages without history are ignored
+    results[0].arch = Arch.AARCH64
+    assert history.predict_completion(results, now=1400) is None
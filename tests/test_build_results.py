@@ -1,9 +1,13 @@
+import xml.etree.ElementTree as ET
+
 import pytest
 
+from staging.build_result import RENDER_MODE_T
 from staging.build_result import Arch
 from staging.build_result import PackageBuildResult
 from staging.build_result import PackageStatusCode
 from staging.build_result import RepositoryBuildResult
+from staging.build_result import ResultListParser
 from staging.build_result import is_build_failed
 from staging.build_result import render_as_markdown
 
@@ -319,3 +323,178 @@ def test_render_as_markdown(
     build_res: list[RepositoryBuildResult], table_markdown: str
 ):
     assert render_as_markdown(build_res) == table_markdown
+
+
+_RESULTLIST = b"""<resultlist state="c181538ad4f4b5e3f4a47d1e5a8f6c4d">
+  <result project="home:foo" repository="images" arch="x86_64" code="building" state="building" dirty="true">
+    <status package="pcp-image" code="building">
+      <details>building on old-cirrus2:14</details>
+    </status>
+    <status package="init" code="unresolvable">
+      <details>nothing provides </details>
+      <details>foo</details>
+    </status>
+  </result>
+</resultlist>
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, len(_RESULTLIST)])
+def test_result_list_parser_chunks(chunk_size: int):
+    parser = ResultListParser()
+    for offset in range(0, len(_RESULTLIST), chunk_size):
+        parser.feed(_RESULTLIST[offset : offset + chunk_size])
+
+    assert parser.close() == [
+        RepositoryBuildResult(
+            project="home:foo",
+            repository="images",
+            arch=Arch.X86_64,
+            code="building",
+            state="building",
+            dirty=True,
+            packages=[
+                PackageBuildResult(
+                    name="pcp-image",
+                    code=PackageStatusCode.BUILDING,
+                    detail_message="building on old-cirrus2:14",
+                ),
+                PackageBuildResult(
+                    name="init",
+                    code=PackageStatusCode.UNRESOLVABLE,
+                    detail_message="nothing provides foo",
+                ),
+            ],
+        )
+    ]
+    assert parser.state == "c181538ad4f4b5e3f4a47d1e5a8f6c4d"
+
+
+def test_from_resultlist_invalid():
+    with pytest.raises(ValueError, match="Missing property arch"):
+        RepositoryBuildResult.from_resultlist(
+            '<resultlist><result project="foo" repository="images" code="a" state="a"/></resultlist>'
+        )
+
+    with pytest.raises(ET.ParseError):
+        RepositoryBuildResult.from_resultlist(_RESULTLIST[:-20])
+
+
+_MATRIX_RESULTS = [
+    RepositoryBuildResult(
+        project="home:foo",
+        repository="images",
+        arch=arch,
+        code="published",
+        state="published",
+        packages=[
+            PackageBuildResult(name="pcp", code=PackageStatusCode.SUCCEEDED),
+            PackageBuildResult(
+                name="init",
+                code=PackageStatusCode.FAILED
+                if arch == Arch.AARCH64
+                else PackageStatusCode.SUCCEEDED,
+            ),
+        ],
+    )
+    for arch in (Arch.X86_64, Arch.AARCH64)
+]
+
+
+def test_render_as_markdown_matrix():
+    assert (
+        render_as_markdown(_MATRIX_RESULTS, mode="matrix")
+        == """
+Build failed ❌
+<details>
+<summary>Build Results</summary>
+
+- Repository `images` in [home:foo](https://build.opensuse.org/project/show/home:foo) for `x86_64`: current state: published
+- Repository `images` in [home:foo](https://build.opensuse.org/project/show/home:foo) for `aarch64`: current state: published
+
+package name | images/x86_64 | images/aarch64
+-------------|---|---
+init | ✅ | [❌](https://build.opensuse.org/package/live_build_log/home:foo/init/images/aarch64)
+pcp | ✅ | ✅
+
+
+</details>
+
+Build failed ❌
+"""
+    )
+
+
+def test_render_as_markdown_failures():
+    assert (
+        render_as_markdown(_MATRIX_RESULTS, mode="failures")
+        == """
+Build failed ❌
+<details>
+<summary>Build Results</summary>
+
+Repository `images` in [home:foo](https://build.opensuse.org/project/show/home:foo) for `x86_64`: current state: published
+No failed packages
+
+Repository `images` in [home:foo](https://build.opensuse.org/project/show/home:foo) for `aarch64`: current state: published
+Build results:
+package name | status | build log
+-------------|--------|----------
+init | ❌ failed | [live log](https://build.opensuse.org/package/live_build_log/home:foo/init/images/aarch64)
+
+
+</details>
+
+Build failed ❌
+"""
+    )
+
+
+@pytest.mark.parametrize("mode", ["table", "matrix", "failures"])
+def test_render_as_markdown_max_bytes(mode: RENDER_MODE_T):
+    results = [
+        RepositoryBuildResult(
+            project="home:foo",
+            repository=repo,
+            arch=arch,
+            code="published",
+            state="published",
+            packages=[
+                PackageBuildResult(name=f"pkg-{i}", code=PackageStatusCode.FAILED)
+                for i in range(500)
+            ],
+        )
+        for repo in ("images", "containerfile")
+        for arch in (Arch.X86_64, Arch.AARCH64, Arch.S390X, Arch.PPC64LE)
+    ]
+
+    full = render_as_markdown(results, mode=mode)
+    assert len(full.encode()) > 4096
+
+    truncated = render_as_markdown(results, mode=mode, max_bytes=4096)
+    assert len(truncated.encode()) <= 4096
+    assert "**Output truncated**" in truncated
+    assert truncated.endswith("</details>\n\nBuild failed ❌\n")
+    # only complete lines are omitted
+    body_lines = truncated.splitlines()
+    assert all(line in full.splitlines() for line in body_lines[:-6])
+
+    assert render_as_markdown(results, mode=mode, max_bytes=len(full.encode())) == full
+
+    with pytest.raises(ValueError, match="max_bytes must be at least"):
+        render_as_markdown(results, mode=mode, max_bytes=100)
+
+
+def test_render_as_markdown_unfinished_packages():
+    results = [
+        RepositoryBuildResult(
+            project="home:foo",
+            repository="images",
+            arch=Arch.X86_64,
+            code="published",
+            state="published",
+            packages=[PackageBuildResult(name="pcp", code=PackageStatusCode.SCHEDULED)],
+        )
+    ]
+
+    assert render_as_markdown(results).startswith("\nStill building 🛻\n")
@@ -0,0 +1,80 @@
+import pathlib
+
+import pytest
+
+from bci_build.cache import RenderCache
+from bci_build.cache import image_digest
+from bci_build.package import LanguageStackContainer
+from bci_build.package import OsVersion
+
+_BASE_KWARGS = {
+    "name": "test",
+    "package_name": "test-image",
+    "pretty_name": "Test",
+    "os_version": OsVersion.SP6,
+    "package_list": ["sh"],
+    "version": "1.0",
+}
+
+
+def test_digest_changes_with_fields():
+    img = LanguageStackContainer(**_BASE_KWARGS)
+    assert image_digest(img) == image_digest(LanguageStackContainer(**_BASE_KWARGS))
+    assert image_digest(img) != image_digest(
+        LanguageStackContainer(**{**_BASE_KWARGS, "package_list": ["bash"]})
+    )
+
+
+@pytest.mark.asyncio
+async def test_unchanged_image_is_not_rewritten(tmp_path: pathlib.Path):
+    cache = RenderCache.load(str(tmp_path / "cache.json"))
+    dest = tmp_path / "dest"
+    dest.mkdir()
+
+    files = await LanguageStackContainer(**_BASE_KWARGS).write_files_to_folder(
+        str(dest), cache=cache
+    )
+    cache.save()
+    assert cache.changed == [str(dest)]
+
+    cache = RenderCache.load(str(tmp_path / "cache.json"))
+    assert (
+        await LanguageStackContainer(**_BASE_KWARGS).write_files_to_folder(
+            str(dest), cache=cache
+        )
+        == files
+    )
+    assert cache.unchanged == [str(dest)] and not cache.changed
+
+    await LanguageStackContainer(
+        **{**_BASE_KWARGS, "package_list": ["bash"]}
+    ).write_files_to_folder(str(dest), cache=cache)
+    assert cache.changed == [str(dest)]
+    assert "bash" in (dest / "Dockerfile").read_text()
+
+
+@pytest.mark.asyncio
+async def test_missing_files_are_rewritten(tmp_path: pathlib.Path):
+    cache = RenderCache.load(str(tmp_path / "cache.json"))
+    img = LanguageStackContainer(**_BASE_KWARGS)
+
+    await img.write_files_to_folder(str(tmp_path), cache=cache)
+    (tmp_path / "_service").unlink()
+
+    await img.write_files_to_folder(str(tmp_path), cache=cache)
+    assert (tmp_path / "_service").exists()
+    assert len(cache.changed) == 2
+
+
+@pytest.mark.asyncio
+async def test_modified_files_are_rewritten(tmp_path: pathlib.Path):
+    cache = RenderCache.load(str(tmp_path / "cache.json"))
+    img = LanguageStackContainer(**_BASE_KWARGS)
+
+    await img.write_files_to_folder(str(tmp_path), cache=cache)
+    dockerfile = (tmp_path / "Dockerfile").read_text()
+    (tmp_path / "Dockerfile").write_text("edited by hand")
+
+    await img.write_files_to_folder(str(tmp_path), cache=cache)
+    assert (tmp_path / "Dockerfile").read_text() == dockerfile
+    assert len(cache.changed) == 2 and not cache.unchanged
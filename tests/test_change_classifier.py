@@ -0,0 +1,40 @@
+import pytest
+
+from bci_build.package import ALL_CONTAINER_IMAGE_NAMES
+from staging.change_classifier import ChangeKind
+from staging.change_classifier import classify_files
+from staging.change_classifier import copied_files
+
+
+def test_copied_files():
+    assert copied_files(
+        """FROM bci/bci-micro:15.6 AS base
+COPY entrypoint.sh /usr/local/bin/
+COPY --chmod=0755 a b /usr/bin/
+ADD ["c d", "/srv/"]
+COPY --from=base /usr/bin/zypper /usr/bin/
+copy e \\
+     f /etc/
+RUN echo COPY g /
+"""
+    ) == ["entrypoint.sh", "a", "b", "c d", "e", "f"]
+
+
+@pytest.mark.parametrize(
+    "image_key,fname,kind",
+    [
+        ("pcp-sp6", "Dockerfile", ChangeKind.BUILD),
+        ("pcp-sp6", "_service", ChangeKind.BUILD),
+        ("pcp-sp6", "container-entrypoint", ChangeKind.BUILD),
+        ("pcp-sp6", "README.md", ChangeKind.METADATA),
+        ("pcp-sp6", "pcp-image.changes", ChangeKind.METADATA),
+        ("nginx-sp6", "20-envsubst-on-templates.sh", ChangeKind.BUILD),
+        ("nginx-sp6", "LICENSE", ChangeKind.METADATA),
+        ("micro-sp6", "micro-image.kiwi", ChangeKind.BUILD),
+        ("micro-sp6", "micro-image.changes", ChangeKind.METADATA),
+    ],
+)
+def test_classify_files(image_key: str, fname: str, kind: ChangeKind):
+    assert classify_files(ALL_CONTAINER_IMAGE_NAMES[image_key], [fname]) == {
+        fname: kind
+    }
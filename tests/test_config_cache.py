@@ -0,0 +1,62 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from staging.config_cache import ConfigCache
+from staging.obs import ObsClient
+
+from .fake_obs import FakeObs
+
+_ROUTE = "/public/source/devel:BCI:SLE-15-SP6/_config"
+
+
+@pytest.mark.asyncio
+async def test_config_is_fetched_once(
+    fake_obs_server: tuple[FakeObs, ObsClient], tmp_path: pathlib.Path
+):
+    obs, client = fake_obs_server
+    cache = ConfigCache(cache_dir=str(tmp_path))
+
+    for _ in range(3):
+        assert await cache.get(client, _ROUTE) == "Prefer: foo\n"
+    assert obs.calls["GET /public/source/{prj}/_config"] == 1
+
+    # a new run uses the persisted config within the ttl
+    assert await ConfigCache(cache_dir=str(tmp_path)).get(client, _ROUTE) == (
+        "Prefer: foo\n"
+    )
+    assert obs.calls["GET /public/source/{prj}/_config"] == 1
+
+
+@pytest.mark.asyncio
+async def test_config_is_revalidated(
+    fake_obs_server: tuple[FakeObs, ObsClient], tmp_path: pathlib.Path
+):
+    obs, client = fake_obs_server
+
+    async def _fetch_in_new_run() -> str:
+        return await ConfigCache(cache_dir=str(tmp_path), ttl_sec=0).get(client, _ROUTE)
+
+    assert await _fetch_in_new_run() == "Prefer: foo\n"
+
+    # unchanged => OBS replies with 304 and the persisted config is used
+    assert await _fetch_in_new_run() == "Prefer: foo\n"
+    assert obs.calls["GET /public/source/{prj}/_config"] == 2
+
+    obs.devel_prjconf = "Prefer: bar\n"
+    assert await _fetch_in_new_run() == "Prefer: bar\n"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_merged(
+    fake_obs_server: tuple[FakeObs, ObsClient],
+):
+    obs, client = fake_obs_server
+    cache = ConfigCache(cache_dir="")
+
+    assert (
+        await asyncio.gather(*(cache.get(client, _ROUTE) for _ in range(5)))
+        == ["Prefer: foo\n"] * 5
+    )
+    assert obs.calls["GET /public/source/{prj}/_config"] == 1
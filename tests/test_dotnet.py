@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import os
+import pathlib
+
+import pytest
+
+from bci_build.package import OsVersion
+from dotnet.repo_index import RepositoryIndex
+from dotnet.updater import MS_REPO_BASEURL
+from dotnet.updater import DotNetBCI
+
+_PRIMARY = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common" xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="7">
+{packages}
+</metadata>
+"""
+
+_PACKAGE = """<package type="rpm">
+  <name>{name}</name>
+  <arch>x86_64</arch>
+  <version epoch="0" ver="{ver}" rel="1"/>
+  <location href="Packages/{name}-{ver}-x64.rpm"/>
+</package>"""
+
+
+def _write_fixture_repo(repo_dir: pathlib.Path) -> None:
+    primary = gzip.compress(
+        _PRIMARY.format(
+            packages="\n".join(
+                _PACKAGE.format(name=name, ver=ver)
+                for name, ver in (
+                    ("dotnet-host", "8.0.2"),
+                    ("dotnet-host", "8.0.10"),
+                    ("dotnet-host", "9.0.0"),
+                    ("dotnet-hostfxr-8.0", "8.0.10"),
+                    ("dotnet-runtime-deps-8.0", "8.0.10"),
+                    ("dotnet-runtime-8.0", "8.0.9"),
+                    ("dotnet-runtime-8.0", "8.0.10"),
+                )
+            )
+        ).encode()
+    )
+    checksum = hashlib.sha256(primary).hexdigest()
+
+    os.makedirs(repo_dir, exist_ok=True)
+    (repo_dir / f"{checksum}-primary.xml.gz").write_bytes(primary)
+    (repo_dir / "repomd.xml").write_text(
+        f"""<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo">
+  <data type="primary">
+    <checksum type="sha256">{checksum}</checksum>
+    <location href="repodata/{checksum}-primary.xml.gz"/>
+  </data>
+</repomd>
+"""
+    )
+
+
+def test_repository_index_is_cached(tmp_path: pathlib.Path):
+    _write_fixture_repo(repodata := tmp_path / "repodata")
+
+    index = RepositoryIndex.load(
+        MS_REPO_BASEURL, repodata_dir=str(repodata), cache_dir=str(tmp_path / "cache")
+    )
+    assert len(index.packages) == 7
+    assert [pkg.version for pkg in index.query("dotnet-host", "x86_64")] == [
+        "8.0.2",
+        "8.0.10",
+        "9.0.0",
+    ]
+    assert (latest := index.latest("dotnet-runtime-8.0", "x86_64"))
+    assert latest.version == "8.0.10"
+    assert (
+        index.url(latest)
+        == f"{MS_REPO_BASEURL}Packages/dotnet-runtime-8.0-8.0.10-x64.rpm"
+    )
+    assert index.latest("dotnet-runtime-8.0", "aarch64") is None
+
+    # the index is read from the cache as long as repomd.xml is unchanged
+    for primary in repodata.glob("*-primary.xml.gz"):
+        primary.unlink()
+    assert (
+        RepositoryIndex.load(
+            MS_REPO_BASEURL,
+            repodata_dir=str(repodata),
+            cache_dir=str(tmp_path / "cache"),
+        )
+        == index
+    )
+
+
+def test_generate_custom_end(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    _write_fixture_repo(repodata := tmp_path / "repodata")
+    monkeypatch.setattr(
+        DotNetBCI,
+        "_index",
+        RepositoryIndex.load(
+            MS_REPO_BASEURL,
+            repodata_dir=str(repodata),
+            cache_dir=str(tmp_path / "cache"),
+        ),
+    )
+
+    runtime = DotNetBCI(
+        os_version=OsVersion.SP6,
+        version="8.0",
+        name="dotnet-runtime",
+        pretty_name=".NET 8.0 runtime",
+        package_name="dotnet-runtime-8.0",
+        package_list=[
+            "dotnet-host",
+            "dotnet-hostfxr-8.0",
+            "dotnet-runtime-deps-8.0",
+            "dotnet-runtime-8.0",
+        ],
+    )
+    runtime.generate_custom_end()
+
+    assert runtime.additional_versions == ["8.0.10"]
+    assert "ENV DOTNET_VERSION=8.0.10" in runtime.custom_end
+    for rpm in (
+        "dotnet-host-8.0.10-x64.rpm",
+        "dotnet-hostfxr-8.0-8.0.10-x64.rpm",
+        "dotnet-runtime-deps-8.0-8.0.10-x64.rpm",
+        "dotnet-runtime-8.0-8.0.10-x64.rpm",
+    ):
+        assert f"#!RemoteAssetUrl: {MS_REPO_BASEURL}Packages/{rpm}" in (
+            runtime.custom_end
+        )
@@ -0,0 +1,77 @@
+import pathlib
+
+import git
+import pytest
+
+from staging.git_history import CommitGraph
+
+_ENV = {
+    "GIT_AUTHOR_NAME": "foo",
+    "GIT_AUTHOR_EMAIL": "foo@bar.com",
+    "GIT_COMMITTER_NAME": "foo",
+    "GIT_COMMITTER_EMAIL": "foo@bar.com",
+}
+
+
+@pytest.fixture
+def repo(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> git.Repo:
+    for key, value in _ENV.items():
+        monkeypatch.setenv(key, value)
+
+    repo = git.Repo.init(tmp_path, initial_branch="main")
+
+    def _commit(fname: str, content: str) -> None:
+        (path := tmp_path / fname).parent.mkdir(exist_ok=True)
+        path.write_text(content)
+        repo.index.add([fname])
+        repo.index.commit(f"Update {fname}")
+
+    _commit("pcp/Dockerfile", "FROM scratch")
+    repo.create_tag("base")
+
+    # build a history with many merges, which was exponential to traverse
+    # recursively
+    for i in range(10):
+        repo.git.checkout("-b", f"topic-{i}")
+        _commit("pcp/pcp.changes", f"entry {i}\n" * 4)
+        repo.git.checkout("main")
+        _commit(f"nginx-{i}/Dockerfile", "FROM scratch")
+        repo.git.merge("--no-ff", "-m", f"Merge topic-{i}", f"topic-{i}")
+
+    return repo
+
+
+def test_commit_range(repo: git.Repo):
+    graph = CommitGraph(repo.working_dir)
+
+    commits = graph.commit_range("main", "base")
+    assert commits is not None
+    assert len(commits) == 30
+    assert commits[0] == repo.commit("main")
+    assert repo.commit("base") not in commits
+
+    assert graph.commit_range("base", "main") is None
+    assert graph.commit_range("main", "main") is None
+
+
+def test_changed_paths_are_cached(repo: git.Repo):
+    graph = CommitGraph(repo.working_dir)
+    head = repo.commit("main")
+    topic = repo.commit("topic-0")
+
+    changed = graph.changed_paths([head, topic], "base")
+    assert ("pcp/pcp.changes", "pcp/pcp.changes") in changed[head.hexsha]
+    assert changed[topic.hexsha] == [("pcp/pcp.changes", "pcp/pcp.changes")]
+    assert len(graph._diff_cache) == 2
+
+    assert graph.changed_paths([topic], "base") == {topic.hexsha: changed[topic.hexsha]}
+    assert len(graph._diff_cache) == 2
+
+
+def test_file_stats(repo: git.Repo):
+    graph = CommitGraph(repo.working_dir)
+    commits = graph.commit_range("main", "base")
+    assert commits
+
+    stats = graph.file_stats(commits)
+    assert stats[repo.commit("topic-1").hexsha]["pcp/pcp.changes"]["insertions"] == 4
@@ -0,0 +1,114 @@
+import pathlib
+import subprocess
+
+import git
+import pytest
+
+from staging.git_tree import CommitBuilder
+from staging.git_tree import DirectoryChanges
+
+_ENV = {
+    "GIT_AUTHOR_NAME": "foo",
+    "GIT_AUTHOR_EMAIL": "foo@bar.com",
+    "GIT_COMMITTER_NAME": "foo",
+    "GIT_COMMITTER_EMAIL": "foo@bar.com",
+}
+
+
+@pytest.fixture
+def repo(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> git.Repo:
+    for key, value in _ENV.items():
+        monkeypatch.setenv(key, value)
+
+    repo = git.Repo.init(tmp_path, initial_branch="main")
+    for fname, content in (
+        ("_config", "Prefer: foo"),
+        (".obs/workflows.yml", "workflow"),
+        ("pcp-image/Dockerfile", "FROM pcp"),
+        ("pcp-image/pcp-image.changes", "changelog"),
+        ("pcp-image/obsolete", "gone"),
+        ("nginx-image/Dockerfile", "FROM nginx"),
+        ("orphan-image/Dockerfile", "FROM orphan"),
+    ):
+        (path := tmp_path / fname).parent.mkdir(exist_ok=True)
+        path.write_text(content)
+    (tmp_path / "pcp-image" / "Dockerfile").chmod(0o755)
+    repo.git.add(".")
+    repo.git.commit("-m", "Initial commit")
+    return repo
+
+
+def test_commit_builder(repo: git.Repo):
+    base = repo.commit("main")
+    builder = CommitBuilder(repo, "main")
+
+    assert builder.replace_directory(
+        "pcp-image",
+        {"Dockerfile": "FROM new-pcp", "pcp-image.changes": "initial"},
+        keep=("pcp-image.changes",),
+    ) == DirectoryChanges(modified=["Dockerfile"], removed=["obsolete"])
+    assert builder.replace_directory(
+        "postgres-image",
+        {"Dockerfile": "FROM postgres", "postgres-image.changes": "initial"},
+        keep=("postgres-image.changes",),
+    ) == DirectoryChanges(added=["Dockerfile", "postgres-image.changes"])
+    builder.remove("orphan-image")
+    builder.write_file(".obs/workflows.yml", "workflow")
+    builder.write_file(".github/dependabot.yml", "dependabot")
+
+    assert sorted(builder.entries()) == [
+        ".github",
+        ".obs",
+        "_config",
+        "nginx-image",
+        "pcp-image",
+        "postgres-image",
+    ]
+
+    commit = builder.commit("Update the build recipes")
+    assert commit
+    assert list(commit.parents) == [base]
+    assert repo.commit("main") == base
+
+    # the result is the same as if git had created the tree
+    assert not repo.git.fsck("--strict", "--no-dangling")
+    assert commit.tree["pcp-image/Dockerfile"].data_stream.read() == b"FROM new-pcp"
+    assert commit.tree["pcp-image/Dockerfile"].mode == 0o100755
+    assert (
+        commit.tree["pcp-image/pcp-image.changes"]
+        == base.tree["pcp-image/pcp-image.changes"]
+    )
+    assert "pcp-image/obsolete" not in commit.tree
+    assert "orphan-image" not in commit.tree
+    assert commit.tree["nginx-image"] == base.tree["nginx-image"]
+    assert commit.tree[".obs"] == base.tree[".obs"]
+    assert (
+        commit.tree["postgres-image/postgres-image.changes"].data_stream.read()
+        == b"initial"
+    )
+
+    subprocess.run(["git", "checkout", commit.hexsha], cwd=repo.working_dir, check=True)
+    assert not repo.is_dirty(untracked_files=True)
+
+
+def test_unchanged_tree_creates_no_commit(repo: git.Repo):
+    builder = CommitBuilder(repo, "main")
+    assert builder.commit("Nothing") is None
+
+    assert not builder.replace_directory("nginx-image", {"Dockerfile": "FROM nginx"})
+    builder.write_file("_config", "Prefer: foo")
+    assert builder.commit("Nothing") is None
+
+
+def test_changes_are_reported_against_changes_base_ref(repo: git.Repo):
+    builder = CommitBuilder(repo, "main")
+    builder.replace_directory("nginx-image", {"Dockerfile": "FROM new-nginx"})
+    assert (commit := builder.commit("Update nginx"))
+    repo.create_head("staging", commit)
+
+    builder = CommitBuilder(repo, "staging", changes_base_ref="main")
+    changes = builder.replace_directory(
+        "nginx-image", {"Dockerfile": "FROM new-nginx", "README.md": "nginx"}
+    )
+    assert changes == DirectoryChanges(added=["README.md"], modified=["Dockerfile"])
+    assert changes.files == {"README.md", "Dockerfile"}
@@ -0,0 +1,88 @@
+import pytest
+
+from bci_build.image_graph import ImageGraph
+from bci_build.package import ALL_CONTAINER_IMAGE_NAMES
+from bci_build.package import ALL_OS_VERSIONS
+from bci_build.package import BaseContainerImage
+from bci_build.package import OsContainer
+from bci_build.package import OsVersion
+from dotnet.updater import DOTNET_IMAGES
+
+
+def _images(os_version: OsVersion) -> list[BaseContainerImage]:
+    return [
+        ALL_CONTAINER_IMAGE_NAMES[key]
+        for key, factory in ALL_CONTAINER_IMAGE_NAMES.factories.items()
+        if factory.os_version == os_version
+    ] + [img for img in DOTNET_IMAGES if img.os_version == os_version]
+
+
+@pytest.mark.parametrize("os_version", ALL_OS_VERSIONS)
+def test_catalogue_is_acyclic(os_version: OsVersion):
+    graph = ImageGraph(_images(os_version))
+
+    order = graph.static_order()
+    assert sorted(order) == sorted(graph.package_names)
+    for pkg in order:
+        if (base := graph.base_of(pkg)) is not None:
+            assert order.index(base) < order.index(pkg)
+
+
+def test_impact_queries():
+    graph = ImageGraph(_images(OsVersion.SP6))
+
+    assert graph.base_of("pcp-image") == "init-image"
+    assert graph.base_of("init-image") is None
+    assert graph.derived_from("init-image") == {"pcp-image"}
+    assert graph.affected_by(["init-image"]) == {"init-image", "pcp-image"}
+    assert {"minimal-image", "git-image", "helm-image"} <= graph.affected_by(
+        ["micro-image"]
+    )
+
+
+def _image(name: str, from_image: str | None) -> OsContainer:
+    return OsContainer(
+        name=name,
+        pretty_name=name,
+        package_name=f"{name}-image",
+        os_version=OsVersion.TUMBLEWEED,
+        from_image=from_image,
+        package_list=["sed"],
+    )
+
+
+def test_generations_of_a_subgraph():
+    graph = ImageGraph(
+        [
+            _image("a", None),
+            _image("b", "opensuse/bci/bci-a:latest"),
+            _image("c", "opensuse/bci/bci-b:latest"),
+            _image("d", "opensuse/bci/bci-a:latest"),
+        ]
+    )
+
+    assert list(graph.generations()) == [
+        ["a-image"],
+        ["b-image", "d-image"],
+        ["c-image"],
+    ]
+    # c is still built after a, although b is not part of the subgraph
+    assert list(graph.generations(["c-image", "a-image"])) == [
+        ["a-image"],
+        ["c-image"],
+    ]
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        ImageGraph(
+            [
+                _image("a", "opensuse/bci/bci-b:latest"),
+                _image("b", "opensuse/bci/bci-a:latest"),
+            ]
+        )
+
+
+def test_mixed_os_versions_are_rejected():
+    with pytest.raises(ValueError, match="same OS version"):
+        ImageGraph(_images(OsVersion.SP6) + _images(OsVersion.TUMBLEWEED))
@@ -0,0 +1,275 @@
+import asyncio
+import base64
+import bz2
+import pathlib
+import xml.etree.ElementTree as ET
+from typing import AsyncGenerator
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import staging.obs
+from staging.build_result import RepositoryBuildResult
+from staging.obs import ObsClient
+from staging.obs import read_oscrc_credentials
+
+from .fake_obs import FakeObs
+
+_RESULTLIST = """<resultlist state="c181538ad4f4b5e3f4a47d1e5a8f6c4d">
+  <result project="home:foo" repository="images" arch="x86_64" code="published" state="published">
+    <status package="pcp-image" code="succeeded" />
+  </result>
+</resultlist>
+"""
+
+
+@pytest_asyncio.fixture
+async def fake_obs() -> AsyncGenerator[tuple[ObsClient, list[str]], None]:
+    requests: list[str] = []
+    failures = {"flaky": 2}
+
+    async def record(request: web.Request) -> web.Response:
+        assert request.headers["Authorization"] == "Basic Zm9vOmJhcg=="
+        requests.append(f"{request.method} {request.path_qs}")
+        if request.method == "PUT":
+            requests.append(await request.text())
+        return web.Response(text="<status code='ok'/>")
+
+    async def results(request: web.Request) -> web.Response:
+        requests.append(f"{request.method} {request.path_qs}")
+        return web.Response(text=_RESULTLIST)
+
+    async def directory(request: web.Request) -> web.Response:
+        return web.Response(
+            text='<directory count="2"><entry name="foo"/><entry name="bar"/></directory>'
+        )
+
+    async def flaky(request: web.Request) -> web.Response:
+        if failures["flaky"]:
+            failures["flaky"] -= 1
+            return web.Response(status=500, text="SQL error")
+        return web.Response(text="finally")
+
+    async def slow(request: web.Request) -> web.Response:
+        requests.append(f"{request.method} {request.path_qs}")
+        await asyncio.sleep(1)
+        return web.Response(text="too late")
+
+    async def missing(request: web.Request) -> web.Response:
+        return web.Response(
+            status=404,
+            text='<status code="unknown_project"><summary>Project not found</summary></status>',
+        )
+
+    app = web.Application()
+    app.router.add_get("/build/{prj}/_result", results)
+    app.router.add_get("/source/missing", missing)
+    app.router.add_get("/source/flaky", flaky)
+    app.router.add_post("/source/flaky", flaky)
+    app.router.add_get("/source/slow", slow)
+    app.router.add_get("/source/{prj}", directory)
+    app.router.add_route("*", "/{tail:.*}", record)
+
+    async with TestServer(app) as server:
+        async with ObsClient(
+            username="foo",
+            password="bar",
+            api_url=f"http://{server.host}:{server.port}",
+            backoff_sec=0,
+        ) as client:
+            yield client, requests
+
+
+@pytest.mark.asyncio
+async def test_routes(fake_obs: tuple[ObsClient, list[str]]):
+    client, requests = fake_obs
+
+    await client.put_meta("<package/>", "home:foo", "pcp-image")
+    await client.put_prjconf("home:foo", "Prefer: foo")
+    await client.wipe_binaries("home:foo")
+    await client.rebuild("home:foo", "pcp-image")
+    await client.rebuild("home:foo", ["pcp-image", "init-image"])
+    await client.delete_project("home:foo", comment="cleanup")
+
+    assert requests == [
+        "PUT /source/home:foo/pcp-image/_meta",
+        "<package/>",
+        "PUT /source/home:foo/_config",
+        "Prefer: foo",
+        "POST /build/home:foo?cmd=wipe",
+        "POST /build/home:foo?cmd=rebuild&package=pcp-image",
+        "POST /build/home:foo?cmd=rebuild&package=pcp-image&package=init-image",
+        "DELETE /source/home:foo?force=1&comment=cleanup",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_link_package(fake_obs: tuple[ObsClient, list[str]]):
+    client, requests = fake_obs
+
+    await client.link_package("SUSE:SLE-15-SP6:Update", "sles15-image", "home:foo")
+
+    assert requests[0] == "GET /source/SUSE:SLE-15-SP6:Update/sles15-image/_meta"
+    assert requests[1] == "PUT /source/home:foo/sles15-image/_meta"
+    assert 'project="home:foo"' in requests[2]
+    assert requests[3:] == [
+        "PUT /source/home:foo/sles15-image/_link",
+        '<link project="SUSE:SLE-15-SP6:Update" package="sles15-image" />',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_results(fake_obs: tuple[ObsClient, list[str]]):
+    client, requests = fake_obs
+
+    assert await client.results("home:foo", ["images"]) == (
+        RepositoryBuildResult.from_resultlist(_RESULTLIST),
+        "c181538ad4f4b5e3f4a47d1e5a8f6c4d",
+    )
+    assert requests == [
+        "GET /build/home:foo/_result?view=status&multibuild=1&locallink=1&repository=images"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_results_are_parsed_in_chunks(
+    fake_obs: tuple[ObsClient, list[str]], monkeypatch: pytest.MonkeyPatch
+):
+    client, _ = fake_obs
+    monkeypatch.setattr(staging.obs, "_RESULTS_CHUNK_SIZE", 16)
+
+    results, state = await client.results("home:foo")
+    assert state == "c181538ad4f4b5e3f4a47d1e5a8f6c4d"
+    assert results == RepositoryBuildResult.from_resultlist(_RESULTLIST)
+
+
+@pytest.mark.asyncio
+async def test_list_packages(fake_obs: tuple[ObsClient, list[str]]):
+    client, _ = fake_obs
+    assert await client.list_packages("home:foo") == ["foo", "bar"]
+
+
+@pytest.mark.asyncio
+async def test_source_md5s(fake_obs_server: tuple[FakeObs, ObsClient]):
+    obs, client = fake_obs_server
+    obs.source_md5s["pcp-image"] = "new"
+    obs.built_source_md5s = {"pcp-image": "old", "init-image": "cafe"}
+
+    assert await client.source_md5("home:foo", "pcp-image") == "new"
+    # the unexpanded sources are not what OBS builds
+    directory = await client.request("GET", "/source/home:foo/pcp-image")
+    assert ET.fromstring(directory).get("srcmd5") != "new"
+    assert await client.built_source_md5s(
+        "home:foo", "images", "x86_64", ["pcp-image", "micro-image"]
+    ) == {"pcp-image": "old"}
+    assert obs.calls["GET /build/{prj}/{repo}/{arch}/_jobhistory"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_on_server_error(fake_obs: tuple[ObsClient, list[str]]):
+    client, _ = fake_obs
+    assert await client.request("GET", "/source/flaky") == "finally"
+
+
+@pytest.mark.asyncio
+async def test_get_if_modified_with_lower_case_headers():
+    async def conditional(request: web.Request) -> web.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(
+            text="body",
+            headers={"etag": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", conditional)
+
+    async with TestServer(app) as server:
+        async with ObsClient(api_url=f"http://{server.host}:{server.port}") as client:
+            assert await client.get_if_modified("/source/home:foo/_config") == (
+                "body",
+                '"v1"',
+                "Mon, 01 Jan 2024 00:00:00 GMT",
+            )
+            assert (
+                await client.get_if_modified("/source/home:foo/_config", etag='"v1"')
+                is None
+            )
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried(fake_obs: tuple[ObsClient, list[str]]):
+    client, _ = fake_obs
+
+    with pytest.raises(aiohttp.ClientResponseError) as err:
+        await client.request("POST", "/source/flaky")
+    assert err.value.status == 500
+    # the following request is not retried, i.e. it consumes the second failure
+    with pytest.raises(aiohttp.ClientResponseError):
+        await client.request("POST", "/source/flaky")
+    assert await client.request("POST", "/source/flaky") == "finally"
+
+
+@pytest.mark.asyncio
+async def test_missing_credentials_are_reported():
+    async def unauthorized(request: web.Request) -> web.Response:
+        return web.Response(status=401, text="<status code='authentication_required'/>")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", unauthorized)
+
+    async with TestServer(app) as server:
+        async with ObsClient(
+            username="foo", api_url=f"http://{server.host}:{server.port}"
+        ) as client:
+            with pytest.raises(aiohttp.ClientResponseError, match="OSC_PASSWORD"):
+                await client.request("GET", "/source/home:foo")
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried(fake_obs: tuple[ObsClient, list[str]]):
+    client, _ = fake_obs
+
+    with pytest.raises(aiohttp.ClientResponseError, match="Project not found") as err:
+        await client.request("GET", "/source/missing")
+    assert err.value.status == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("retry_timeouts,attempts", [(True, 4), (False, 1)])
+async def test_retry_timeouts(
+    fake_obs: tuple[ObsClient, list[str]], retry_timeouts: bool, attempts: int
+):
+    client, requests = fake_obs
+
+    with pytest.raises(asyncio.TimeoutError):
+        await client.request(
+            "GET",
+            "/source/slow",
+            timeout=aiohttp.ClientTimeout(total=0.05),
+            retry_timeouts=retry_timeouts,
+        )
+    assert requests == ["GET /source/slow"] * attempts
+
+
+def test_read_oscrc_credentials(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+):
+    oscrc = tmp_path / "oscrc"
+    monkeypatch.setenv("OSC_CONFIG", str(oscrc))
+
+    assert read_oscrc_credentials() is None
+
+    oscrc.write_text(
+        f"""[general]
+apiurl = https://api.opensuse.org
+
+[https://api.opensuse.org]
+user = foo
+passx = {base64.b64encode(bz2.compress(b"secret")).decode()}
+"""
+    )
+    assert read_oscrc_credentials() == ("foo", "secret")
@@ -1,3 +1,13 @@
+import pathlib
+
+import pytest
+
+from bci_build.package import ALL_CONTAINER_IMAGE_NAMES
+from bci_build.package import ImageFactory
+from bci_build.package import ImageRegistry
+from bci_build.package import LanguageStackContainer
+from bci_build.package import OsVersion
+from bci_build.package import write_images_to_folder
 from tests.conftest import BCI_FIXTURE_RET_T
 
 
@@ -134,3 +144,103 @@ def test_volume_dockerfile(bci: BCI_FIXTURE_RET_T):
         cls(**kwargs, volumes=["/var/log", "/sys/"]).volume_dockerfile
         == "\nVOLUME /var/log /sys/"
     )
+
+
+@pytest.mark.asyncio
+async def test_write_images_to_folder(tmp_path: pathlib.Path):
+    images = {
+        key: ALL_CONTAINER_IMAGE_NAMES[key] for key in ("pcp-sp6", "pcp-tumbleweed")
+    }
+
+    timings = await write_images_to_folder(images, str(tmp_path), max_workers=1)
+
+    assert set(timings) == set(images)
+    for bci in images.values():
+        dest = tmp_path / bci.os_version.deployment_branch_name / bci.package_name
+        assert (dest / "Dockerfile").exists()
+        assert (dest / "_service").exists()
+
+
+def test_cached_property_hits(bci: BCI_FIXTURE_RET_T):
+    cls, kwargs = bci
+    c = cls(**kwargs)
+
+    assert c.build_tags == c.build_tags
+    assert c.property_cache_info.misses >= 1
+    assert c.property_cache_info.hits >= 1
+
+
+def test_cached_property_is_not_mutated_by_callers(bci: BCI_FIXTURE_RET_T):
+    cls, kwargs = bci
+    c = cls(**kwargs)
+
+    tags = c.build_tags
+    c.build_tags.append("foo:bar")
+
+    assert c.build_tags == tags
+
+
+def test_cached_property_invalidated_on_assignment(bci: BCI_FIXTURE_RET_T):
+    cls, kwargs = bci
+    c = cls(**kwargs)
+
+    assert c.packages == "cat"
+    assert c.labelprefix.endswith(".test")
+
+    c.package_list = ["cat", "dog"]
+    c.custom_labelprefix_end = "foo"
+
+    assert c.packages == "cat dog"
+    assert c.labelprefix.endswith(".foo")
+
+
+def test_clear_property_cache(bci: BCI_FIXTURE_RET_T):
+    cls, kwargs = bci
+    c = cls(**{**kwargs, "package_list": ["cat"]})
+
+    assert c.packages == "cat"
+    c.package_list.append("dog")
+    assert c.packages == "cat"
+
+    c.clear_property_cache()
+    assert c.packages == "cat dog"
+
+
+def test_image_factory_metadata(bci: BCI_FIXTURE_RET_T):
+    cls, kwargs = bci
+    factory = ImageFactory(cls, **kwargs, extra_files=lambda: {"foo": "bar"})
+
+    img = factory.build()
+
+    assert factory.uid == img.uid
+    assert factory.os_version == img.os_version
+    assert factory.package_name == img.package_name
+    assert img.extra_files == {"foo": "bar"}
+
+
+def test_image_registry_builds_lazily():
+    registry = ImageRegistry(
+        ImageFactory(
+            LanguageStackContainer,
+            name="test",
+            pretty_name="Test",
+            package_name="test-image",
+            package_list=["sh"],
+            version=1,
+            os_version=OsVersion.TUMBLEWEED,
+            extra_files=lambda: pytest.fail("extra_files must not be loaded"),
+        )
+        for _ in range(2)
+    )
+
+    assert list(registry) == ["test-1-tumbleweed"]
+    assert "test-1-tumbleweed" in registry
+    assert registry.factories["test-1-tumbleweed"].package_name == "test-image"
+
+
+def test_all_container_image_names_keys():
+    for key, factory in ALL_CONTAINER_IMAGE_NAMES.factories.items():
+        img = ALL_CONTAINER_IMAGE_NAMES[key]
+        assert img is ALL_CONTAINER_IMAGE_NAMES[key]
+        assert f"{img.uid}-{img.os_version.pretty_print.lower()}" == key
+        assert img.package_name == factory.package_name
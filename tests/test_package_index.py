@@ -0,0 +1,70 @@
+from bci_build.package import ALL_CONTAINER_IMAGE_NAMES
+from bci_build.package import OsContainer
+from bci_build.package import OsVersion
+from bci_build.package import Package
+from bci_build.package import PackageType
+from bci_build.package import Replacement
+from bci_build.package_index import PackageIndex
+from bci_build.package_index import installed_packages
+
+
+def _image(
+    name: str, os_version: OsVersion, package_list: list[str | Package]
+) -> OsContainer:
+    return OsContainer(
+        name=name,
+        pretty_name=name,
+        package_name=f"{name}-image",
+        os_version=os_version,
+        package_list=package_list,
+        replacements_via_service=[
+            Replacement(
+                regex_in_build_description="%%sed_version%%", package_name="sed"
+            )
+        ],
+    )
+
+
+def test_installed_packages():
+    image = _image(
+        "a",
+        OsVersion.TUMBLEWEED,
+        [
+            "coreutils",
+            Package("bash", PackageType.BOOTSTRAP),
+            Package("zypper", PackageType.DELETE),
+            Package("rpm", PackageType.UNINSTALL),
+        ],
+    )
+
+    assert installed_packages(image) == {"coreutils", "bash", "sed"}
+
+
+def test_images_containing():
+    index = PackageIndex(
+        [
+            _image("a", OsVersion.TUMBLEWEED, ["openssl", "curl"]),
+            _image("b", OsVersion.TUMBLEWEED, ["openssl"]),
+            _image("c", OsVersion.SP6, ["openssl"]),
+            _image("d", OsVersion.SP6, ["gawk"]),
+        ]
+    )
+
+    assert "openssl" in index and "sed" in index and "gcc" not in index
+    assert len(index) == 4
+    assert [img.package_name for img in index.images_containing("curl")] == ["a-image"]
+    assert [
+        img.package_name for img in index.images_containing("openssl", OsVersion.SP6)
+    ] == ["c-image"]
+    assert index.images_containing("gcc") == []
+    assert index.package_names_by_os_version("openssl") == {
+        OsVersion.TUMBLEWEED: ["a-image", "b-image"],
+        OsVersion.SP6: ["c-image"],
+    }
+
+
+def test_catalogue_index():
+    index = PackageIndex(ALL_CONTAINER_IMAGE_NAMES.values())
+
+    assert "nginx" in index
+    assert "nginx-image" in index.package_names_by_os_version("nginx")[OsVersion.SP6]
@@ -0,0 +1,36 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from bci_build.templates import DOCKERFILE_TEMPLATE
+from bci_build.templates import ENVIRONMENT
+from bci_build.templates import register_template
+
+
+def test_templates_share_the_environment():
+    assert DOCKERFILE_TEMPLATE.template.environment is ENVIRONMENT
+    assert ENVIRONMENT.get_template("Dockerfile") is DOCKERFILE_TEMPLATE.template
+
+
+def test_register_template():
+    tmpl = register_template("test/hello", "Hello {{ name }}!")
+
+    assert tmpl.render(name="world") == "Hello world!"
+    assert (
+        register_template("test/hello", "Hello {{ name }}!").template is tmpl.template
+    )
+
+    with pytest.raises(ValueError, match="different template"):
+        register_template("test/hello", "Bye {{ name }}!")
+
+
+def test_import_has_no_side_effects(tmp_path: pathlib.Path):
+    subprocess.run(
+        [sys.executable, "-c", "import bci_build.templates"],
+        env={**os.environ, "XDG_CACHE_HOME": str(tmp_path)},
+        check=True,
+    )
+    assert not list(tmp_path.iterdir())
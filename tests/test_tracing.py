@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pathlib
+
+import pytest
+
+from staging.obs import ObsClient
+from staging.tracing import TracedCommand
+from staging.tracing import Tracer
+from staging.tracing import span
+from staging.tracing import traced
+
+from .fake_obs import FakeObs
+
+
+@traced
+async def _phase(client: ObsClient) -> None:
+    with span("fetch"):
+        await asyncio.gather(client.person("foo"), client.person("bar"))
+
+
+@pytest.mark.asyncio
+async def test_spans_are_nested(
+    fake_obs_server: tuple[FakeObs, ObsClient], tmp_path: pathlib.Path
+):
+    _, client = fake_obs_server
+    tracer = Tracer()
+
+    # nothing is recorded without an active tracer
+    await _phase(client)
+    assert not tracer.spans
+
+    with tracer.activate():
+        await _phase(client)
+
+    assert [s.path for s in tracer.spans] == [
+        "_phase › fetch › GET /person",
+        "_phase › fetch › GET /person",
+        "_phase › fetch",
+        "_phase",
+    ]
+    http = tracer.spans[0]
+    assert http.category == "http"
+    assert http.attrs["status"] == 200
+    assert http.attrs["received_bytes"] > 0
+    assert tracer.spans[-1].duration_us >= tracer.spans[-2].duration_us
+
+    # the trace is continued by the next process
+    tracer.write(str(trace_file := tmp_path / "trace.json"))
+    continued = Tracer.load(str(trace_file))
+    with continued.activate():
+        await _phase(client)
+
+    events = continued.trace_events
+    assert len(events) == 8
+    assert all(ev["ph"] == "X" for ev in events)
+    json.dumps(events)
+
+    # the phases are listed in the order in which they started
+    summary = continued.summary_markdown().splitlines()
+    assert [row.split(" | ")[:2] for row in summary[2:]] == [
+        ["| _phase", "2"],
+        ["| _phase › fetch", "2"],
+        ["| _phase › fetch › GET /person", "4"],
+    ]
+
+
+class _Result:
+    exit_code = 0
+    stdout = "äb"
+    stderr = ""
+
+
+@pytest.mark.asyncio
+async def test_traced_command():
+    async def _run_cmd(cmd: str, **kwargs) -> _Result:
+        return _Result()
+
+    tracer = Tracer()
+    with tracer.activate():
+        await TracedCommand(_run_cmd)("git push --force origin HEAD", cwd="/")
+
+    (cmd,) = tracer.spans
+    assert cmd.name == "$ git push"
+    assert cmd.attrs == {
+        "cmd": "git push --force origin HEAD",
+        "exit_code": 0,
+        "stdout_bytes": 3,
+        "stderr_bytes": 0,
+    }
+
+
+def test_errors_are_recorded():
+    tracer = Tracer()
+    with tracer.activate(), pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+
+    assert tracer.spans[0].attrs["error"] == "ValueError('boom')"
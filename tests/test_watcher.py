@@ -0,0 +1,182 @@
+import asyncio
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from bci_build.package import Arch
+from staging.build_result import PackageStatusCode
+from staging.obs import ObsClient
+from staging.watcher import BuildResultWatcher
+from staging.watcher import PackageStateChange
+from staging.watcher import ServiceWaiter
+
+from .fake_obs import FakeObs
+
+
+@pytest.mark.asyncio
+async def test_wait_until_finished(fake_obs_server: tuple[FakeObs, ObsClient]):
+    obs, client = fake_obs_server
+    obs.script_build(
+        "home:foo",
+        [
+            {
+                "pcp-image": PackageStatusCode.SCHEDULED,
+                "nginx-image": PackageStatusCode.EXCLUDED,
+            },
+            {
+                "pcp-image": PackageStatusCode.BUILDING,
+                "nginx-image": PackageStatusCode.EXCLUDED,
+            },
+            {
+                "pcp-image": PackageStatusCode.SUCCEEDED,
+                "nginx-image": PackageStatusCode.EXCLUDED,
+            },
+        ],
+    )
+
+    changes: list[PackageStateChange] = []
+    watcher = BuildResultWatcher(
+        client, "home:foo", ["images"], callbacks=[changes.append]
+    )
+    results = await watcher.wait_until_finished()
+
+    assert obs.calls["GET /build/{prj}/_result"] == 3
+    assert [query.get("oldstate") for query in obs.result_queries] == [
+        None,
+        ET.fromstring(obs._timelines["home:foo"][0]).get("state"),
+        ET.fromstring(obs._timelines["home:foo"][1]).get("state"),
+    ]
+    assert all(query["lastbuild"] == "1" for query in obs.result_queries)
+    assert watcher.finished
+    assert watcher.number_of_packages_with_results == 4
+    assert len(results) == 4
+    assert [pkg.code for pkg in results[0].packages] == [
+        PackageStatusCode.SUCCEEDED,
+        PackageStatusCode.EXCLUDED,
+    ]
+    x86_64_changes = [
+        (c.repository, c.package, c.old, c.new)
+        for c in changes
+        if c.arch == Arch.X86_64
+    ]
+    assert x86_64_changes == [
+        ("images", "pcp-image", None, PackageStatusCode.SCHEDULED),
+        ("images", "nginx-image", None, PackageStatusCode.EXCLUDED),
+        ("containerfile", "pcp-image", None, PackageStatusCode.SCHEDULED),
+        ("containerfile", "nginx-image", None, PackageStatusCode.EXCLUDED),
+        (
+            "images",
+            "pcp-image",
+            PackageStatusCode.SCHEDULED,
+            PackageStatusCode.BUILDING,
+        ),
+        (
+            "containerfile",
+            "pcp-image",
+            PackageStatusCode.SCHEDULED,
+            PackageStatusCode.BUILDING,
+        ),
+        (
+            "images",
+            "pcp-image",
+            PackageStatusCode.BUILDING,
+            PackageStatusCode.SUCCEEDED,
+        ),
+        (
+            "containerfile",
+            "pcp-image",
+            PackageStatusCode.BUILDING,
+            PackageStatusCode.SUCCEEDED,
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_wait_until_finished_without_results(
+    fake_obs_server: tuple[FakeObs, ObsClient],
+):
+    obs, client = fake_obs_server
+
+    watcher = BuildResultWatcher(client, "home:foo", empty_poll_interval_sec=0)
+    assert await watcher.wait_until_finished(max_empty_polls=2) == []
+
+    # OBS reported no packages => no long polls waiting for a state change
+    assert obs.calls["GET /build/{prj}/_result"] == 3
+    assert all("oldstate" not in query for query in obs.result_queries)
+
+
+@pytest.mark.asyncio
+async def test_service_waiter(fake_obs_server: tuple[FakeObs, ObsClient]):
+    obs, client = fake_obs_server
+    obs.service_polls = 2
+    packages = [f"pkg-{i}" for i in range(10)]
+
+    await ServiceWaiter(
+        client, "home:foo", max_concurrency=3, poll_interval_sec=0
+    ).wait(packages)
+
+    assert obs.calls["GET /source/{prj}/{pkg}"] == 3 * len(packages)
+    assert obs.max_concurrent_polls == 3
+
+
+@pytest.mark.asyncio
+async def test_service_waiter_backs_off_when_throttled(
+    fake_obs_server: tuple[FakeObs, ObsClient],
+):
+    obs, client = fake_obs_server
+    obs.throttled_polls = 4
+    packages = [f"pkg-{i}" for i in range(8)]
+
+    waiter = ServiceWaiter(
+        client,
+        "home:foo",
+        max_concurrency=4,
+        poll_interval_sec=0.01,
+        max_poll_interval_sec=0.02,
+    )
+    await waiter.wait(packages)
+
+    assert obs.calls["GET /source/{prj}/{pkg}"] == len(packages) + 4
+    # the throttled round halved the concurrency and doubled the interval,
+    # the following successful round recovered by one step
+    assert waiter._concurrency == 3
+    assert waiter._interval_sec == 0.01
+
+
+@pytest.mark.asyncio
+async def test_service_waiter_reports_failures(
+    fake_obs_server: tuple[FakeObs, ObsClient],
+):
+    obs, client = fake_obs_server
+    obs.failing_services = {"pcp-image": "download_url failed"}
+
+    with pytest.raises(RuntimeError, match="pcp-image: download_url failed"):
+        await ServiceWaiter(client, "home:foo", poll_interval_sec=0).wait(
+            ["pcp-image", "nginx-image"]
+        )
+
+
+@pytest.mark.asyncio
+async def test_service_waiter_waits_for_new_packages(
+    fake_obs_server: tuple[FakeObs, ObsClient],
+):
+    obs, client = fake_obs_server
+    obs.missing_package_polls = 2
+    obs.missing_serviceinfo_polls = 1
+    obs.service_polls = 1
+    packages = ["pcp-image", "nginx-image"]
+
+    await ServiceWaiter(client, "home:foo", poll_interval_sec=0).wait(packages)
+
+    assert obs.calls["GET /source/{prj}/{pkg}"] == 5 * len(packages)
+
+
+@pytest.mark.asyncio
+async def test_service_waiter_times_out(fake_obs_server: tuple[FakeObs, ObsClient]):
+    obs, client = fake_obs_server
+    obs.missing_package_polls = 1000
+
+    with pytest.raises(asyncio.TimeoutError, match="pcp-image"):
+        await ServiceWaiter(
+            client, "home:foo", poll_interval_sec=0.01, timeout_sec=0.05
+        ).wait(["pcp-image"])
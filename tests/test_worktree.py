@@ -0,0 +1,92 @@
+import asyncio
+import os
+import subprocess
+
+import pytest
+
+from staging.worktree import WorktreePool
+
+from .fake_obs import GitOrigin
+
+
+def _push_commit(origin: GitOrigin, branch: str, fname: str) -> None:
+    subprocess.run(["git", "fetch", "origin"], check=True, capture_output=True)
+    subprocess.run(
+        ["git", "checkout", "-B", "work", f"origin/{branch}"],
+        check=True,
+        capture_output=True,
+    )
+    (origin.clone_path / fname).parent.mkdir(exist_ok=True)
+    (origin.clone_path / fname).write_text("new")
+    subprocess.run(["git", "add", fname], check=True, capture_output=True)
+    subprocess.run(["git", "commit", "-m", fname], check=True, capture_output=True)
+    subprocess.run(
+        ["git", "push", "origin", f"HEAD:{branch}"], check=True, capture_output=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_worktree_is_reused(git_origin: GitOrigin):
+    pool = WorktreePool()
+
+    async with pool.checkout("Tumbleweed", "tw-1", "origin/Tumbleweed") as wt:
+        assert os.path.exists(os.path.join(wt, "pcp-image", "pcp-image.changes"))
+        with open(os.path.join(wt, "_config"), "w") as config:
+            config.write("modified")
+        with open(os.path.join(wt, "untracked"), "w") as untracked:
+            untracked.write("garbage")
+
+    _push_commit(git_origin, "Tumbleweed", "nginx-image/Dockerfile")
+    calls_before = git_origin.calls
+
+    async with pool.checkout("Tumbleweed", "tw-2", "origin/Tumbleweed") as wt_2:
+        assert wt_2 == wt
+        assert open(os.path.join(wt, "_config")).read() == ""
+        assert not os.path.exists(os.path.join(wt, "untracked"))
+        assert os.path.exists(os.path.join(wt, "nginx-image", "Dockerfile"))
+
+    assert (git_origin.calls - calls_before)["worktree"] == 0
+
+    # the branches are released after each checkout
+    assert (
+        "tw-1"
+        in subprocess.run(
+            ["git", "branch"], check=True, capture_output=True, text=True
+        ).stdout
+    )
+
+
+@pytest.mark.asyncio
+async def test_sparse_checkout(git_origin: GitOrigin):
+    _push_commit(git_origin, "Tumbleweed", "nginx-image/Dockerfile")
+    pool = WorktreePool()
+
+    async with pool.checkout(
+        "Tumbleweed", "tw", "origin/Tumbleweed", sparse_paths=["pcp-image"]
+    ) as wt:
+        assert os.path.exists(os.path.join(wt, "_config"))
+        assert os.path.exists(os.path.join(wt, "pcp-image", "pcp-image.changes"))
+        assert not os.path.exists(os.path.join(wt, "nginx-image"))
+
+    async with pool.checkout("Tumbleweed", "tw", "origin/Tumbleweed") as wt:
+        assert os.path.exists(os.path.join(wt, "nginx-image", "Dockerfile"))
+
+    await pool.remove("Tumbleweed")
+    assert not os.path.exists(wt)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_worktrees_share_the_repository(git_origin: GitOrigin):
+    pool = WorktreePool()
+
+    async def _checkout(key: str) -> bool:
+        async with pool.checkout(key, f"{key}-branch", f"origin/{key}") as wt:
+            return os.path.exists(os.path.join(wt, "_config"))
+
+    assert await asyncio.gather(
+        *(_checkout(key) for key in ("Tumbleweed", "for-deploy-Tumbleweed"))
+    ) == [
+        True,
+        True,
+    ]
+    assert not pool.repository_lock.locked()
@@ -0,0 +1,18 @@
+import pytest
+
+from bci_build.xdg import cache_path
+
+
+def test_cache_path(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", "/var/cache/bot")
+    assert (
+        cache_path("obs-config", "prjconf")
+        == "/var/cache/bot/bci-dockerfile-generator/obs-config/prjconf"
+    )
+
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", "/home/geeko")
+    assert (
+        cache_path("render-cache.json")
+        == "/home/geeko/.cache/bci-dockerfile-generator/render-cache.json"
+    )